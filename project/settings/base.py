@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 MIDDLEWARE = [
@@ -87,7 +88,50 @@ STATICFILES_DIRS = (
     ABS_PATH('project', 'static'),
 )
 
+# Cache, shared by web and management command processes
+CACHES = {
+    'default': {
+        'BACKEND': ENV_STR(
+            'CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': ENV_STR('CACHE_LOCATION', ABS_PATH('cache', 'django')),
+    },
+    # Holds only the dataset version, so culling of the default cache never
+    # evicts it.
+    'dataset': {
+        'BACKEND': ENV_STR(
+            'DATASET_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': ENV_STR('DATASET_CACHE_LOCATION', ABS_PATH('cache', 'dataset')),
+    },
+}
+
 # Strike configuration
 STRIKE_DATA_URL = ENV_STR('STRIKE_DATA_URL', 'https://api.dronestre.am/data')
 STRIKE_DATE_MONTH_RANGE = int(ENV_SETTING('STRIKE_DATE_MONTH_RANGE', 3))
 GOOGLE_MAPS_JS_API_KEY = ENV_STR('GOOGLE_MAPS_JS_API_KEY', '')
+STRIKE_IMPORT_BATCH_SIZE = int(ENV_SETTING('STRIKE_IMPORT_BATCH_SIZE', 1000))
+STRIKE_DATA_CACHE_DIR = ENV_STR('STRIKE_DATA_CACHE_DIR', ABS_PATH('cache'))
+STRIKE_DATA_TIMEOUT = int(ENV_SETTING('STRIKE_DATA_TIMEOUT', 60))
+STRIKE_IMPORT_WORKERS = int(ENV_SETTING('STRIKE_IMPORT_WORKERS', 1))
+STRIKE_GEOCODER_BACKEND = ENV_STR('STRIKE_GEOCODER_BACKEND', 'strike.geocoders.GoogleGeocoder')
+STRIKE_GEOCODER_FIXTURE = ENV_STR('STRIKE_GEOCODER_FIXTURE', '')
+STRIKE_GEOCODE_BATCH_SIZE = int(ENV_SETTING('STRIKE_GEOCODE_BATCH_SIZE', 50))
+STRIKE_GEOCODE_CONCURRENCY = int(ENV_SETTING('STRIKE_GEOCODE_CONCURRENCY', 4))
+STRIKE_GEOCODE_RATE_LIMIT = float(ENV_SETTING('STRIKE_GEOCODE_RATE_LIMIT', 10))
+GOOGLE_GEOCODING_API_KEY = ENV_STR('GOOGLE_GEOCODING_API_KEY', '')
+STRIKE_CACHE_TIMEOUT = int(ENV_SETTING('STRIKE_CACHE_TIMEOUT', 86400))
+STRIKE_CLUSTER_GRID_SIZE = int(ENV_SETTING('STRIKE_CLUSTER_GRID_SIZE', 64))
+STRIKE_CLUSTER_MAX_ZOOM = int(ENV_SETTING('STRIKE_CLUSTER_MAX_ZOOM', 16))
+STRIKE_SEARCH_CONFIG = ENV_STR('STRIKE_SEARCH_CONFIG', 'english')
+STRIKE_SUGGEST_LIMIT = int(ENV_SETTING('STRIKE_SUGGEST_LIMIT', 10))
+STRIKE_SUGGEST_MAX_AGE = int(ENV_SETTING('STRIKE_SUGGEST_MAX_AGE', 300))
+STRIKE_SEARCH_PAGE_SIZE = int(ENV_SETTING('STRIKE_SEARCH_PAGE_SIZE', 50))
+STRIKE_EXPORT_CHUNK_SIZE = int(ENV_SETTING('STRIKE_EXPORT_CHUNK_SIZE', 2000))
+STRIKE_NEAREST_LIMIT = int(ENV_SETTING('STRIKE_NEAREST_LIMIT', 10))
+STRIKE_HEATMAP_GRID_SIZE = int(ENV_SETTING('STRIKE_HEATMAP_GRID_SIZE', 256))
+STRIKE_HEATMAP_MAX_BAND = int(ENV_SETTING('STRIKE_HEATMAP_MAX_BAND', 4))
+STRIKE_TILE_MAX_ZOOM = int(ENV_SETTING('STRIKE_TILE_MAX_ZOOM', 16))
+STRIKE_TILE_SEED_ZOOM = int(ENV_SETTING('STRIKE_TILE_SEED_ZOOM', 5))
+STRIKE_TILE_MAX_AGE = int(ENV_SETTING('STRIKE_TILE_MAX_AGE', 300))
+STRIKE_TILE_CACHE_MAX_ZOOM = int(ENV_SETTING('STRIKE_TILE_CACHE_MAX_ZOOM', 10))
+STRIKE_TILE_CACHE_FILTERS = int(ENV_SETTING('STRIKE_TILE_CACHE_FILTERS', 100))
+STRIKE_PARTITION_YEARS_AHEAD = int(ENV_SETTING('STRIKE_PARTITION_YEARS_AHEAD', 1))
@@ -1,9 +1,21 @@
+from tempfile import mkdtemp
 from uuid import uuid4
 from .base import *
 
 DEBUG = True
 SECRET_KEY = uuid4().hex
 STRIKE_DATE_MONTH_RANGE = 3
+STRIKE_DATA_CACHE_DIR = mkdtemp()
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dataset': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dataset',
+    },
+}
 
 PASSWORD_HASHERS = (
     'django.contrib.auth.hashers.MD5PasswordHasher',
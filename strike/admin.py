@@ -1,5 +1,20 @@
 from django.contrib import admin
-from .models import Strike, Location, Country
+from .cache import bump_dataset_version
+from .models import Strike, Location, Country, PendingStrike, GeocodedPlace
+
+
+class DatasetVersionAdminMixin(object):
+    """
+    Starts a new dataset version once per admin delete.
+    """
+
+    def delete_model(self, request, obj):
+        super(DatasetVersionAdminMixin, self).delete_model(request, obj)
+        bump_dataset_version()
+
+    def delete_queryset(self, request, queryset):
+        super(DatasetVersionAdminMixin, self).delete_queryset(request, queryset)
+        bump_dataset_version()
 
 
 class StrikeInline(admin.TabularInline):
@@ -7,24 +22,38 @@ class StrikeInline(admin.TabularInline):
     fields = ('deaths', 'date')
 
 
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(DatasetVersionAdminMixin, admin.ModelAdmin):
     model = Location
     list_display = ['id', 'country', 'town', 'location']
     list_filter = ('country', )
     inlines = [StrikeInline, ]
 
 
-class StrikeAdmin(admin.ModelAdmin):
+class StrikeAdmin(DatasetVersionAdminMixin, admin.ModelAdmin):
     model = Strike
     list_display = ['location', 'date', 'deaths']
     list_filter = ('location__country', )
 
 
-class CountryAdmin(admin.ModelAdmin):
+class CountryAdmin(DatasetVersionAdminMixin, admin.ModelAdmin):
     model = Country
     list_display = ['name', ]
 
 
+class PendingStrikeAdmin(admin.ModelAdmin):
+    model = PendingStrike
+    list_display = ['number', 'country', 'location', 'town', 'created']
+    list_filter = ('country', )
+
+
+class GeocodedPlaceAdmin(admin.ModelAdmin):
+    model = GeocodedPlace
+    list_display = ['country', 'location', 'town', 'lat', 'lon']
+    list_filter = ('country', )
+
+
 admin.site.register(Strike, StrikeAdmin)
 admin.site.register(Location, LocationAdmin)
 admin.site.register(Country, CountryAdmin)
+admin.site.register(PendingStrike, PendingStrikeAdmin)
+admin.site.register(GeocodedPlace, GeocodedPlaceAdmin)
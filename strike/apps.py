@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class StrikeConfig(AppConfig):
     name = 'strike'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,169 @@
+import os
+import shutil
+import statistics
+import time
+from tempfile import mkdtemp
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from .cache import bump_dataset_version
+from .helpers import Importer
+from .models import Country, Location, PendingStrike, Strike
+from .synthetic import SyntheticFeed
+
+
+class QueryCounter(object):
+    """
+    Connection execute wrapper counting executed queries.
+    """
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class Benchmark(object):
+    """
+    Times Importer.import_data, IndexView.get, SearchView.get and
+    NearestView.get against synthetic datasets of increasing size, and
+    counts their queries. Views are timed with cold caches; IndexView is
+    also timed with its cached response.
+
+    The search query must match imported strikes, so SearchView is not timed
+    on empty results. Existing strike data in the current database is
+    deleted. Caches and
+    cached files are kept in memory and a temporary directory, apart from
+    the configured ones.
+    """
+
+    def __init__(self, sizes, repeat=5, locations_ratio=0.1, countries=10,
+                 search_query='pakistan', seed=0):
+        self.sizes = sizes
+        self.repeat = repeat
+        self.locations_ratio = locations_ratio
+        self.countries = countries
+        self.search_query = search_query
+        self.seed = seed
+        self.client = Client()
+
+    def measure(self, func):
+        """
+        Return wall time in seconds and query count of a single func call.
+        """
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        return elapsed, counter.queries
+
+    def measure_view(self, size, name, path, params, cached=False):
+        """
+        Time repeated GET requests. Unless cached, a new dataset version is
+        started before every request, so versioned caches are cold.
+        """
+        times = []
+        for i in range(self.repeat):
+            if not cached:
+                bump_dataset_version()
+            elapsed, queries = self.measure(lambda: self.client.get(path, params))
+            times.append(elapsed)
+        return {
+            'size': size,
+            'name': name,
+            'calls': self.repeat,
+            'min': min(times),
+            'median': statistics.median(times),
+            'max': max(times),
+            'queries': queries,
+        }
+
+    def import_feed(self, size):
+        """
+        Write a synthetic feed of size strikes to disk and import it.
+        """
+        feed = SyntheticFeed(
+            strikes=size, locations=max(1, int(size * self.locations_ratio)),
+            countries=self.countries, seed=self.seed)
+        feed_dir = mkdtemp()
+        try:
+            path = os.path.join(feed_dir, 'strike.json')
+            with open(path, 'w') as feed_file:
+                feed.write(feed_file)
+
+            importer = Importer()
+            with importer.open_file(path) as stream:
+                elapsed, queries = self.measure(lambda: importer.import_data(stream))
+        finally:
+            shutil.rmtree(feed_dir)
+
+        return {
+            'size': size,
+            'name': 'import_data',
+            'calls': 1,
+            'min': elapsed,
+            'median': elapsed,
+            'max': elapsed,
+            'queries': queries,
+        }
+
+    def run_size(self, size):
+        Strike.objects.all().delete()
+        Location.objects.all().delete()
+        Country.objects.all().delete()
+        PendingStrike.objects.all().delete()
+
+        results = [self.import_feed(size)]
+        if not Strike.objects.search(self.search_query).exists():
+            raise ValueError('Search query %r matches no strikes.' % self.search_query)
+        index_params = {'daterange': '01/01/2002 - 12/31/2020', 'country__name': 'all'}
+        results.append(self.measure_view(size, 'IndexView.get', reverse('index'), index_params))
+        results.append(self.measure_view(
+            size, 'IndexView.cached', reverse('index'), index_params, cached=True))
+        results.append(self.measure_view(
+            size, 'SearchView.get', reverse('search'),
+            {'search_q': self.search_query}))
+        results.append(self.measure_view(
+            size, 'NearestView.get', reverse('nearest'), {'lat': 15, 'lon': 45}))
+        return results
+
+    def run(self, callback=None):
+        """
+        Run the benchmark for every size, calling callback with the results
+        of each size as they complete.
+        """
+        caches = {
+            alias: {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'benchmark-%s' % alias,
+            } for alias in ('default', 'dataset')
+        }
+        data_cache_dir = mkdtemp()
+        results = []
+        try:
+            with override_settings(CACHES=caches, STRIKE_DATA_CACHE_DIR=data_cache_dir):
+                for size in self.sizes:
+                    size_results = self.run_size(size)
+                    if callback is not None:
+                        callback(size_results)
+                    results.extend(size_results)
+        finally:
+            shutil.rmtree(data_cache_dir, ignore_errors=True)
+        return results
+
+    @staticmethod
+    def table(results):
+        """
+        Return results as a text table, times in milliseconds.
+        """
+        row = '%10s %-16s %6s %12s %12s %12s %9s'
+        lines = [row % ('Strikes', 'Benchmark', 'Calls', 'Min (ms)', 'Median (ms)', 'Max (ms)', 'Queries')]
+        for result in results:
+            lines.append(row % (
+                result['size'], result['name'], result['calls'],
+                '%.1f' % (result['min'] * 1000), '%.1f' % (result['median'] * 1000),
+                '%.1f' % (result['max'] * 1000), result['queries']))
+        return '\n'.join(lines)
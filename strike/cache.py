@@ -0,0 +1,140 @@
+import hashlib
+import time
+from datetime import date, datetime
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from .clustering import MarkerIndex
+from .models import Location
+
+
+DATASET_VERSION_KEY = 'strike:dataset_version'
+DATASET_CACHE = 'dataset'
+
+# The (dataset version, marker index) last used by this process.
+_marker_index = (None, None)
+
+
+def new_dataset_version():
+    return uuid4().hex, int(time.time())
+
+
+def get_dataset_state():
+    """
+    Return the current dataset version and its start timestamp, starting a
+    new version if none is set. The version is kept in its own cache, so
+    entries culled from the default cache never take it along.
+    """
+    dataset_cache = caches[DATASET_CACHE]
+    state = dataset_cache.get(DATASET_VERSION_KEY)
+    if state is None:
+        dataset_cache.add(DATASET_VERSION_KEY, new_dataset_version(), None)
+        state = dataset_cache.get(DATASET_VERSION_KEY)
+    return state
+
+
+def get_dataset_version():
+    return get_dataset_state()[0]
+
+
+def bump_dataset_version():
+    """
+    Start a new dataset version, invalidating all versioned cache keys.
+    """
+    caches[DATASET_CACHE].set(DATASET_VERSION_KEY, new_dataset_version(), None)
+
+
+def versioned_key(name):
+    return 'strike:%s:%s' % (get_dataset_version(), name)
+
+
+def get_countries():
+    """
+    Return the sorted names of countries with locations, for the country
+    filter, cached per dataset version.
+    """
+    key = versioned_key('countries')
+    countries = cache.get(key)
+    if countries is None:
+        countries = list(Location.objects.values_list(
+            'country__name', flat=True).distinct().order_by('country__name'))
+        cache.set(key, countries, settings.STRIKE_CACHE_TIMEOUT)
+    return countries
+
+
+def get_marker_index():
+    """
+    Return the marker clustering index of all locations, built once per
+    dataset version and kept in process memory, so only the first request
+    of a version in each process reads it from the cache.
+    """
+    global _marker_index
+    version = get_dataset_version()
+    if _marker_index[0] == version:
+        return _marker_index[1]
+
+    key = 'strike:%s:marker_index' % version
+    marker_index = cache.get(key)
+    if marker_index is None:
+        marker_index = MarkerIndex().load(
+            Location.objects.values_list('id', 'lat', 'lon').iterator())
+        cache.set(key, marker_index, settings.STRIKE_CACHE_TIMEOUT)
+    _marker_index = (version, marker_index)
+    return marker_index
+
+
+class VersionedCacheMixin(object):
+    """
+    View mixin caching whole GET responses per normalized query parameters
+    and dataset version. Responses carry a strong ETag and Last-Modified,
+    and matching conditional requests get a 304.
+
+    Views with daily=True depend on the current date, which is part of
+    their cache key and bounds Last-Modified.
+    """
+    daily = False
+
+    def get_cache_params(self, request):
+        """
+        Return the sorted (key, value) query parameters the response depends
+        on, without empty values.
+        """
+        return sorted(
+            (key, value) for key, values in request.GET.lists()
+            for value in values if value != '')
+
+    def get_cache_key(self, request, version):
+        params = self.get_cache_params(request)
+        if self.daily:
+            params.append(('_date', date.today().isoformat()))
+        digest = hashlib.sha1(
+            repr((request.path, params)).encode()).hexdigest()
+        return 'strike:%s:response:%s' % (version, digest)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return super(VersionedCacheMixin, self).dispatch(request, *args, **kwargs)
+
+        version, last_modified = get_dataset_state()
+        if self.daily:
+            today = datetime.combine(date.today(), datetime.min.time())
+            last_modified = max(last_modified, int(today.timestamp()))
+        key = self.get_cache_key(request, version)
+        etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = cache.get(key)
+            if response is None:
+                response = super(VersionedCacheMixin, self).dispatch(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response, settings.STRIKE_CACHE_TIMEOUT)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return response
@@ -0,0 +1,86 @@
+import math
+from django.conf import settings
+
+
+TILE_SIZE = 256
+
+
+def project(lat, lon, zoom):
+    """
+    Project lat and lon to integer Web Mercator pixel coordinates at zoom.
+    """
+    scale = TILE_SIZE * 2 ** zoom
+    sin_lat = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    x = (lon + 180) / 360
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return int(x * scale), int(y * scale)
+
+
+class MarkerIndex(object):
+    """
+    Hierarchical grid of location coordinates. Pixel coordinates are stored
+    at max_zoom, and the grid cell of a location at a lower zoom is found by
+    shifting them, so a single index serves every zoom level.
+    """
+
+    def __init__(self, grid_size=None, max_zoom=None):
+        self.grid_size = grid_size or settings.STRIKE_CLUSTER_GRID_SIZE
+        self.max_zoom = max_zoom or settings.STRIKE_CLUSTER_MAX_ZOOM
+        self.points = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def load(self, locations):
+        """
+        Index (id, lat, lon) tuples of locations with coordinates.
+        """
+        for location_id, lat, lon in locations:
+            if lat is None or lon is None:
+                continue
+            lat, lon = float(lat), float(lon)
+            self.points[location_id] = (lat, lon) + project(lat, lon, self.max_zoom)
+        return self
+
+    def in_bbox(self, lat, lon, bbox):
+        west, south, east, north = bbox
+        if not south <= lat <= north:
+            return False
+        if west <= east:
+            return west <= lon <= east
+        # The bbox crosses the antimeridian.
+        return lon >= west or lon <= east
+
+    def cluster(self, counts, zoom, bbox=None):
+        """
+        Group locations with strike counts by grid cell at zoom, limited to
+        locations inside the (west, south, east, north) bbox.
+
+        Returns a list of dicts with the weighted center lat and lon, the
+        number of strikes, and the location ids of each cell. Above max_zoom
+        every location is its own cell.
+        """
+        shift = self.max_zoom - min(max(zoom, 0), self.max_zoom)
+        cells = {}
+        for location_id, count in counts.items():
+            point = self.points.get(location_id)
+            if point is None:
+                continue
+            lat, lon, x, y = point
+            if bbox is not None and not self.in_bbox(lat, lon, bbox):
+                continue
+
+            if zoom > self.max_zoom:
+                key = location_id
+            else:
+                key = ((x >> shift) // self.grid_size, (y >> shift) // self.grid_size)
+            cell = cells.setdefault(key, {'lat': 0.0, 'lon': 0.0, 'strikes': 0, 'locations': []})
+            cell['lat'] += lat * count
+            cell['lon'] += lon * count
+            cell['strikes'] += count
+            cell['locations'].append(location_id)
+
+        for cell in cells.values():
+            cell['lat'] /= cell['strikes']
+            cell['lon'] /= cell['strikes']
+        return list(cells.values())
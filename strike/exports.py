@@ -0,0 +1,83 @@
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_FIELDS = (
+    ('number', 'number'),
+    ('date', 'date'),
+    ('country', 'location__country__name'),
+    ('province', 'location__location'),
+    ('town', 'location__town'),
+    ('lat', 'location__lat'),
+    ('lon', 'location__lon'),
+    ('deaths', 'deaths'),
+    ('deaths_min', 'deaths_min'),
+    ('deaths_max', 'deaths_max'),
+    ('civilians', 'civilians'),
+    ('injuries', 'injuries'),
+    ('children', 'children'),
+    ('target', 'target'),
+    ('narrative', 'narrative'),
+    ('bij_summary_short', 'bij_summary_short'),
+    ('bij_link', 'bij_link'),
+    ('bureau_id', 'bureau_id'),
+    ('tweet_id', 'tweet_id'),
+    ('names', 'names'),
+    ('articles', 'articles'),
+)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo(object):
+    """
+    File-like object returning written values, for streaming csv rows.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(strikes, chunk_size=None):
+    """
+    Yield export rows of a strike queryset as tuples, fetched with a
+    server-side cursor in chunks of chunk_size rows.
+    """
+    return strikes.values_list(*[lookup for name, lookup in EXPORT_FIELDS]).iterator(
+        chunk_size=chunk_size or settings.STRIKE_EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(rows):
+    """
+    Yield a header line and a csv line per row. List values are joined
+    with '; '.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, lookup in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow([
+            '; '.join(value) if isinstance(value, list) else value for value in row])
+
+
+def iter_ndjson(rows):
+    """
+    Yield a JSON object line per row.
+    """
+    names = [name for name, lookup in EXPORT_FIELDS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export(strikes, export_format, chunk_size=None):
+    """
+    Return an iterator of export lines of strikes in export_format.
+    """
+    rows = iter_rows(strikes, chunk_size)
+    if export_format == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -0,0 +1,98 @@
+from django.db import models
+from django.db.models.functions import Cast
+
+
+class Point(tuple):
+    """
+    (x, y) coordinates of a Postgres point, x being the longitude.
+    """
+
+    def __new__(cls, x, y):
+        return super(Point, cls).__new__(cls, (float(x), float(y)))
+
+    @property
+    def x(self):
+        return self[0]
+
+    @property
+    def y(self):
+        return self[1]
+
+    def __str__(self):
+        return '(%r,%r)' % self
+
+
+class Box(tuple):
+    """
+    Postgres box between two (x, y) corners.
+    """
+
+    def __new__(cls, x1, y1, x2, y2):
+        return super(Box, cls).__new__(cls, (Point(x1, y1), Point(x2, y2)))
+
+    def __str__(self):
+        return '(%s,%s)' % self
+
+
+class PointField(models.Field):
+    """
+    Postgres built-in point column. Supports GiST indexes, and the same_as
+    (~=) and contained_in (<@ box) lookups.
+    """
+    description = 'Postgres point'
+
+    def db_type(self, connection):
+        return 'point'
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Point):
+            return value
+        if isinstance(value, str):
+            value = value.strip('()').split(',')
+        return Point(*value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return str(self.to_python(value))
+
+
+class PointDistance(models.Func):
+    """
+    Planar distance (<->) between a point column and a Point. Ordering by it
+    is answered by a GiST index as a nearest-neighbour scan.
+    """
+    arg_joiner = ' <-> '
+    template = '%(expressions)s'
+    output_field = models.FloatField()
+
+    def __init__(self, expression, point, **extra):
+        point = Cast(models.Value(str(point)), PointField())
+        super(PointDistance, self).__init__(expression, point, **extra)
+
+
+@PointField.register_lookup
+class SameAs(models.Lookup):
+    lookup_name = 'same_as'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '%s ~= %s::point' % (lhs, rhs), lhs_params + rhs_params
+
+
+@PointField.register_lookup
+class ContainedIn(models.Lookup):
+    lookup_name = 'contained_in'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [str(value)]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '%s <@ %s::box' % (lhs, rhs), lhs_params + rhs_params
@@ -1,6 +1,31 @@
 from datetime import datetime
 from django import forms
-from .models import Location
+from django.conf import settings
+from .cache import get_countries
+from .fields import Box
+from .heatmap import WEIGHTS, get_heatmap
+from .models import Location, Strike
+
+
+DATERANGE_ERROR = "Date range must be 'mm/dd/yyyy - mm/dd/yyyy'."
+
+
+def parse_daterange(daterange):
+    """
+    Parses a 'mm/dd/yyyy - mm/dd/yyyy' string into date lookups.
+    """
+    error = forms.ValidationError(DATERANGE_ERROR)
+    dates = daterange.split(' - ')
+    if len(dates) != 2:
+        raise error
+
+    try:
+        return {
+            'date__gte': datetime.strptime(dates[0], '%m/%d/%Y').date(),
+            'date__lte': datetime.strptime(dates[1], '%m/%d/%Y').date(),
+        }
+    except ValueError:
+        raise error
 
 
 class StrikeFilterForm(forms.Form):
@@ -8,12 +33,22 @@ class StrikeFilterForm(forms.Form):
     country__name = forms.ChoiceField(label='Country', choices=())
     province = forms.CharField(label='Province', max_length=100, required=False)
     town = forms.CharField(label='City / Town', max_length=100, required=False)
+    min_deaths = forms.IntegerField(label='Minimum deaths', min_value=0, required=False)
+    min_civilians = forms.IntegerField(label='Minimum civilians', min_value=0, required=False)
+    area = forms.CharField(label='Area', max_length=100, required=False)
+    near = forms.CharField(label='Near', max_length=100, required=False)
+
+    # Strike filters, by form field.
+    strike_filters = {
+        'min_deaths': 'deaths_low__gte',
+        'min_civilians': 'civilians_low__gte',
+        'area': 'location__point__contained_in',
+        'near': 'location__in',
+    }
 
     def __init__(self, *args, **kwargs):
         super(StrikeFilterForm, self).__init__(*args, **kwargs)
-        country_choices = [
-            (l, l) for l in Location.objects.all().values_list(
-                'country__name', flat=True).distinct()]
+        country_choices = [(country, country) for country in get_countries()]
         country_choices.append(('all', ''))
         self.fields['country__name'] = forms.ChoiceField(choices=country_choices)
 
@@ -27,6 +62,8 @@ class StrikeFilterForm(forms.Form):
         # Only retrieve existing data.
         data = {}
         for item in self.cleaned_data:
+            if item in self.strike_filters:
+                continue
             if self.cleaned_data[item] not in ['', None]:
                 data[item] = self.cleaned_data[item]
 
@@ -40,26 +77,135 @@ class StrikeFilterForm(forms.Form):
 
         return data
 
-    def clean_daterange(self):
+    def get_strike_values(self):
         """
-        Parses and validates daterange string.
+        Get filter unpackable values for strikes.
         """
-        error = forms.ValidationError("Date range must be 'mm/dd/yyyy - mm/dd/yyyy'.")
-
         if not self.is_valid():
-            raise error
+            return {}
 
-        daterange = self.cleaned_data['daterange']
-        dates = daterange.split(' - ')
-        if len(dates) != 2:
-            raise error
+        values = {
+            lookup: self.cleaned_data[item]
+            for item, lookup in self.strike_filters.items()
+            if self.cleaned_data[item] is not None
+        }
+        if self.cleaned_data['near'] is not None:
+            values['location__in'] = Location.objects.within_radius(
+                *self.cleaned_data['near']).values('id')
+        return values
 
+    def get_strikes(self):
+        """
+        Return the strikes matching a valid form, ordered by date and number.
+        """
+        filter_params = self.get_values()
+        daterange = filter_params.pop('daterange')
+        filter_params = {
+            'location__' + lookup: value for lookup, value in filter_params.items()}
+        return Strike.objects.filter(
+            **daterange, **filter_params, **self.get_strike_values()
+        ).order_by('date', 'number')
+
+    def clean_coordinates(self, field, count, error):
+        """
+        Parses a string of count comma separated numbers.
+        """
+        if not self.cleaned_data[field]:
+            return None
         try:
-            daterange = {
-                'date__gte': datetime.strptime(dates[0], '%m/%d/%Y').date(),
-                'date__lte': datetime.strptime(dates[1], '%m/%d/%Y').date(),
-            }
+            values = [float(value) for value in self.cleaned_data[field].split(',')]
         except ValueError:
             raise error
+        if len(values) != count:
+            raise error
+        return values
+
+    def clean_area(self):
+        """
+        Parses 'west,south,east,north' area bounds into a box.
+        """
+        error = forms.ValidationError("Area must be 'west,south,east,north'.")
+        bounds = self.clean_coordinates('area', 4, error)
+        if bounds is None:
+            return None
+
+        west, south, east, north = bounds
+        if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+            raise error
+        return Box(west, south, east, north)
+
+    def clean_near(self):
+        """
+        Parses 'lat,lon,km' into a (lat, lon, km) tuple.
+        """
+        error = forms.ValidationError("Near must be 'lat,lon,km'.")
+        values = self.clean_coordinates('near', 3, error)
+        if values is None:
+            return None
+
+        lat, lon, km = values
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and km > 0):
+            raise error
+        return lat, lon, km
+
+    def clean_daterange(self):
+        """
+        Parses and validates daterange string.
+        """
+        if not self.is_valid():
+            raise forms.ValidationError(DATERANGE_ERROR)
+        return parse_daterange(self.cleaned_data['daterange'])
+
+
+class NearestForm(forms.Form):
+    """
+    Nearest strikes lookup around lat and lon, optionally within a date range.
+    """
+    lat = forms.FloatField(min_value=-90, max_value=90)
+    lon = forms.FloatField(min_value=-180, max_value=180)
+    k = forms.IntegerField(min_value=1, max_value=100, required=False)
+    daterange = forms.CharField(max_length=23, required=False)
+
+    def clean_k(self):
+        return self.cleaned_data['k'] or settings.STRIKE_NEAREST_LIMIT
+
+    def clean_daterange(self):
+        if not self.cleaned_data['daterange']:
+            return {}
+        return parse_daterange(self.cleaned_data['daterange'])
 
-        return daterange
+    def get_strikes(self):
+        """
+        Return the k nearest strikes of a valid form.
+        """
+        return Strike.objects.filter(**self.cleaned_data['daterange']).nearest(
+            self.cleaned_data['lat'], self.cleaned_data['lon'], self.cleaned_data['k'])
+
+
+class HeatmapForm(forms.Form):
+    """
+    Heatmap grid of a zoom level and weight, optionally within a date range.
+    """
+    zoom = forms.IntegerField(min_value=0, max_value=22, required=False)
+    weight = forms.ChoiceField(choices=[(weight, weight) for weight in WEIGHTS], required=False)
+    daterange = forms.CharField(max_length=23, required=False)
+
+    def clean_zoom(self):
+        return self.cleaned_data['zoom'] or 0
+
+    def clean_weight(self):
+        return self.cleaned_data['weight'] or 'strikes'
+
+    def clean_daterange(self):
+        if not self.cleaned_data['daterange']:
+            return {}
+        return parse_daterange(self.cleaned_data['daterange'])
+
+    def get_heatmap(self):
+        """
+        Return the heatmap grid of a valid form.
+        """
+        daterange = self.cleaned_data['daterange']
+        return get_heatmap(
+            daterange.get('date__gte'), daterange.get('date__lte'),
+            self.cleaned_data['zoom'], self.cleaned_data['weight'])
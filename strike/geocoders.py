@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+
+class GeocodeError(Exception):
+    """
+    Raised when a place could not be geocoded because of a transient error.
+    """
+
+
+class BaseGeocoder(object):
+    """
+    Geocoder backend interface.
+    """
+
+    def geocode(self, country, location, town):
+        """
+        Return a (lat, lon) tuple for a place, or None if it was not found.
+        Raise GeocodeError if the lookup failed and should be retried.
+        """
+        raise NotImplementedError
+
+
+class GoogleGeocoder(BaseGeocoder):
+    """
+    Google Maps Geocoding API backend.
+    """
+    url = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+    def __init__(self):
+        self.api_key = settings.GOOGLE_GEOCODING_API_KEY
+
+    def geocode(self, country, location, town):
+        address = ', '.join(
+            part.replace('_', ' ') for part in (town, location, country) if part)
+        query = urlencode({'address': address, 'key': self.api_key})
+
+        try:
+            response = urlopen(
+                '%s?%s' % (self.url, query), timeout=settings.STRIKE_DATA_TIMEOUT)
+            data = json.loads(response.read().decode())
+        except (OSError, ValueError) as error:
+            raise GeocodeError(str(error))
+
+        if data['status'] == 'ZERO_RESULTS':
+            return None
+        if data['status'] != 'OK':
+            raise GeocodeError(data['status'])
+
+        coordinates = data['results'][0]['geometry']['location']
+        return coordinates['lat'], coordinates['lng']
+
+
+class FixtureGeocoder(BaseGeocoder):
+    """
+    Offline backend reading places from a JSON fixture: a list of objects
+    with country, location, town, lat and lon keys.
+    """
+
+    def __init__(self, path=None):
+        path = path or settings.STRIKE_GEOCODER_FIXTURE
+        if not path:
+            raise ImproperlyConfigured('STRIKE_GEOCODER_FIXTURE is not set.')
+
+        with open(path) as fixture:
+            self.places = {
+                (place['country'], place.get('location', ''), place.get('town', '')):
+                (place['lat'], place['lon'])
+                for place in json.load(fixture)
+            }
+
+    def geocode(self, country, location, town):
+        return self.places.get((country, location, town))
+
+
+class RateLimiter(object):
+    """
+    Thread-safe limiter spacing calls to at most rate per second.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_call = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def get_geocoder(backend=None):
+    """
+    Return an instance of the configured geocoder backend.
+    """
+    return import_string(backend or settings.STRIKE_GEOCODER_BACKEND)()
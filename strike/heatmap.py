@@ -0,0 +1,95 @@
+import calendar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from .cache import versioned_key
+
+
+# Strike weight expressions, by weight name.
+WEIGHTS = {
+    'strikes': 'count(*)',
+    'deaths': 'coalesce(sum(strike_strike.deaths_low), 0)',
+}
+
+# Grid cell index and weight of located strikes in a date range, for a
+# cell size in degrees and a number of columns and rows.
+HEATMAP_SQL = """
+    SELECT
+        least(floor((strike_location.lat + 90) / %(size)s), %(rows)s - 1)::int * %(columns)s +
+        least(floor((strike_location.lon + 180) / %(size)s), %(columns)s - 1)::int AS cell,
+        {weight} AS weight
+    FROM strike_strike
+    JOIN strike_location ON strike_location.id = strike_strike.location_id
+    WHERE strike_location.lat IS NOT NULL AND strike_location.lon IS NOT NULL
+        AND strike_strike.date >= coalesce(%(start)s, '-infinity'::date)
+        AND strike_strike.date <= coalesce(%(end)s, 'infinity'::date)
+    GROUP BY cell
+    HAVING {weight} > 0
+    ORDER BY cell
+"""
+
+
+def get_zoom_band(zoom):
+    """
+    Return the grid band of a map zoom level, one band per two zoom levels.
+    """
+    return min(max(zoom, 0) // 2, settings.STRIKE_HEATMAP_MAX_BAND)
+
+
+def get_date_bucket(start, end):
+    """
+    Widen a date range to whole months, either bound possibly being None.
+    """
+    if start is not None:
+        start = start.replace(day=1)
+    if end is not None:
+        end = end.replace(day=calendar.monthrange(end.year, end.month)[1])
+    return start, end
+
+
+def build(start, end, band, weight):
+    """
+    Bin located strikes between start and end into a lat/lon grid of
+    STRIKE_HEATMAP_GRID_SIZE * 2 ** band columns and half as many rows.
+
+    Only non-empty cells are returned, as parallel lists of row-major cell
+    indexes and weights.
+    """
+    columns = settings.STRIKE_HEATMAP_GRID_SIZE * 2 ** band
+    params = {
+        'size': 360.0 / columns, 'columns': columns, 'rows': columns // 2,
+        'start': start, 'end': end,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(HEATMAP_SQL.format(weight=WEIGHTS[weight]), params)
+        rows = cursor.fetchall()
+
+    return {
+        'band': band,
+        'weight': weight,
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'west': -180,
+        'south': -90,
+        'cell_size': params['size'],
+        'columns': columns,
+        'rows': params['rows'],
+        'max': max([value for cell, value in rows], default=0),
+        'cells': [cell for cell, value in rows],
+        'values': [value for cell, value in rows],
+    }
+
+
+def get_heatmap(start, end, zoom, weight='strikes'):
+    """
+    Return the heatmap grid of a date range and zoom level, cached per
+    dataset version, month bucket of the date range and zoom band.
+    """
+    start, end = get_date_bucket(start, end)
+    band = get_zoom_band(zoom)
+    key = versioned_key('heatmap:%s:%s:%d:%s' % (start, end, band, weight))
+    heatmap = cache.get(key)
+    if heatmap is None:
+        heatmap = build(start, end, band, weight)
+        cache.set(key, heatmap, settings.STRIKE_CACHE_TIMEOUT)
+    return heatmap
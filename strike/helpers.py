@@ -1,11 +1,193 @@
+import django
+import gzip
+import hashlib
+import ijson
 import json
+import multiprocessing
+import os
+import shutil
+import time
+import tracemalloc
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from decimal import Decimal
+from itertools import islice
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from urllib.request import urlopen
-from .models import Country
-from .serializers import StrikeSerializer, LocationSerializer
+from django.db import connection, transaction
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from .cache import bump_dataset_version
+from .geocoders import GeocodeError, RateLimiter, get_geocoder
+from .models import Country, GeocodedPlace, Location, PendingStrike, Strike, Suggestion
+from .serializers import StrikeImportSerializer, LocationImportSerializer
+
+
+def chunks(iterable, size):
+    """
+    Split an iterable into lists of at most size items.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def normalize_chunk(chunk):
+    """
+    Normalize a list of raw strike records, in a worker process or inline.
+    """
+    importer = Importer()
+    return [importer.normalize_strike(strike) for strike in chunk]
+
+
+class LocationIndex(object):
+    """
+    In-memory location lookup keyed on normalized lat/lon decimals.
+    """
+    places = Decimal(10) ** -Location._meta.get_field('lat').decimal_places
+
+    def __init__(self):
+        self.locations = {}
+
+    def __len__(self):
+        return len(self.locations)
+
+    def key(self, lat, lon):
+        """
+        Return lat and lon as decimals quantized to the model precision.
+        """
+        return (
+            Decimal(str(lat)).quantize(self.places),
+            Decimal(str(lon)).quantize(self.places),
+        )
+
+    def load(self):
+        """
+        Preload all locations with coordinates in a single query.
+        """
+        locations = Location.objects.exclude(point=None)
+        self.locations = {
+            self.key(location.lat, location.lon): location
+            for location in locations.only('lat', 'lon')
+        }
+        return self
+
+    def get(self, lat, lon):
+        return self.locations.get(self.key(lat, lon))
+
+    def add(self, location):
+        self.locations[self.key(location.lat, location.lon)] = location
+
+
+class ImportProfiler(object):
+    """
+    Records wall time, SQL query count and peak traced memory per import
+    stage. A disabled profiler records nothing.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = OrderedDict()
+        self.started = {}
+        self.queries = 0
+        self.depth = 0
+        self.tracing = False
+
+    def __enter__(self):
+        if self.enabled and not self.depth:
+            self.tracing = tracemalloc.is_tracing()
+            if not self.tracing:
+                tracemalloc.start()
+            connection.execute_wrappers.append(self.count_query)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *args):
+        self.depth -= 1
+        if self.enabled and not self.depth:
+            connection.execute_wrappers.remove(self.count_query)
+            if not self.tracing:
+                tracemalloc.stop()
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def begin(self, name):
+        if not self.enabled:
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.started[name] = (time.perf_counter(), self.queries)
+
+    def end(self, name):
+        if not self.enabled or name not in self.started:
+            return
+        started, queries = self.started.pop(name)
+        stage = self.stages.setdefault(
+            name, {'calls': 0, 'time': 0.0, 'queries': 0, 'peak_memory': 0})
+        stage['calls'] += 1
+        stage['time'] += time.perf_counter() - started
+        stage['queries'] += self.queries - queries
+        if tracemalloc.is_tracing():
+            stage['peak_memory'] = max(
+                stage['peak_memory'], tracemalloc.get_traced_memory()[1])
+
+    @contextmanager
+    def stage(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def iterate(self, name, iterable):
+        """
+        Record the time spent producing each item of iterable as a stage.
+        """
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iterable)
+
+    def _iterate(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def as_dict(self):
+        return {
+            'stages': [dict(stage, name=name) for name, stage in self.stages.items()],
+            'time': sum(stage['time'] for stage in self.stages.values()),
+            'queries': sum(stage['queries'] for stage in self.stages.values()),
+        }
+
+    def table(self):
+        """
+        Return recorded stages as a text table.
+        """
+        row = '%-10s %8s %10s %8s %12s'
+        lines = [row % ('Stage', 'Calls', 'Time (s)', 'Queries', 'Peak (MB)')]
+        for name, stage in self.stages.items():
+            lines.append(row % (
+                name, stage['calls'], '%.3f' % stage['time'], stage['queries'],
+                '%.1f' % (stage['peak_memory'] / 2 ** 20)))
+        data = self.as_dict()
+        lines.append(row % ('total', '', '%.3f' % data['time'], data['queries'], ''))
+        return '\n'.join(lines)
+
+
+class NotModified(Exception):
+    """
+    Raised when the data URL payload did not change since the last import.
+    """
 
 
 class Importer(object):
@@ -13,10 +195,22 @@ class Importer(object):
     JSON importer class.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, batch_size=None, incremental=False,
+                 delete_missing=False, workers=None, profile=False,
+                 *args, **kwargs):
         self.location_keys = ['lat', 'lon', 'country', 'town', 'location']
         self.data_url = settings.STRIKE_DATA_URL
-        self.data = None
+        self.batch_size = batch_size or settings.STRIKE_IMPORT_BATCH_SIZE
+        self.incremental = incremental
+        self.delete_missing = delete_missing
+        self.workers = workers or settings.STRIKE_IMPORT_WORKERS
+        self.cache_dir = settings.STRIKE_DATA_CACHE_DIR
+        self.cache_meta = None
+        self.profiler = ImportProfiler(enabled=profile)
+
+    @property
+    def cache_path(self):
+        return os.path.join(self.cache_dir, 'strike.json.gz')
 
     def parse_date(self, date_str):
         """
@@ -33,34 +227,347 @@ class Importer(object):
                 name = name.replace(c, '_')
         return name
 
-    def get_json(self):
+    def get_place(self, location_data):
+        """
+        Return the (country, location, town) geocoding key of raw location
+        data.
+        """
+        return tuple(
+            str(location_data.get(key) or '')
+            for key in ('country', 'location', 'town')
+        )
+
+    def get_hash(self, strike):
+        """
+        Return a content hash of a raw strike record.
+        """
+        content = {key: value for key, value in strike.items() if key != '_id'}
+        return hashlib.sha1(
+            json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def get_cache_meta(self):
         """
-        Download valid JSON data.
+        Return ETag and Last-Modified values of the cached payload.
         """
-        response = urlopen(self.data_url)
+        meta_path = os.path.join(self.cache_dir, 'strike.meta.json')
+        if not os.path.isfile(self.cache_path) or not os.path.isfile(meta_path):
+            return {}
+        with open(meta_path) as meta_file:
+            return json.load(meta_file)
+
+    def save_cache_meta(self):
+        """
+        Store ETag and Last-Modified values of the last fetched payload.
+        """
+        meta_path = os.path.join(self.cache_dir, 'strike.meta.json')
+        with open(meta_path, 'w') as meta_file:
+            json.dump(self.cache_meta, meta_file)
+
+    def fetch(self):
+        """
+        Download the data URL into the cache directory with a conditional,
+        gzip compressed request, and return the cached file path.
+        """
+        meta = self.get_cache_meta()
+        request = Request(self.data_url, headers={'Accept-Encoding': 'gzip'})
+        if meta.get('etag'):
+            request.add_header('If-None-Match', meta['etag'])
+        if meta.get('last_modified'):
+            request.add_header('If-Modified-Since', meta['last_modified'])
+
+        try:
+            response = urlopen(request, timeout=settings.STRIKE_DATA_TIMEOUT)
+        except HTTPError as error:
+            if error.code == 304:
+                raise NotModified('Strike data not modified.')
+            raise ValidationError('Bad request.')
         if response.code != 200:
-            return {'success': False, 'error': 'Bad request.'}
+            raise ValidationError('Bad request.')
+
+        # Store the payload gzip compressed, as sent or compressed locally.
+        os.makedirs(self.cache_dir, exist_ok=True)
+        part_path = self.cache_path + '.part'
+        if response.headers.get('Content-Encoding') == 'gzip':
+            with open(part_path, 'wb') as cache_file:
+                shutil.copyfileobj(response, cache_file)
+        else:
+            with gzip.open(part_path, 'wb') as cache_file:
+                shutil.copyfileobj(response, cache_file)
+        os.replace(part_path, self.cache_path)
+
+        self.cache_meta = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        return self.cache_path
+
+    def open_file(self, path):
+        """
+        Open a local JSON snapshot, gzip compressed if path ends with .gz.
+        """
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
+
+    def iter_strikes(self, stream):
+        """
+        Parse strike records one at a time from a JSON file object.
+
+        The top-level status is checked as soon as it is parsed; a status
+        following the strike array fails the import when the stream ends.
+        """
+        status = None
+        builder = None
         try:
-            data = json.loads(response.read().decode())
-        except json.JSONDecodeError:
-            return {'success': False, 'error': 'Not a valid JSON file.'}
+            for prefix, event, value in ijson.parse(stream, use_float=True):
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == 'strike.item' and event == 'end_map':
+                        yield builder.value
+                        builder = None
+                elif prefix == 'strike.item' and event == 'start_map':
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                elif prefix == 'status':
+                    status = value
+                    if status != 'OK':
+                        raise ValidationError('Data not valid.')
+        except ijson.JSONError:
+            raise ValidationError('Not a valid JSON file.')
 
-        if data['status'] != 'OK':
-            return {'success': False, 'error': 'Data not valid.'}
+        if status != 'OK':
+            raise ValidationError('Data not valid.')
 
-        self.data = {'success': True, 'data': data}
-        return self.data
+    def load_existing(self):
+        """
+        Fetch existing countries, locations, strike hashes, pending strike
+        numbers and geocoded places in one query each, and reset the pending
+        bulk write queues.
+        """
+        self.countries = {c.name: c for c in Country.objects.all()}
+        self.locations = LocationIndex().load()
+        self.strikes = {
+            number: (strike_id, content_hash)
+            for strike_id, number, content_hash in
+            Strike.objects.values_list('id', 'number', 'content_hash')
+        }
+        self.pending_numbers = set(
+            PendingStrike.objects.values_list('number', flat=True))
+        self.geocoded = {
+            (country, location, town): (str(lat), str(lon))
+            for country, location, town, lat, lon in
+            GeocodedPlace.objects.exclude(lat=None).exclude(lon=None).values_list(
+                'country', 'location', 'town', 'lat', 'lon')
+        }
+        self.handled = set()
+        self.feed_numbers = set()
+        self.pending = {
+            'countries': [], 'locations': [], 'strikes': [], 'updates': [],
+            'pending_strikes': []}
+
+    def flush(self):
+        """
+        Write pending objects with batched bulk inserts and updates, parents
+        first.
+        """
+        Country.objects.bulk_create(
+            self.pending['countries'], batch_size=self.batch_size)
+
+        for location in self.pending['locations']:
+            location.country_id = location.country.id
+        Location.objects.bulk_create(
+            self.pending['locations'], batch_size=self.batch_size)
+
+        for strike in self.pending['strikes'] + self.pending['updates']:
+            strike.location_id = strike.location.id
+        Strike.objects.bulk_create(
+            self.pending['strikes'], batch_size=self.batch_size)
+        if self.pending['updates']:
+            fields = [
+                field.name for field in Strike._meta.concrete_fields
+                if not field.primary_key and field.name != 'number'
+            ]
+            Strike.objects.bulk_update(
+                self.pending['updates'], fields, batch_size=self.batch_size)
+
+        written = self.pending['strikes'] + self.pending['updates']
+        if written:
+            Strike.objects.filter(
+                id__in=[strike.id for strike in written]).update_search_vector()
+
+        PendingStrike.objects.bulk_create(
+            self.pending['pending_strikes'], batch_size=self.batch_size)
 
+        self.pending = {
+            'countries': [], 'locations': [], 'strikes': [], 'updates': [],
+            'pending_strikes': []}
 
-    def import_data(self):
+    def normalize_strike(self, strike):
         """
-        Main import method.
+        Validate a single raw strike record without database access.
+
+        Returns the record number and content hash, the validated country,
+        location and strike data, and an error key for skipped records.
+        """
+        record = {
+            'number': strike.get('number'),
+            'content_hash': self.get_hash(strike),
+            'error': None,
+        }
+
+        # Set location_data
+        location_data = {}
+        for key in self.location_keys:
+            location_data[key] = strike.pop(key, None)
+
+        # Keep the raw record of strikes without coordinates for geocoding.
+        if location_data['lat'] == '' or location_data['lon'] == '':
+            record['error'] = 'missing_lat' if location_data['lat'] == '' else 'missing_lon'
+            record['place'] = self.get_place(location_data)
+            record['raw'] = dict(strike, **location_data)
+            return record
+
+        # Set strike data
+        strike.pop('_id')
+        strike['date'] = self.parse_date(strike['date'])
+
+        # Validate location and strike data.
+        record['country'] = self.parse_name(location_data.pop('country'))
+        location_serializer = LocationImportSerializer(data=location_data)
+        strike_serializer = StrikeImportSerializer(data=strike)
+        if not location_serializer.is_valid() or not strike_serializer.is_valid():
+            record['error'] = 'invalid'
+            return record
+
+        record['location'] = location_serializer.validated_data
+        record['strike'] = strike_serializer.validated_data
+        return record
+
+    def normalize_chunks(self, strikes):
+        """
+        Yield lists of normalized records, one per chunk of batch_size raw
+        records, in feed order.
+
+        With more than one worker, chunks are normalized in a process pool,
+        keeping at most two chunks per worker in flight.
+        """
+        if self.workers <= 1:
+            for chunk in chunks(strikes, self.batch_size):
+                with self.profiler.stage('validate'):
+                    records = normalize_chunk(chunk)
+                yield records
+            return
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+        with executor:
+            futures = deque()
+            for chunk in chunks(strikes, self.batch_size):
+                futures.append(executor.submit(normalize_chunk, chunk))
+                if len(futures) > self.workers * 2:
+                    with self.profiler.stage('validate'):
+                        records = futures.popleft().result()
+                    yield records
+            while futures:
+                with self.profiler.stage('validate'):
+                    records = futures.popleft().result()
+                yield records
+
+    def queue_pending_strike(self, record, counter):
+        """
+        Queue a strike without coordinates for geocoding, unless it is
+        already pending.
+        """
+        if record['error'] == 'missing_lat':
+            counter['missing_coor'] += 1
+
+        number = record['number']
+        if not isinstance(number, int) or number in self.pending_numbers:
+            return
+        if number in self.strikes:
+            return
+        self.pending_numbers.add(number)
+        country, location, town = record['place']
+        self.pending['pending_strikes'].append(PendingStrike(
+            number=number, country=country, location=location, town=town,
+            data=record['raw']))
+
+    def import_record(self, record, counter):
+        """
+        Queue a normalized strike record for writing.
+        """
+        self.feed_numbers.add(record['number'])
+
+        # Fill in geocoded coordinates, or queue the strike for geocoding.
+        if record['error'] in ('missing_lat', 'missing_lon'):
+            coordinates = self.geocoded.get(record['place'])
+            if coordinates is None:
+                self.queue_pending_strike(record, counter)
+                return
+            lat, lon = coordinates
+            record = self.normalize_strike(dict(record['raw'], lat=lat, lon=lon))
+
+        # Skip strikes handled earlier in the feed, existing strikes,
+        # and in incremental mode only changed strikes are kept.
+        number = record['number']
+        existing = self.strikes.get(number)
+        if number in self.handled:
+            return
+        if existing is not None and not self.incremental:
+            return
+        if existing is not None and existing[1] == record['content_hash']:
+            self.handled.add(number)
+            counter['unchanged'] += 1
+            return
+        if record['error']:
+            return
+        self.handled.add(number)
+
+        # Get or queue country, and update counter.
+        country = self.countries.get(record['country'])
+        if country is None:
+            country = Country(name=record['country'])
+            self.countries[record['country']] = country
+            self.pending['countries'].append(country)
+            counter['countries'] += 1
+
+        # Get or queue location, and update counter.
+        location = self.locations.get(
+            record['location']['lat'], record['location']['lon'])
+        if location is None:
+            location = Location(country=country, **record['location'])
+            location.set_point()
+            self.locations.add(location)
+            self.pending['locations'].append(location)
+            counter['locations'] += 1
+
+        # Queue strike insert or update, and update counter.
+        strike = Strike(
+            location=location, content_hash=record['content_hash'],
+            **record['strike'])
+        strike.set_casualty_counts()
+        if existing is None:
+            self.pending['strikes'].append(strike)
+            counter['strikes'] += 1
+        else:
+            strike.id = existing[0]
+            self.pending['updates'].append(strike)
+            counter['updated'] += 1
+
+    def import_strikes(self, strikes):
         """
-        # Load json_data if not already loaded.
-        if self.data is None:
-            json_data = self.get_json()
-            if not json_data['success']:
-                raise ValidationError(json_data['error'])
+        Import an iterable of raw strike records in a single transaction.
+
+        Existing rows are fetched up front, and records are normalized, in
+        parallel with more than one worker, and written by this process in
+        chunks of batch_size strikes. In incremental mode, strikes whose
+        content hash changed are updated, and with delete_missing, strikes no
+        longer present in the feed are deleted.
+        """
+        strikes = self.profiler.iterate('decode', strikes)
 
         with transaction.atomic():
             counter = {
@@ -69,53 +576,131 @@ class Importer(object):
                 'strikes': 0,
                 'missing_coor': 0,
             }
+            if self.incremental:
+                counter.update({'updated': 0, 'unchanged': 0, 'deleted': 0})
+            with self.profiler.stage('prefetch'):
+                self.load_existing()
+
+            for records in self.normalize_chunks(strikes):
+                with self.profiler.stage('resolve'):
+                    for record in records:
+                        self.import_record(record, counter)
+                with self.profiler.stage('write'):
+                    self.flush()
+
+            # Delete strikes that vanished from the feed.
+            if self.incremental and self.delete_missing:
+                missing = set(self.strikes) - self.feed_numbers
+                if missing:
+                    with self.profiler.stage('delete'):
+                        counter['deleted'], _ = Strike.objects.filter(
+                            number__in=missing).delete()
+
+            # Rebuild derived data when anything was written.
+            changed = any(
+                counter[key] for key in counter if key not in ('unchanged', 'missing_coor'))
+            if changed:
+                with self.profiler.stage('suggestions'):
+                    Suggestion.objects.rebuild()
+
+            self.profiler.begin('commit')
+        self.profiler.end('commit')
+
+        # Invalidate cached views of the dataset.
+        if changed:
+            bump_dataset_version()
+
+        return counter
 
-            # Copy the list
-            strikes = self.data['data']['strike'][:]
-
-            for strike in strikes:
-                # Set location_data
-                location_data = {}
-                for key in self.location_keys:
-                    location_data[key] = strike.pop(key, None)
-
-                # TODO: store this in an array and call Google Maps API to
-                #       fetch missing coordinates
-                #       https://trello.com/c/eaBQwQ02
-                if location_data['lat'] == '':
-                    # location_data['lat'] = None
-                    counter['missing_coor'] += 1
-                    continue
-                if location_data['lon'] == '':
-                    # location_data['lon'] = None
-                    continue
-
-                # Set strike data
-                strike.pop('_id')
-                strike['date'] = self.parse_date(strike['date'])
-
-                # Create country, and update counter and fk.
-                location_data['country'] = self.parse_name(
-                    location_data['country'])
-                country, created = Country.objects.get_or_create(
-                    name=location_data.pop('country', None))
-                location_data['country'] = country.id
-                if created:
-                    counter['countries'] += 1
-
-                # Create location, and update counter and fk.
-                serializer = LocationSerializer(data=location_data)
-                if serializer.is_valid():
-                    location_id = serializer.save().id
-                    counter['locations'] += 1
-                elif str(serializer.errors.get('error', ['', ])[0]) == 'Location already exists.':
-                    location_id = str(serializer.errors['instance'][0])
-
-                # Create strike and update counter.
-                strike['location'] = location_id
-                serializer = StrikeSerializer(data=strike)
-                if serializer.is_valid():
-                    serializer.save()
-                    counter['strikes'] += 1
+    def import_data(self, stream=None):
+        """
+        Main import method.
+
+        Strikes are parsed one at a time from stream, or from the fetched
+        data URL payload.
+        """
+        with self.profiler:
+            if stream is not None:
+                return self.import_strikes(self.iter_strikes(stream))
+
+            with self.profiler.stage('download'):
+                path = self.fetch()
+            with self.open_file(path) as stream:
+                counter = self.import_strikes(self.iter_strikes(stream))
+            self.save_cache_meta()
+            return counter
+
+
+class GeocodeBackfill(object):
+    """
+    Geocodes the places of pending strikes and imports resolved strikes.
+    """
 
+    def __init__(self, geocoder=None, batch_size=None, concurrency=None,
+                 rate_limit=None):
+        self.geocoder = geocoder or get_geocoder()
+        self.batch_size = batch_size or settings.STRIKE_GEOCODE_BATCH_SIZE
+        self.concurrency = concurrency or settings.STRIKE_GEOCODE_CONCURRENCY
+        self.rate_limiter = RateLimiter(
+            rate_limit or settings.STRIKE_GEOCODE_RATE_LIMIT)
+
+    def get_places(self):
+        """
+        Return places of pending strikes that were never geocoded.
+        """
+        places = set(PendingStrike.objects.values_list(
+            'country', 'location', 'town').distinct())
+        geocoded = set(GeocodedPlace.objects.values_list(
+            'country', 'location', 'town'))
+        return sorted(places - geocoded)
+
+    def geocode_place(self, place):
+        """
+        Geocode a single place, waiting for the rate limiter.
+        """
+        self.rate_limiter.wait()
+        try:
+            return place, self.geocoder.geocode(*place), None
+        except GeocodeError as error:
+            return place, None, error
+
+    def geocode(self):
+        """
+        Geocode places in batches, with at most concurrency lookups in
+        flight. Found and not found places are stored, failed lookups are
+        retried on the next run.
+        """
+        counter = {'places': 0, 'found': 0, 'not_found': 0, 'errors': 0}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for batch in chunks(self.get_places(), self.batch_size):
+                geocoded = []
+                for place, coordinates, error in executor.map(self.geocode_place, batch):
+                    counter['places'] += 1
+                    if error is not None:
+                        counter['errors'] += 1
+                        continue
+
+                    country, location, town = place
+                    lat, lon = coordinates or (None, None)
+                    counter['found' if coordinates else 'not_found'] += 1
+                    geocoded.append(GeocodedPlace(
+                        country=country, location=location, town=town,
+                        lat=lat, lon=lon))
+                GeocodedPlace.objects.bulk_create(geocoded)
+
+        return counter
+
+    def import_resolved(self):
+        """
+        Reimport pending strikes through the importer, which fills in
+        geocoded coordinates, and delete pending strikes that were imported.
+        """
+        importer = Importer()
+        strikes = (
+            pending.data for pending in
+            PendingStrike.objects.order_by('number').iterator())
+        counter = importer.import_strikes(strikes)
+        counter['resolved'], _ = PendingStrike.objects.filter(
+            number__in=Strike.objects.values('number')).delete()
         return counter
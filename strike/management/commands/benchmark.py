@@ -0,0 +1,49 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from strike.benchmarks import Benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks import_data, the map page, search and nearest strikes against '
+        'synthetic datasets, in a temporary test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,10000,100000,1000000',
+            help='Comma separated numbers of strikes.')
+        parser.add_argument(
+            '--repeat', type=int, default=5, help='Requests per view and size.')
+        parser.add_argument(
+            '--search-query', default='pakistan',
+            help='Search view query, which must match synthetic strikes.')
+        parser.add_argument(
+            '--json', default=None, help='Write results to this JSON file.')
+        parser.add_argument(
+            '--keepdb', action='store_true', help='Preserve the test database.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        benchmark = Benchmark(
+            sizes, repeat=options['repeat'], search_query=options['search_query'])
+
+        def report(results):
+            self.stdout.write(Benchmark.table(results))
+
+        setup_test_environment()
+        runner = DiscoverRunner(keepdb=options['keepdb'], interactive=False, verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            results = benchmark.run(callback=report)
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['json']:
+            with open(options['json'], 'w') as json_file:
+                json.dump(results, json_file, indent=2)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from strike.partitions import create_partitions
+
+
+class Command(BaseCommand):
+    help = 'Creates the missing yearly strike partitions, e.g. yearly from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years-ahead', type=int, default=None,
+            help='Years after the current one to create, STRIKE_PARTITION_YEARS_AHEAD by default.')
+
+    def handle(self, *args, **options):
+        created = create_partitions(options['years_ahead'])
+        for name in created:
+            self.stdout.write('Created %s.' % name)
+        self.stdout.write(self.style.SUCCESS('Created %d partitions.' % len(created)))
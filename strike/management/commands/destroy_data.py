@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from strike.models import Strike, Location, Country
+from strike.cache import bump_dataset_version
+from strike.models import Strike, Location, Country, PendingStrike, Suggestion
 
 
 class Command(BaseCommand):
@@ -9,5 +10,8 @@ class Command(BaseCommand):
         Strike.objects.all().delete()
         Location.objects.all().delete()
         Country.objects.all().delete()
+        PendingStrike.objects.all().delete()
+        Suggestion.objects.all().delete()
+        bump_dataset_version()
 
         self.stdout.write(self.style.SUCCESS('Strike objects successfully deleted.'))
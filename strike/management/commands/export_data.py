@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from strike.exports import FORMATS, export
+from strike.forms import StrikeFilterForm
+
+
+class Command(BaseCommand):
+    help = 'Exports strikes matching the map filters as csv or ndjson.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS), default='csv', help='Export format.')
+        parser.add_argument(
+            '--daterange', default='01/01/1900 - 12/31/2100',
+            help="Date range, 'mm/dd/yyyy - mm/dd/yyyy'.")
+        parser.add_argument('--country', default='all', help='Country name.')
+        parser.add_argument('--province', default='', help='Province.')
+        parser.add_argument('--town', default='', help='City / town.')
+        parser.add_argument('--min-deaths', default='', help='Minimum deaths.')
+        parser.add_argument('--min-civilians', default='', help='Minimum civilians.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Rows fetched per server-side cursor round trip.')
+        parser.add_argument(
+            '--output', default=None, help='Output file, stdout by default.')
+
+    def handle(self, *args, **options):
+        form = StrikeFilterForm(data={
+            'daterange': options['daterange'],
+            'country__name': options['country'],
+            'province': options['province'],
+            'town': options['town'],
+            'min_deaths': options['min_deaths'],
+            'min_civilians': options['min_civilians'],
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        lines = export(form.get_strikes(), options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,37 @@
+import gzip
+from django.core.management.base import BaseCommand
+from strike.synthetic import SyntheticFeed
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic strike feed in the dronestre.am JSON format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', help='Output file path, gzip compressed if it ends with .gz.')
+        parser.add_argument(
+            '--strikes', type=int, default=1000, help='Number of strikes.')
+        parser.add_argument(
+            '--locations', type=int, default=100, help='Number of locations.')
+        parser.add_argument(
+            '--countries', type=int, default=5, help='Number of countries.')
+        parser.add_argument(
+            '--seed', type=int, default=0, help='Random seed.')
+
+    def handle(self, *args, **options):
+        feed = SyntheticFeed(
+            strikes=options['strikes'],
+            locations=options['locations'],
+            countries=options['countries'],
+            seed=options['seed'],
+        )
+
+        if options['output'].endswith('.gz'):
+            output = gzip.open(options['output'], 'wt')
+        else:
+            output = open(options['output'], 'w')
+        with output:
+            feed.write(output)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Generated %d strikes: %s' % (feed.strikes, options['output'])))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from strike.geocoders import get_geocoder
+from strike.helpers import GeocodeBackfill
+
+
+class Command(BaseCommand):
+    help = 'Geocodes pending strikes with missing coordinates and imports them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', default=None,
+            help='Dotted path of the geocoder backend class.')
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Number of places geocoded per batch.')
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Maximum number of concurrent geocoding requests.')
+        parser.add_argument(
+            '--rate-limit', type=float, default=None,
+            help='Maximum number of geocoding requests per second.')
+
+    def handle(self, *args, **options):
+        backfill = GeocodeBackfill(
+            geocoder=get_geocoder(options['backend']),
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            rate_limit=options['rate_limit'],
+        )
+
+        status = backfill.geocode()
+        output = (
+            'Geocoded places: %d\n\tFound: %d\n\tNot found: %d\n'
+            % (status['places'], status['found'], status['not_found'])
+        )
+        self.stdout.write(self.style.SUCCESS(output))
+        if status['errors']:
+            warning = 'Failed geocoding requests: %d.' % status['errors']
+            self.stdout.write(self.style.WARNING(warning))
+
+        status = backfill.import_resolved()
+        output = (
+            'Created/updated: \n\tLocations: %d\n\tCountries: %d\n\tStrikes: %d\n'
+            % (status['locations'], status['countries'], status['strikes'])
+        )
+        self.stdout.write(self.style.SUCCESS(output))
@@ -1,22 +1,72 @@
+import json
 from django.core.management.base import BaseCommand, CommandError
 from django.core.exceptions import ValidationError
-from strike.helpers import Importer
+from strike.helpers import Importer, NotModified
 
 
 class Command(BaseCommand):
     help = 'Imports json data from https://api.dronestre.am.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Number of strikes written per bulk insert.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of processes normalizing and validating strikes.')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Update strikes whose content changed instead of skipping them.')
+        parser.add_argument(
+            '--delete-missing', action='store_true',
+            help='Delete strikes missing from the feed (requires --incremental).')
+        parser.add_argument(
+            '--from-file', default=None,
+            help='Import a local .json or .json.gz snapshot instead of the data URL.')
+        parser.add_argument(
+            '--profile', action='store_true',
+            help='Print wall time, query count and peak memory per import stage.')
+        parser.add_argument(
+            '--profile-json', default=None,
+            help='Write the import profile to this JSON file (implies --profile).')
+
     def handle(self, *args, **options):
-        importer = Importer()
+        if options['delete_missing'] and not options['incremental']:
+            raise CommandError('--delete-missing requires --incremental.')
+
+        importer = Importer(
+            batch_size=options['batch_size'],
+            incremental=options['incremental'],
+            delete_missing=options['delete_missing'],
+            workers=options['workers'],
+            profile=options['profile'] or bool(options['profile_json']),
+        )
         try:
-            status = importer.import_data()
+            if options['from_file']:
+                with importer.open_file(options['from_file']) as stream:
+                    status = importer.import_data(stream)
+            else:
+                status = importer.import_data()
             output = (
                 'Created/updated: \n\tLocations: %d\n\tCountries: %d\n\tStrikes: %d\n'
                 % (status['locations'], status['countries'], status['strikes'])
             )
+            if options['incremental']:
+                output += (
+                    '\tUpdated strikes: %d\n\tUnchanged strikes: %d\n\tDeleted strikes: %d\n'
+                    % (status['updated'], status['unchanged'], status['deleted'])
+                )
             self.stdout.write(self.style.SUCCESS(output))
             if status['missing_coor']:
                 warning = 'Missing location coordinates: %d.' % status['missing_coor']
                 self.stdout.write(self.style.WARNING(warning))
+        except NotModified as error:
+            self.stdout.write(self.style.SUCCESS(str(error)))
         except ValidationError as error:
             raise CommandError(error.message)
+
+        if importer.profiler.enabled:
+            self.stdout.write(importer.profiler.table())
+        if options['profile_json']:
+            with open(options['profile_json'], 'w') as profile_file:
+                json.dump(importer.profiler.as_dict(), profile_file, indent=2)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from strike.cache import get_dataset_version
+from strike.tiles import seed
+
+
+class Command(BaseCommand):
+    help = 'Builds the vector tiles of all strikes up to a zoom level, e.g. after import_data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-zoom', type=int, default=None,
+            help='Highest zoom level seeded, STRIKE_TILE_SEED_ZOOM by default.')
+
+    def handle(self, *args, **options):
+        max_zoom = options['max_zoom']
+        if max_zoom is None:
+            max_zoom = settings.STRIKE_TILE_SEED_ZOOM
+        count = seed(get_dataset_version(), max_zoom)
+        self.stdout.write(self.style.SUCCESS('Seeded %d tiles.' % count))
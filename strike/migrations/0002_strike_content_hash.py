@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strike',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:52
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0002_strike_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingStrike',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(unique=True)),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('town', models.CharField(blank=True, max_length=255)),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GeocodedPlace',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('town', models.CharField(blank=True, max_length=255)),
+                ('lat', models.DecimalField(blank=True, decimal_places=9, max_digits=12, null=True)),
+                ('lon', models.DecimalField(blank=True, decimal_places=9, max_digits=12, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('country', 'location', 'town')},
+            },
+        ),
+    ]
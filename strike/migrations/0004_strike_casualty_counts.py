@@ -0,0 +1,53 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0003_pendingstrike_geocodedplace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strike',
+            name='children_high',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strike',
+            name='children_low',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strike',
+            name='civilians_high',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strike',
+            name='civilians_low',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strike',
+            name='deaths_high',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strike',
+            name='deaths_low',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strike',
+            name='injuries_high',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strike',
+            name='injuries_low',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+import re
+from django.db import migrations
+
+
+CASUALTY_FIELDS = ('deaths', 'civilians', 'injuries', 'children')
+
+
+def parse_casualties(value):
+    """
+    Parse a casualty string such as '4', '6-8' or '' into a (low, high)
+    tuple of integers, or (None, None) if it contains no numbers. Frozen
+    copy of strike.models.parse_casualties as of this migration.
+    """
+    numbers = [int(number) for number in re.findall(r'\d+', value or '')]
+    if not numbers:
+        return None, None
+    return min(numbers), max(numbers)
+
+
+def fill_casualty_counts(apps, schema_editor):
+    """
+    Parse the casualty strings of existing strikes into the integer columns.
+    """
+    Strike = apps.get_model('strike', 'Strike')
+    fields = [field + suffix for field in CASUALTY_FIELDS for suffix in ('_low', '_high')]
+
+    strikes = []
+    for strike in Strike.objects.only(*CASUALTY_FIELDS + ('deaths_min', 'deaths_max')).iterator():
+        for field in CASUALTY_FIELDS:
+            low, high = parse_casualties(getattr(strike, field))
+            if field == 'deaths' and low is None:
+                low = parse_casualties(strike.deaths_min)[0]
+                high = parse_casualties(strike.deaths_max)[1]
+            setattr(strike, field + '_low', low)
+            setattr(strike, field + '_high', high)
+        strikes.append(strike)
+
+        if len(strikes) == 1000:
+            Strike.objects.bulk_update(strikes, fields)
+            strikes = []
+    Strike.objects.bulk_update(strikes, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0004_strike_casualty_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_casualty_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:01
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+# Frozen copy of strike.models.SEARCH_VECTOR_SQL as of this migration.
+SEARCH_VECTOR_SQL = """
+    UPDATE strike_strike SET search_vector =
+        setweight(to_tsvector(%s::regconfig, coalesce(strike_strike.narrative, '')), 'A') ||
+        setweight(to_tsvector(%s::regconfig, coalesce(strike_strike.bij_summary_short, '')), 'A') ||
+        setweight(to_tsvector(%s::regconfig, coalesce(strike_strike.target, '')), 'B') ||
+        setweight(to_tsvector(%s::regconfig, array_to_string(strike_strike.names, ' ')), 'B') ||
+        setweight(to_tsvector(%s::regconfig, concat_ws(
+            ' ', replace(strike_country.name, '_', ' '), strike_location.location,
+            strike_location.town)), 'C') ||
+        setweight(to_tsvector(%s::regconfig, array_to_string(strike_strike.articles, ' ')), 'D')
+    FROM strike_location
+    JOIN strike_country ON strike_country.id = strike_location.country_id
+    WHERE strike_location.id = strike_strike.location_id
+"""
+
+
+def fill_search_vector(apps, schema_editor):
+    """
+    Compute the search vector of existing strikes.
+    """
+    schema_editor.execute(
+        SEARCH_VECTOR_SQL, [settings.STRIKE_SEARCH_CONFIG] * SEARCH_VECTOR_SQL.count('%s'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0005_fill_casualty_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strike',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='strike',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='strike_stri_search__43160c_gin'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
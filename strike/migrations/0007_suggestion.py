@@ -0,0 +1,78 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+# Frozen copy of strike.models.SUGGESTION_SQL as of this migration.
+SUGGESTION_SQL = """
+    INSERT INTO strike_suggestion (kind, value, key, country)
+    SELECT DISTINCT kind, trim(value), lower(trim(value)), country FROM (
+        SELECT 'country' AS kind, name AS value, '' AS country FROM strike_country
+        UNION ALL
+        SELECT 'province', strike_location.location, strike_country.name
+        FROM strike_location
+        JOIN strike_country ON strike_country.id = strike_location.country_id
+        UNION ALL
+        SELECT 'town', strike_location.town, strike_country.name
+        FROM strike_location
+        JOIN strike_country ON strike_country.id = strike_location.country_id
+        UNION ALL
+        SELECT 'target', target, '' FROM strike_strike
+        UNION ALL
+        SELECT 'name', name, '' FROM strike_strike,
+        unnest(string_to_array(array_to_string(strike_strike.names, ','), ',')) AS name
+    ) AS suggestions
+    WHERE trim(value) <> '' AND length(trim(value)) <= 255
+"""
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Index suggestion keys for similarity lookups when pg_trgm is available.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX strike_suggestion_key_trgm ON strike_suggestion '
+        'USING gin (key gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS strike_suggestion_key_trgm')
+
+
+def fill_suggestions(apps, schema_editor):
+    schema_editor.execute(SUGGESTION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0006_strike_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('country', 'Country'), ('province', 'Province'), ('town', 'City / Town'), ('target', 'Target'), ('name', 'Name')], max_length=10)),
+                ('value', models.CharField(max_length=255)),
+                ('key', models.CharField(editable=False, max_length=255)),
+                ('country', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='suggestion',
+            index=models.Index(fields=['key'], name='strike_suggestion_key_like', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AlterUniqueTogether(
+            name='suggestion',
+            unique_together={('kind', 'value', 'country')},
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(fill_suggestions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:09
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import strike.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0007_suggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='point',
+            field=strike.fields.PointField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            'UPDATE strike_location SET point = point(lon, lat) '
+            'WHERE lat IS NOT NULL AND lon IS NOT NULL',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['point'], name='strike_loca_point_cef508_gist'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:47
+
+from datetime import date
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Partitioning helpers as of this migration, not imported from
+# strike.partitions so that later changes there cannot alter it.
+TABLE = 'strike_strike'
+DEFAULT_PARTITION = 'strike_strike_default'
+
+
+def create_partition(cursor, year):
+    """
+    Create the partition of strikes dated in year, moving its strikes out of
+    the default partition.
+    """
+    name = '%s_y%d' % (TABLE, year)
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    cursor.execute(
+        'CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)' % (name, TABLE))
+    cursor.execute(
+        'WITH moved AS (DELETE FROM %s WHERE date >= %%s AND date < %%s RETURNING *) '
+        'INSERT INTO %s SELECT * FROM moved' % (DEFAULT_PARTITION, name), [start, end])
+    cursor.execute(
+        'ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM (%%s) TO (%%s)' % (TABLE, name),
+        [start, end])
+
+
+def rebuild_table(cursor, partitioned):
+    """
+    Recreate the strike table, range partitioned by date or as a plain table,
+    keeping its rows, sequence, foreign keys and non-unique indexes.
+    Partitions cover the earliest strike, or the current year, to
+    STRIKE_PARTITION_YEARS_AHEAD after the current year.
+    """
+    cursor.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+    """, [TABLE])
+    foreign_keys = cursor.fetchall()
+    cursor.execute("""
+        SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN (
+            SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)
+    """, [TABLE, TABLE])
+    indexes = [indexdef.replace(' ON ONLY ', ' ON ') for indexdef, in cursor.fetchall()]
+
+    old_table = TABLE + '_old'
+    cursor.execute('ALTER TABLE %s RENAME TO %s' % (TABLE, old_table))
+    cursor.execute('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)%s' % (
+        TABLE, old_table, ' PARTITION BY RANGE (date)' if partitioned else ''))
+    cursor.execute('ALTER SEQUENCE %s_id_seq OWNED BY %s.id' % (TABLE, TABLE))
+    if partitioned:
+        cursor.execute('CREATE TABLE %s PARTITION OF %s DEFAULT' % (DEFAULT_PARTITION, TABLE))
+        cursor.execute('SELECT min(date) FROM %s' % old_table)
+        first_date = cursor.fetchone()[0]
+        current_year = date.today().year
+        first_year = min(first_date.year, current_year) if first_date else current_year
+        for year in range(first_year, current_year + settings.STRIKE_PARTITION_YEARS_AHEAD + 1):
+            create_partition(cursor, year)
+    cursor.execute('INSERT INTO %s SELECT * FROM %s' % (TABLE, old_table))
+    cursor.execute('DROP TABLE %s' % old_table)
+
+    cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s_pkey PRIMARY KEY (%s)' % (
+        TABLE, TABLE, 'id, date' if partitioned else 'id'))
+    for name, definition in foreign_keys:
+        cursor.execute('ALTER TABLE %s ADD CONSTRAINT %s %s' % (TABLE, name, definition))
+    for indexdef in indexes:
+        cursor.execute(indexdef)
+
+
+def partition_strikes(apps, schema_editor):
+    """
+    Range partition the strike table by date, one partition per year.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        rebuild_table(cursor, partitioned=True)
+
+
+def unpartition_strikes(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        rebuild_table(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0008_location_point'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='strike',
+            name='number',
+            field=models.PositiveIntegerField(db_index=True),
+        ),
+        migrations.RunPython(partition_strikes, unpartition_strikes),
+        migrations.AddIndex(
+            model_name='strike',
+            index=models.Index(fields=['date'], name='strike_stri_date_0bc6d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='strike',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['date'], name='strike_stri_date_8baee6_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='strike',
+            index=models.Index(fields=['location', 'date'], name='strike_stri_locatio_34cd91_idx'),
+        ),
+    ]
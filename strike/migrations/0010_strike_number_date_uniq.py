@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('strike', '0009_strike_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='strike',
+            constraint=models.UniqueConstraint(fields=('number', 'date'), name='strike_number_date_uniq'),
+        ),
+    ]
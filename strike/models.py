@@ -1,10 +1,141 @@
-from django.contrib.postgres.fields import ArrayField
-from django.db import models
+import math
+import re
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, GistIndex
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVectorField, TrigramSimilarity)
+from django.core.exceptions import ValidationError
+from django.db import connection, models
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt, Trunc
+from .fields import Box, Point, PointDistance, PointField
+
+
+# Weighted search document of strikes, joined with their location text.
+SEARCH_VECTOR_SQL = """
+    UPDATE strike_strike SET search_vector =
+        setweight(to_tsvector(%s::regconfig, coalesce(strike_strike.narrative, '')), 'A') ||
+        setweight(to_tsvector(%s::regconfig, coalesce(strike_strike.bij_summary_short, '')), 'A') ||
+        setweight(to_tsvector(%s::regconfig, coalesce(strike_strike.target, '')), 'B') ||
+        setweight(to_tsvector(%s::regconfig, array_to_string(strike_strike.names, ' ')), 'B') ||
+        setweight(to_tsvector(%s::regconfig, concat_ws(
+            ' ', replace(strike_country.name, '_', ' '), strike_location.location,
+            strike_location.town)), 'C') ||
+        setweight(to_tsvector(%s::regconfig, array_to_string(strike_strike.articles, ' ')), 'D')
+    FROM strike_location
+    JOIN strike_country ON strike_country.id = strike_location.country_id
+    WHERE strike_location.id = strike_strike.location_id
+"""
+
+
+def parse_casualties(value):
+    """
+    Parse a casualty string such as '4', '6-8' or '' into a (low, high)
+    tuple of integers, or (None, None) if it contains no numbers.
+    """
+    numbers = [int(number) for number in re.findall(r'\d+', value or '')]
+    if not numbers:
+        return None, None
+    return min(numbers), max(numbers)
+
+
+def get_search_vector_params():
+    """
+    Return the SEARCH_VECTOR_SQL parameters: the text search configuration.
+    """
+    return [settings.STRIKE_SEARCH_CONFIG] * SEARCH_VECTOR_SQL.count('%s')
+
+
+class StrikeQuerySet(models.QuerySet):
+
+    def update_search_vector(self):
+        """
+        Recompute the stored search vector of the strikes in this queryset
+        in a single UPDATE.
+        """
+        sql, params = self.values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                SEARCH_VECTOR_SQL + ' AND strike_strike.id IN (%s)' % sql,
+                get_search_vector_params() + list(params))
+
+    def search(self, query, ranked=True):
+        """
+        Full-text search, each word matching as a prefix, ranked by weight
+        unless ranked is False.
+        """
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return self.none()
+
+        search_query = SearchQuery(
+            ' & '.join(term + ':*' for term in terms),
+            config=settings.STRIKE_SEARCH_CONFIG, search_type='raw')
+        strikes = self.filter(search_vector=search_query)
+        if not ranked:
+            return strikes
+        return strikes.annotate(
+            rank=SearchRank(models.F('search_vector'), search_query)
+        ).order_by('-rank', 'number')
+
+    def nearest(self, lat, lon, k):
+        """
+        The k strikes closest to lat and lon, annotated with and ordered by
+        their great-circle distance in km, latest first at the same place.
+
+        Candidate locations come from a GiST nearest-neighbour scan, widened
+        until they hold k strikes of this queryset. The farthest of the k
+        closest candidates then bounds an exact radius query.
+        """
+        locations = Location.objects.exclude(point=None).order_by(
+            PointDistance('point', Point(lon, lat))).values_list('id', flat=True)
+        limit = k
+        while True:
+            location_ids = list(locations[:limit])
+            strikes = self.filter(location__in=location_ids)
+            if len(location_ids) < limit or strikes[:k].count() == k:
+                break
+            limit *= 4
+
+        distance = get_distance(lat, lon, 'location__')
+        distances = list(strikes.annotate(distance=distance).order_by(
+            'distance').values_list('distance', flat=True)[:k])
+        if not distances:
+            return self.none()
+        radius = max(distances) + 1e-6
+        return self.filter(
+            location__in=Location.objects.within_radius(lat, lon, radius).values('id')
+        ).annotate(distance=distance).order_by('distance', '-date', 'number')[:k]
+
+    def get_totals(self):
+        totals = {'strikes': models.Count('id')}
+        for field in Strike.casualty_fields:
+            totals[field + '_low'] = models.Sum(field + '_low')
+            totals[field + '_high'] = models.Sum(field + '_high')
+        return totals
+
+    def country_totals(self):
+        """
+        Number of strikes and sums of the casualty ranges per country.
+        """
+        return self.values(country=models.F('location__country__name')).annotate(
+            **self.get_totals()).order_by('country')
+
+    def time_series(self, interval):
+        """
+        Number of strikes and sums of the casualty ranges per country and
+        date bucket, interval being 'day', 'week' or 'month'.
+        """
+        return self.values(
+            country=models.F('location__country__name'),
+            bucket=Trunc('date', interval),
+        ).annotate(**self.get_totals()).order_by('country', 'bucket')
 
 
 class Strike(models.Model):
     location = models.ForeignKey('Location', on_delete=models.CASCADE)
-    number = models.PositiveIntegerField(unique=True)
+    number = models.PositiveIntegerField(db_index=True)
     date = models.DateField(default=None)
     narrative = models.TextField(max_length=1000, blank=True, null=True)
     deaths = models.CharField(max_length=50, blank=True, null=True)
@@ -20,10 +151,151 @@ class Strike(models.Model):
     target = models.CharField(max_length=1000, blank=True, null=True)
     articles = ArrayField(models.CharField(max_length=255, blank=True))
     names = ArrayField(models.CharField(max_length=10000000, blank=True))
+    content_hash = models.CharField(max_length=40, blank=True, null=True, editable=False)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    # Integer ranges parsed from the casualty strings.
+    deaths_low = models.PositiveIntegerField(blank=True, null=True, db_index=True, editable=False)
+    deaths_high = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    civilians_low = models.PositiveIntegerField(blank=True, null=True, db_index=True, editable=False)
+    civilians_high = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    injuries_low = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    injuries_high = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    children_low = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    children_high = models.PositiveIntegerField(blank=True, null=True, editable=False)
+
+    casualty_fields = ('deaths', 'civilians', 'injuries', 'children')
+
+    objects = StrikeQuerySet.as_manager()
+
+    class Meta:
+        # The table is range partitioned by date, one partition per year, see
+        # strike.partitions. Unique constraints must include the date, so
+        # number uniqueness is also checked by validate_unique.
+        indexes = [
+            GinIndex(fields=['search_vector']),
+            models.Index(fields=['date']),
+            BrinIndex(fields=['date']),
+            models.Index(fields=['location', 'date']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['number', 'date'], name='strike_number_date_uniq'),
+        ]
 
     def __str__(self):
         return str(self.number)
 
+    def save(self, *args, **kwargs):
+        self.set_casualty_counts()
+        super(Strike, self).save(*args, **kwargs)
+        Strike.objects.filter(pk=self.pk).update_search_vector()
+
+    def validate_unique(self, exclude=None):
+        """
+        Also reject numbers of other strikes, whatever their date.
+        """
+        super(Strike, self).validate_unique(exclude)
+        if 'number' in (exclude or []) or self.number is None:
+            return
+        if Strike.objects.filter(number=self.number).exclude(pk=self.pk).exists():
+            raise ValidationError({'number': self.unique_error_message(Strike, ('number', ))})
+
+    def set_casualty_counts(self):
+        """
+        Set the integer casualty columns from the casualty strings. Deaths
+        fall back to deaths_min and deaths_max when deaths has no numbers.
+        """
+        for field in self.casualty_fields:
+            low, high = parse_casualties(getattr(self, field))
+            if field == 'deaths' and low is None:
+                low = parse_casualties(self.deaths_min)[0]
+                high = parse_casualties(self.deaths_max)[1]
+            setattr(self, field + '_low', low)
+            setattr(self, field + '_high', high)
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def get_radius_box(lat, lon, km):
+    """
+    Return the (west, south, east, north) bounding box of a circle of km
+    around lat and lon. Boxes reaching a pole or the antimeridian span all
+    longitudes.
+    """
+    lat_delta = math.degrees(km / EARTH_RADIUS_KM)
+    south, north = max(lat - lat_delta, -90), min(lat + lat_delta, 90)
+    cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+    if south == -90 or north == 90 or cos_lat <= 0:
+        return -180, south, 180, north
+    lon_delta = math.degrees(km / (EARTH_RADIUS_KM * cos_lat))
+    if lon - lon_delta < -180 or lon + lon_delta > 180:
+        return -180, south, 180, north
+    return lon - lon_delta, south, lon + lon_delta, north
+
+
+def get_distance(lat, lon, prefix=''):
+    """
+    Haversine great-circle distance in km between lat and lon and the
+    prefix + 'lat' and 'lon' fields.
+    """
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = Radians(prefix + 'lat'), Radians(prefix + 'lon')
+    haversine = (
+        Power(Sin((lat2 - lat1) / 2), 2) +
+        math.cos(lat1) * Cos(lat2) * Power(Sin((lon2 - lon1) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(haversine), output_field=models.FloatField())
+
+
+class LocationQuerySet(models.QuerySet):
+
+    def within_bbox(self, west, south, east, north):
+        """
+        Locations inside a bounding box, using the point GiST index.
+        """
+        return self.filter(point__contained_in=Box(west, south, east, north))
+
+    def within_radius(self, lat, lon, km):
+        """
+        Locations within km of lat and lon, annotated with their great-circle
+        distance in km. Candidates are found with the point GiST index on
+        the enclosing bounding box.
+        """
+        return self.within_bbox(*get_radius_box(lat, lon, km)).annotate(
+            distance=get_distance(lat, lon)
+        ).filter(distance__lte=km)
+
+    def nearest(self, lat, lon, k):
+        """
+        The k locations closest to lat and lon, annotated with and ordered
+        by their great-circle distance in km.
+
+        A GiST nearest-neighbour scan finds the k closest points on the plane,
+        whose farthest great-circle distance then bounds an exact radius query.
+        """
+        candidates = self.exclude(point=None).order_by(
+            PointDistance('point', Point(lon, lat))
+        ).annotate(distance=get_distance(lat, lon)).values_list('distance', flat=True)[:k]
+        distances = list(candidates)
+        if not distances:
+            return self.none()
+        return self.within_radius(lat, lon, max(distances) + 1e-6).order_by('distance')[:k]
+
+    def with_strike_info(self, **filters):
+        """
+        Annotate locations with the number of their strikes matching filters,
+        and prefetch those strikes, for strike_info without further queries.
+        """
+        strikes = Strike.objects.filter(**filters).only(
+            'id', 'location_id', 'number', 'date', 'deaths').order_by('number')
+        strike_filter = models.Q(**{
+            'strike__' + lookup: value for lookup, value in filters.items()})
+        return self.annotate(
+            num_of_strikes=models.Count('strike', filter=strike_filter)
+        ).prefetch_related(
+            models.Prefetch('strike_set', queryset=strikes, to_attr='filtered_strikes'))
+
 
 class Location(models.Model):
     country = models.ForeignKey('Country', on_delete=models.CASCADE)
@@ -31,7 +303,12 @@ class Location(models.Model):
     lon = models.DecimalField(max_digits=12, decimal_places=9, blank=True, null=True)
     town = models.CharField(max_length=255, blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)
+    point = PointField(blank=True, null=True, editable=False)
+
+    objects = LocationQuerySet.as_manager()
 
+    class Meta:
+        indexes = [GistIndex(fields=['point'])]
 
     def __str__(self):
         if self.town:
@@ -40,12 +317,33 @@ class Location(models.Model):
             location = self.country.name
         return '. '.join([str(self.id), location])
 
+    def save(self, *args, **kwargs):
+        self.set_point()
+        super(Location, self).save(*args, **kwargs)
+
+    def set_point(self):
+        """
+        Set the point column from lat and lon.
+        """
+        if self.lat is None or self.lon is None:
+            self.point = None
+        else:
+            self.point = Point(self.lon, self.lat)
+
     @property
     def strike_info(self):
         """
         Retrieves relative strike information.
+
+        Uses the strikes prefetched by LocationQuerySet.with_strike_info when
+        available, and queries all strikes of the location otherwise.
         """
-        num_of_strikes = self.strike_set.all().count()
+        if hasattr(self, 'filtered_strikes'):
+            strikes = self.filtered_strikes
+            num_of_strikes = self.num_of_strikes
+        else:
+            strikes = self.strike_set.all()
+            num_of_strikes = strikes.count()
 
         if not num_of_strikes:
             return {}
@@ -56,13 +354,13 @@ class Location(models.Model):
                 'num_of_strikes': num_of_strikes,
                 'strikes': [],
             }
-            for strike in self.strike_set.all():
+            for strike in strikes:
                 info['strikes'].append({
                     'number': strike.number,
                     'date': strike.date.strftime("%m-%d-%Y"),
                 })
         else:
-            strike = self.strike_set.get()
+            strike = strikes[0]
             info = {
                 'detail': True,
                 'number': strike.number,
@@ -81,3 +379,130 @@ class Country(models.Model):
 
     def __str__(self):
         return str(self.name)
+
+
+class PendingStrike(models.Model):
+    """
+    Raw strike record without coordinates, waiting to be geocoded.
+    """
+    number = models.PositiveIntegerField(unique=True)
+    country = models.CharField(max_length=100, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    town = models.CharField(max_length=255, blank=True)
+    data = JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return str(self.number)
+
+
+class GeocodedPlace(models.Model):
+    """
+    Geocoding result for a (country, location, town) place. Places that were
+    not found are stored without coordinates, so they are not looked up
+    again.
+    """
+    country = models.CharField(max_length=100, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    town = models.CharField(max_length=255, blank=True)
+    lat = models.DecimalField(max_digits=12, decimal_places=9, blank=True, null=True)
+    lon = models.DecimalField(max_digits=12, decimal_places=9, blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('country', 'location', 'town')
+
+    def __str__(self):
+        return ', '.join(part for part in (self.town, self.location, self.country) if part)
+
+
+# Distinct suggestion values of every kind, trimmed and lowercased as keys.
+SUGGESTION_SQL = """
+    INSERT INTO strike_suggestion (kind, value, key, country)
+    SELECT DISTINCT kind, trim(value), lower(trim(value)), country FROM (
+        SELECT 'country' AS kind, name AS value, '' AS country FROM strike_country
+        UNION ALL
+        SELECT 'province', strike_location.location, strike_country.name
+        FROM strike_location
+        JOIN strike_country ON strike_country.id = strike_location.country_id
+        UNION ALL
+        SELECT 'town', strike_location.town, strike_country.name
+        FROM strike_location
+        JOIN strike_country ON strike_country.id = strike_location.country_id
+        UNION ALL
+        SELECT 'target', target, '' FROM strike_strike
+        UNION ALL
+        SELECT 'name', name, '' FROM strike_strike,
+        unnest(string_to_array(array_to_string(strike_strike.names, ','), ',')) AS name
+    ) AS suggestions
+    WHERE trim(value) <> '' AND length(trim(value)) <= 255
+"""
+
+
+@lru_cache(maxsize=None)
+def has_trigram():
+    """
+    Return whether the pg_trgm extension is installed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class SuggestionQuerySet(models.QuerySet):
+
+    def rebuild(self):
+        """
+        Replace all suggestions with the distinct values of the dataset.
+        """
+        Suggestion.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(SUGGESTION_SQL)
+
+    def suggest(self, query, limit):
+        """
+        Return up to limit suggestions starting with query, followed by
+        suggestions similar to it when pg_trgm is installed.
+        """
+        key = query.strip().lower()
+        if not key:
+            return []
+
+        suggestions = list(self.filter(key__startswith=key).order_by('key', 'kind')[:limit])
+        if len(suggestions) < limit and len(key) >= 3 and has_trigram():
+            suggestions += list(self.filter(key__trigram_similar=key).exclude(
+                key__startswith=key).annotate(
+                similarity=TrigramSimilarity('key', key)).order_by(
+                '-similarity', 'key')[:limit - len(suggestions)])
+        return suggestions
+
+
+class Suggestion(models.Model):
+    """
+    Distinct country, province, town, target or name value for type-ahead
+    suggestions, rebuilt after every import that changes the data.
+    """
+    KIND_CHOICES = (
+        ('country', 'Country'),
+        ('province', 'Province'),
+        ('town', 'City / Town'),
+        ('target', 'Target'),
+        ('name', 'Name'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, editable=False)
+    country = models.CharField(max_length=100, blank=True)
+
+    objects = SuggestionQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('kind', 'value', 'country')
+        indexes = [
+            models.Index(
+                fields=['key'], name='strike_suggestion_key_like',
+                opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.value
@@ -0,0 +1,74 @@
+from datetime import date
+from django.conf import settings
+from django.db import connection, transaction
+
+
+TABLE = 'strike_strike'
+DEFAULT_PARTITION = 'strike_strike_default'
+
+
+def get_partition_name(year):
+    return '%s_y%d' % (TABLE, year)
+
+
+def get_partitions(cursor):
+    """
+    Return the names of the partitions attached to the strike table.
+    """
+    cursor.execute("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = %s::regclass
+        ORDER BY child.relname
+    """, [TABLE])
+    return [name for name, in cursor.fetchall()]
+
+
+def create_partition(cursor, year):
+    """
+    Create the partition of strikes dated in year, moving its strikes out of
+    the default partition. Returns False if it already exists.
+    """
+    name = get_partition_name(year)
+    if name in get_partitions(cursor):
+        return False
+
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    cursor.execute(
+        'CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)' % (name, TABLE))
+    cursor.execute(
+        'WITH moved AS (DELETE FROM %s WHERE date >= %%s AND date < %%s RETURNING *) '
+        'INSERT INTO %s SELECT * FROM moved' % (DEFAULT_PARTITION, name), [start, end])
+    cursor.execute(
+        'ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM (%%s) TO (%%s)' % (TABLE, name),
+        [start, end])
+    return True
+
+
+def get_year_range(cursor, years_ahead=None):
+    """
+    Return the first and last partition years: from the earliest strike, or
+    the current year, to years_ahead after the current year.
+    """
+    if years_ahead is None:
+        years_ahead = settings.STRIKE_PARTITION_YEARS_AHEAD
+    cursor.execute('SELECT min(date) FROM %s' % TABLE)
+    first_date = cursor.fetchone()[0]
+    current_year = date.today().year
+    first_year = min(first_date.year, current_year) if first_date else current_year
+    return first_year, current_year + years_ahead
+
+
+def create_partitions(years_ahead=None):
+    """
+    Create the missing yearly partitions up to years_ahead after the current
+    year, returning the names of the created ones.
+    """
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        first_year, last_year = get_year_range(cursor, years_ahead)
+        for year in range(first_year, last_year + 1):
+            if create_partition(cursor, year):
+                created.append(get_partition_name(year))
+    return created
+
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+from .fields import Point
 from .models import Strike, Location
 
 
@@ -6,6 +8,9 @@ class StrikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Strike
         fields = '__all__'
+        # Numbers are unique across date partitions, see Strike.validate_unique.
+        extra_kwargs = {
+            'number': {'validators': [UniqueValidator(queryset=Strike.objects.all())]}}
 
 
 class LocationSerializer(serializers.ModelSerializer):
@@ -17,16 +22,37 @@ class LocationSerializer(serializers.ModelSerializer):
         """
         Custom validation for uniqueness of lat and lon.
         """
-        # TODO: Replace this with GeoDjango PointField.
-        #       https://trello.com/c/03yB0K0n
         if data['lat'] and data['lon']:
-            try:
-                location = Location.objects.get(lat=data['lat'], lon=data['lon'])
+            location = Location.objects.filter(
+                point__same_as=Point(data['lon'], data['lat'])).first()
+            if location is not None:
                 raise serializers.ValidationError({
                     'error': 'Location already exists.',
                     'instance': location.id
                 })
-            except Location.DoesNotExist:
-                pass
 
         return data
+
+
+class StrikeImportSerializer(StrikeSerializer):
+    """
+    Strike validation without database lookups, used by the bulk importer.
+    Location relations and number uniqueness are resolved by the importer.
+    """
+    class Meta(StrikeSerializer.Meta):
+        fields = None
+        exclude = ('location', )
+        extra_kwargs = {}
+
+
+class LocationImportSerializer(LocationSerializer):
+    """
+    Location validation without database lookups, used by the bulk importer.
+    Country relations and lat/lon uniqueness are resolved by the importer.
+    """
+    class Meta(LocationSerializer.Meta):
+        fields = None
+        exclude = ('country', )
+
+    def validate(self, data):
+        return data
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .cache import bump_dataset_version
+from .models import Country, Location, Strike
+
+
+@receiver(post_save, sender=Strike)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Country)
+def dataset_changed(sender, **kwargs):
+    """
+    Start a new dataset version when strike data is saved outside of
+    imports. Deletes are not connected, so bulk deletes stay single queries
+    without a bump per row; imports, destroy_data and the admin bump the
+    version themselves.
+    """
+    bump_dataset_version()
@@ -0,0 +1,132 @@
+import json
+import random
+from datetime import date, datetime, timedelta
+from django.conf import settings
+
+
+COUNTRIES = [
+    'Pakistan', 'Yemen', 'Somalia', 'Afghanistan', 'Libya', 'Syria', 'Iraq',
+    'Pakistan-Afghanistan Border', 'Niger', 'Mali',
+]
+
+WORDS = [
+    'drone', 'strike', 'compound', 'vehicle', 'house', 'militants', 'village',
+    'killed', 'injured', 'reported', 'civilians', 'missiles', 'targeted',
+    'suspected', 'convoy', 'officials', 'local', 'sources', 'attack', 'night',
+]
+
+NAMES = [
+    'Abu Ahmad', 'Nek Mohammad', 'Fakhar Zaman', 'Azmat Khan', 'Sher Zaman',
+    'Qa\'id Salim', 'Munir Ahmad', 'Adil Nasir', 'Marez Khan', 'Salih Hussain',
+]
+
+
+class SyntheticFeed(object):
+    """
+    Deterministic generator of feed-shaped strike data, with strikes spread
+    over a fixed set of locations and countries.
+    """
+
+    def __init__(self, strikes=1000, locations=100, countries=5, seed=0,
+                 start=date(2002, 1, 1), end=date(2020, 12, 31)):
+        self.strikes = strikes
+        self.num_locations = max(1, min(locations, strikes))
+        self.num_countries = max(1, min(countries, self.num_locations))
+        self.seed = seed
+        self.start = start
+        self.days = (end - start).days
+
+    def get_countries(self):
+        countries = []
+        for i in range(self.num_countries):
+            name = COUNTRIES[i % len(COUNTRIES)]
+            if i >= len(COUNTRIES):
+                name = '%s %d' % (name, i // len(COUNTRIES))
+            countries.append(name)
+        return countries
+
+    def get_locations(self, rand):
+        """
+        Return location dicts with unique coordinates, countries assigned
+        round robin.
+        """
+        countries = self.get_countries()
+        locations = []
+        coordinates = set()
+        for i in range(self.num_locations):
+            lat, lon = None, None
+            while (lat, lon) in coordinates or lat is None:
+                lat = '%.6f' % rand.uniform(-60, 60)
+                lon = '%.6f' % rand.uniform(-180, 180)
+            coordinates.add((lat, lon))
+            locations.append({
+                'country': countries[i % len(countries)],
+                'location': 'Province %d' % (i % 50),
+                'town': 'Town %d' % i if rand.random() < 0.7 else '',
+                'lat': lat,
+                'lon': lon,
+            })
+        return locations
+
+    def get_range(self, rand, high):
+        """
+        Return a casualty range string, e.g. '', '4' or '6-8', and its
+        minimum and maximum strings.
+        """
+        if rand.random() < 0.05:
+            return '', '', ''
+        low = rand.randint(0, high)
+        top = low + (rand.randint(1, 5) if rand.random() < 0.4 else 0)
+        if low == top:
+            return str(low), str(low), str(top)
+        return '%d-%d' % (low, top), str(low), str(top)
+
+    def get_text(self, rand, length):
+        return ' '.join(rand.choice(WORDS) for i in range(length)).capitalize() + '.'
+
+    def get_strike(self, rand, number, location):
+        strike_date = self.start + timedelta(days=rand.randint(0, self.days))
+        deaths, deaths_min, deaths_max = self.get_range(rand, 12)
+        names = ', '.join(rand.sample(NAMES, rand.randint(0, 4)))
+        return dict(location, **{
+            '_id': '%024x' % rand.getrandbits(96),
+            'number': number,
+            'date': datetime.combine(
+                strike_date, datetime.min.time()).strftime(settings.DATE_FORMAT),
+            'narrative': self.get_text(rand, rand.randint(8, 30)),
+            'bij_summary_short': self.get_text(rand, rand.randint(8, 20)),
+            'bij_link': 'http://www.thebureauinvestigates.com/strikes/%d/' % number,
+            'bureau_id': 'B%d' % number,
+            'tweet_id': str(rand.randint(10 ** 17, 10 ** 18 - 1)),
+            'target': rand.choice(NAMES) if rand.random() < 0.3 else '',
+            'deaths': deaths,
+            'deaths_min': deaths_min,
+            'deaths_max': deaths_max,
+            'civilians': self.get_range(rand, 4)[0],
+            'injuries': self.get_range(rand, 6)[0],
+            'children': self.get_range(rand, 2)[0],
+            'names': [names],
+            'articles': [
+                'http://www.example.com/articles/%d-%d' % (number, i)
+                for i in range(rand.randint(0, 3))],
+        })
+
+    def __iter__(self):
+        """
+        Yield strike records one at a time.
+        """
+        rand = random.Random(self.seed)
+        locations = self.get_locations(rand)
+        for number in range(1, self.strikes + 1):
+            yield self.get_strike(rand, number, rand.choice(locations))
+
+    def write(self, fileobj):
+        """
+        Write the feed as JSON to a text file object, one strike at a time.
+        """
+        fileobj.write('{"status": "OK", "strike": [')
+        for i, strike in enumerate(self):
+            if i:
+                fileobj.write(', ')
+            fileobj.write(json.dumps(strike))
+        fileobj.write(']}')
@@ -0,0 +1,258 @@
+import hashlib
+import math
+import os
+import shutil
+import struct
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from .clustering import project
+from .fields import Box
+from .forms import StrikeFilterForm
+
+
+EXTENT = 4096
+BUFFER = 64
+LAYER_NAME = 'strikes'
+
+# Filter form values of tile requests without them.
+FILTER_DEFAULTS = {
+    'daterange': '01/01/1900 - 12/31/2100',
+    'country__name': 'all',
+}
+
+
+def encode_varint(value):
+    data = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+
+def zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def encode_field(number, value):
+    """
+    Encode a protobuf field: an int as a varint, bytes as length delimited.
+    """
+    if isinstance(value, int):
+        return encode_varint(number << 3) + encode_varint(value)
+    return encode_varint(number << 3 | 2) + encode_varint(len(value)) + value
+
+
+def encode_value(value):
+    """
+    Encode an MVT Value message of a str, float or int.
+    """
+    if isinstance(value, str):
+        return encode_field(1, value.encode())
+    if isinstance(value, float):
+        return encode_varint(3 << 3 | 1) + struct.pack('<d', value)
+    if value < 0:
+        return encode_field(6, zigzag(value))
+    return encode_field(5, value)
+
+
+def encode_layer(name, features, extent=EXTENT):
+    """
+    Encode an MVT version 2 layer of (id, x, y, properties) point features,
+    x and y being tile coordinates within extent.
+    """
+    keys, values = {}, {}
+    encoded_features = []
+    for feature_id, x, y, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        geometry = [9, zigzag(x), zigzag(y)]
+        encoded_features.append(b''.join([
+            encode_field(1, feature_id),
+            encode_field(2, b''.join(encode_varint(tag) for tag in tags)),
+            encode_field(3, 1),
+            encode_field(4, b''.join(encode_varint(command) for command in geometry)),
+        ]))
+
+    return b''.join(
+        [encode_field(15, 2), encode_field(1, name.encode())] +
+        [encode_field(2, feature) for feature in encoded_features] +
+        [encode_field(3, key.encode()) for key in keys] +
+        [encode_field(4, encode_value(value)) for value_type, value in values] +
+        [encode_field(5, extent)])
+
+
+def get_tile_bounds(z, x, y):
+    """
+    Return the (west, south, east, north) degrees of a Web Mercator tile.
+    """
+    def lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / 2 ** z))))
+
+    return x / 2 ** z * 360 - 180, lat(y + 1), (x + 1) / 2 ** z * 360 - 180, lat(y)
+
+
+def build(strikes, z, x, y):
+    """
+    Return the MVT tile of the locations of strikes at z, x and y, with their
+    number of strikes and sums of parsed minimum deaths and civilians.
+    Points within BUFFER of the tile edges are included.
+    """
+    west, south, east, north = get_tile_bounds(z, x, y)
+    margin = (east - west) * BUFFER / EXTENT
+    box = Box(
+        max(west - margin, -180), max(south - margin, -90),
+        min(east + margin, 180), min(north + margin, 90))
+    locations = strikes.filter(location__point__contained_in=box).values(
+        'location_id', 'location__lat', 'location__lon', 'location__town',
+        'location__location', country=F('location__country__name'),
+    ).annotate(
+        strikes=Count('id'), deaths=Sum('deaths_low'), civilians=Sum('civilians_low'),
+    ).order_by('location_id')
+
+    # Tile coordinates are pixels at zoom z in tiles of EXTENT pixels.
+    zoom = z + int(math.log2(EXTENT // 256))
+    features = []
+    for location in locations:
+        pixel_x, pixel_y = project(
+            float(location['location__lat']), float(location['location__lon']), zoom)
+        features.append((
+            location['location_id'], pixel_x - x * EXTENT, pixel_y - y * EXTENT, {
+                'country': location['country'],
+                'province': location['location__location'] or None,
+                'town': location['location__town'] or None,
+                'strikes': location['strikes'],
+                'deaths': location['deaths'],
+                'civilians': location['civilians'],
+            }))
+
+    if not features:
+        return b''
+    return encode_field(3, encode_layer(LAYER_NAME, features))
+
+
+def get_filter_form(params):
+    """
+    Return the StrikeFilterForm of tile query parameters, with the default
+    date range and country filling in missing ones.
+    """
+    data = dict(FILTER_DEFAULTS)
+    data.update((key, value) for key, value in params.items() if value != '')
+    return StrikeFilterForm(data=data)
+
+
+def get_filter_digest(form):
+    """
+    Return the digest of the cleaned filters of a valid form, equal for
+    equivalent filter strings.
+    """
+    if not form.is_valid():
+        raise ValueError(form.errors.as_text())
+    return hashlib.sha1(repr(sorted(form.cleaned_data.items())).encode()).hexdigest()
+
+
+def get_path(version, digest, z, x, y):
+    return os.path.join(
+        settings.STRIKE_DATA_CACHE_DIR, 'tiles', version, digest,
+        str(z), str(x), '%d.mvt' % y)
+
+
+def clean_versions(version):
+    """
+    Remove the tiles of other dataset versions, once per version: only the
+    process creating the version directory removes the others.
+    """
+    tiles_dir = os.path.join(settings.STRIKE_DATA_CACHE_DIR, 'tiles')
+    try:
+        os.makedirs(os.path.join(tiles_dir, version))
+    except FileExistsError:
+        return
+    for name in os.listdir(tiles_dir):
+        if name != version:
+            shutil.rmtree(os.path.join(tiles_dir, name), ignore_errors=True)
+
+
+def evict_filters(version, digest):
+    """
+    Make room for the tiles of a new filter digest, removing the least
+    recently created filters beyond STRIKE_TILE_CACHE_FILTERS. Tiles of the
+    default filters are kept.
+    """
+    version_dir = os.path.join(settings.STRIKE_DATA_CACHE_DIR, 'tiles', version)
+    keep = {digest, get_filter_digest(get_filter_form({}))}
+    digests = sorted(
+        (name for name in os.listdir(version_dir) if name not in keep),
+        key=lambda name: os.path.getmtime(os.path.join(version_dir, name)))
+    while digests and len(digests) >= settings.STRIKE_TILE_CACHE_FILTERS:
+        shutil.rmtree(os.path.join(version_dir, digests.pop(0)), ignore_errors=True)
+
+
+def write_tile(path, tile):
+    """
+    Write a tile file atomically. Writes losing a race with a cache cleanup
+    are retried once, then skipped.
+    """
+    for attempt in range(2):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            part_path = '%s.%d.part' % (path, os.getpid())
+            with open(part_path, 'wb') as tile_file:
+                tile_file.write(tile)
+            os.replace(part_path, path)
+            return
+        except FileNotFoundError:
+            continue
+
+
+def get_tile(version, form, z, x, y):
+    """
+    Return the tile of a valid filter form for a dataset version, read from
+    the disk cache or built and cached. Tiles above STRIKE_TILE_CACHE_MAX_ZOOM
+    are not cached.
+    """
+    digest = get_filter_digest(form)
+    path = get_path(version, digest, z, x, y)
+    try:
+        with open(path, 'rb') as tile_file:
+            return tile_file.read()
+    except FileNotFoundError:
+        pass
+
+    tile = build(form.get_strikes(), z, x, y)
+    if z > settings.STRIKE_TILE_CACHE_MAX_ZOOM:
+        return tile
+
+    clean_versions(version)
+    if not os.path.isdir(os.path.join(settings.STRIKE_DATA_CACHE_DIR, 'tiles', version, digest)):
+        evict_filters(version, digest)
+    write_tile(path, tile)
+    return tile
+
+
+def seed(version, max_zoom, params=None):
+    """
+    Build the tiles from zoom 0 to max_zoom of filter params, returning the
+    number of tiles built. Tiles under an empty tile are empty as well, and
+    are skipped.
+    """
+    form = get_filter_form(params or {})
+    if not form.is_valid():
+        raise ValueError(form.errors.as_text())
+
+    count = 0
+    tiles = [(0, 0, 0)]
+    while tiles:
+        z, x, y = tiles.pop()
+        tile = get_tile(version, form, z, x, y)
+        count += 1
+        if z < max_zoom and tile:
+            tiles.extend(
+                (z + 1, x * 2 + dx, y * 2 + dy) for dx in (0, 1) for dy in (0, 1))
+    return count
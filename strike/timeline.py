@@ -0,0 +1,110 @@
+import glob
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import date
+from django.conf import settings
+from .cache import get_dataset_version
+from .models import Strike
+
+
+EPOCH = date(1970, 1, 1)
+
+# Array name, array typecode, header type name.
+ARRAYS = (
+    ('lat', 'f', 'float32'),
+    ('lon', 'f', 'float32'),
+    ('day', 'i', 'int32'),
+    ('deaths', 'H', 'uint16'),
+)
+
+
+def get_path(version):
+    return os.path.join(settings.STRIKE_DATA_CACHE_DIR, 'timeline-%s.bin' % version)
+
+
+def pack(arrays, header):
+    """
+    Return the payload: a little-endian uint32 header length, the JSON
+    header padded to 4 bytes, then every array in little-endian order.
+    """
+    header['arrays'] = []
+    offset = 0
+    for name, typecode, type_name in ARRAYS:
+        header['arrays'].append({
+            'name': name, 'type': type_name, 'offset': offset,
+            'length': len(arrays[name])})
+        offset += len(arrays[name]) * arrays[name].itemsize
+
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b' ' * (-(4 + len(header_bytes)) % 4)
+    chunks = [struct.pack('<I', len(header_bytes)), header_bytes]
+    for name, typecode, type_name in ARRAYS:
+        if sys.byteorder == 'big':
+            arrays[name].byteswap()
+        chunks.append(arrays[name].tobytes())
+    return b''.join(chunks)
+
+
+def build(version):
+    """
+    Write the timeline payload of all located strikes, ordered by date, for
+    a dataset version. Payloads of other versions are removed only if the
+    version is still the current one, so a late build of an old version
+    never removes the current payload.
+
+    Day offsets count days since 1970-01-01, negative for earlier strikes.
+    Deaths are the parsed minimum death counts, capped at 65535.
+    """
+    arrays = {name: array(typecode) for name, typecode, type_name in ARRAYS}
+    strikes = Strike.objects.filter(
+        location__lat__isnull=False, location__lon__isnull=False
+    ).values_list(
+        'location__lat', 'location__lon', 'date', 'deaths_low'
+    ).order_by('date', 'number').iterator(chunk_size=settings.STRIKE_EXPORT_CHUNK_SIZE)
+
+    for lat, lon, strike_date, deaths in strikes:
+        arrays['lat'].append(float(lat))
+        arrays['lon'].append(float(lon))
+        arrays['day'].append((strike_date - EPOCH).days)
+        arrays['deaths'].append(min(deaths or 0, 65535))
+
+    payload = pack(arrays, {
+        'version': version,
+        'count': len(arrays['day']),
+        'epoch': EPOCH.isoformat(),
+        'byteorder': 'little',
+    })
+
+    path = get_path(version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = '%s.%d.part' % (path, os.getpid())
+    with open(part_path, 'wb') as payload_file:
+        payload_file.write(payload)
+    os.replace(part_path, path)
+
+    if version == get_dataset_version():
+        for old_path in glob.glob(get_path('*')):
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+    return path
+
+
+def get_timeline(version):
+    """
+    Return the timeline payload file of a dataset version, opened for
+    reading. Missing payloads, never built or removed by a newer version,
+    are built; a second removal before it is opened is retried once.
+    """
+    path = get_path(version)
+    for attempt in range(2):
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            build(version)
+    return open(path, 'rb')
@@ -4,5 +4,13 @@ from . import views
 
 urlpatterns = [
     path('', views.IndexView.as_view(), name='index'),
+    path('markers', views.MarkerView.as_view(), name='markers'),
+    path('export', views.ExportView.as_view(), name='export'),
+    path('timeline', views.TimelineView.as_view(), name='timeline'),
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', views.TileView.as_view(), name='tile'),
+    path('stats', views.StatsView.as_view(), name='stats'),
+    path('heatmap', views.HeatmapView.as_view(), name='heatmap'),
+    path('nearest', views.NearestView.as_view(), name='nearest'),
+    path('suggest', views.SuggestView.as_view(), name='suggest'),
     path('search', views.SearchView.as_view(), name='search'),
 ]
@@ -1,15 +1,31 @@
+import math
+from collections import OrderedDict
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import Count, Q
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views import View
-from .forms import StrikeFilterForm
-from .models import Strike, Location
+from .cache import VersionedCacheMixin, get_countries, get_dataset_version, get_marker_index
+from .clustering import TILE_SIZE, project
+from .exports import FORMATS, export
+from .fields import Box
+from .forms import HeatmapForm, NearestForm, StrikeFilterForm
+from .models import Strike, Location, Suggestion
+from .tiles import get_filter_digest, get_filter_form, get_tile, get_tile_bounds
+from .timeline import get_timeline
 
 
-class IndexView(View):
+def float_or_none(value):
+    return None if value is None else float(value)
+
+
+class IndexView(VersionedCacheMixin, View):
     template = 'index.html'
+    daily = True
     context = {}
 
     @property
@@ -24,11 +40,11 @@ class IndexView(View):
             'date__lte': today.date(),
         }
 
-    def get(self, request, *args, **kwargs):
+    def get_filters(self, form):
         """
-        Main view.
+        Return location filters, strike filters and the selected daterange,
+        or None if the form is not valid.
         """
-        form = StrikeFilterForm(data=request.GET)
         filter_params = {}
         daterange = None
 
@@ -37,28 +53,29 @@ class IndexView(View):
 
             # Get unique strikes for the desired daterange.
             daterange = filter_params.pop('daterange')
-            location_ids = Strike.objects.filter(
-                **daterange).values_list('location_id', flat=True).distinct()
+            strike_filters = dict(daterange, **form.get_strike_values())
 
         else:
             # Get unique strikes from last 3 months by default.
-            location_ids = Strike.objects.filter(
-                **self.default_daterange).values_list('location_id', flat=True).distinct()
+            strike_filters = self.default_daterange
+
+        return filter_params, strike_filters, daterange
+
+    def get(self, request, *args, **kwargs):
+        """
+        Main view.
+        """
+        form = StrikeFilterForm(data=request.GET)
+        filter_params, strike_filters, daterange = self.get_filters(form)
+        if not form.is_valid():
             self.context['form_errors'] = form.errors
 
+        strikes = Strike.objects.filter(**strike_filters)
+        location_ids = strikes.values_list('location_id', flat=True).distinct()
         locations = Location.objects.filter(id__in=location_ids, **filter_params)
+        country_totals = strikes.filter(location__in=locations).country_totals()
 
-        # Set filter values for selected locations
-        city_filters = {}
-        province_filters = {}
-
-        country_filters = Location.objects.all().values_list(
-            'country__name', flat=True).distinct()
-        for country in country_filters:
-            city_filters[country] = Location.objects.all().filter(
-                country__name=country).values_list('town', flat=True).distinct()
-            province_filters[country] = Location.objects.all().filter(
-                country__name=country).values_list('location', flat=True).distinct()
+        country_filters = get_countries()
 
         # Return last valid daterange
         if daterange:
@@ -74,50 +91,408 @@ class IndexView(View):
 
         self.context = {
             'locations': locations,
+            'country_totals': country_totals,
             'daterange': daterange_str,
             'country_filters': country_filters,
-            'city_filters': city_filters,
-            'province_filters': province_filters,
             'form': form
         }
         return render(request, self.template, self.context)
 
 
+class MarkerView(IndexView):
+    """
+    GeoJSON markers for the map, clustered on a grid per zoom level.
+
+    Takes a bbox ('west,south,east,north'), a zoom level and the map filter
+    form values. Clusters are features with a point_count; single locations
+    carry their strike info.
+
+    The bbox is widened to the tiles it covers at the zoom level, so panning
+    the map reuses cached responses instead of caching one per bbox.
+    """
+
+    def get_bbox(self, value):
+        bbox = [float(coordinate) for coordinate in value.split(',')]
+        if len(bbox) != 4:
+            raise ValueError('bbox must have 4 coordinates.')
+        return bbox
+
+    def snap_bbox(self, bbox, zoom):
+        """
+        Widen a bbox to the edges of the Web Mercator tiles it covers at
+        zoom, up to STRIKE_TILE_MAX_ZOOM. Bboxes crossing the antimeridian
+        whose tiles cover all longitudes span -180 to 180.
+        """
+        z = min(max(zoom, 0), settings.STRIKE_TILE_MAX_ZOOM)
+        tiles = 2 ** z
+        west, south, east, north = bbox
+        min_x = min(max(math.floor((west + 180) / 360 * tiles), 0), tiles - 1)
+        max_x = min(max(math.ceil((east + 180) / 360 * tiles), 1), tiles) - 1
+        if west <= east:
+            max_x = max(max_x, min_x)
+        elif min_x <= max_x + 1:
+            min_x, max_x = 0, tiles - 1
+        min_y = min(project(north, 0, z)[1] // TILE_SIZE, tiles - 1)
+        max_y = max(min(math.ceil(project(south, 0, z)[1] / TILE_SIZE), tiles) - 1, min_y)
+
+        west, _, _, north = get_tile_bounds(z, min_x, min_y)
+        _, south, east, _ = get_tile_bounds(z, max_x, max_y)
+        return [west, -90 if max_y == tiles - 1 else south,
+                east, 90 if min_y == 0 else north]
+
+    def get_zoom_bbox(self, params):
+        """
+        Return the zoom level and the snapped bbox, or None, of query params.
+        """
+        zoom = int(params.get('zoom', 0))
+        if not params.get('bbox'):
+            return zoom, None
+        return zoom, self.snap_bbox(self.get_bbox(params['bbox']), zoom)
+
+    def get_cache_params(self, request):
+        params = [
+            (key, value) for key, value in super(MarkerView, self).get_cache_params(request)
+            if key != 'bbox']
+        try:
+            zoom, bbox = self.get_zoom_bbox(request.GET)
+        except ValueError:
+            bbox = request.GET.get('bbox')
+        if bbox:
+            params.append(('bbox', repr(bbox)))
+        return sorted(params)
+
+    def get_bbox_filter(self, west, south, east, north):
+        """
+        Return the Q of strikes located in a bbox, which crosses the
+        antimeridian when west is greater than east.
+        """
+        if west <= east:
+            return Q(location__point__contained_in=Box(west, south, east, north))
+        return (Q(location__point__contained_in=Box(west, south, 180, north)) |
+                Q(location__point__contained_in=Box(-180, south, east, north)))
+
+    def get(self, request, *args, **kwargs):
+        try:
+            zoom, bbox = self.get_zoom_bbox(request.GET)
+        except ValueError:
+            return JsonResponse(
+                {'error': "zoom must be an integer and bbox 'west,south,east,north'."},
+                status=400)
+
+        form = StrikeFilterForm(data=request.GET)
+        filter_params, strike_filters, daterange = self.get_filters(form)
+        strike_filters.update({
+            'location__' + lookup: value for lookup, value in filter_params.items()})
+
+        strikes = Strike.objects.filter(**strike_filters)
+        if bbox is not None:
+            strikes = strikes.filter(self.get_bbox_filter(*bbox))
+        counts = dict(strikes.values_list('location_id').annotate(Count('id')).order_by())
+        cells = get_marker_index().cluster(counts, zoom, bbox)
+
+        # Strike info of locations shown as single markers.
+        single_ids = [cell['locations'][0] for cell in cells if len(cell['locations']) == 1]
+        strike_filters = {
+            lookup: value for lookup, value in strike_filters.items()
+            if not lookup.startswith('location__')}
+        locations = Location.objects.filter(
+            id__in=single_ids).with_strike_info(**strike_filters).in_bulk()
+
+        features = []
+        for cell in cells:
+            if len(cell['locations']) == 1:
+                location = locations[cell['locations'][0]]
+                properties = {
+                    'cluster': False,
+                    'location_id': location.id,
+                    'num_of_strikes': cell['strikes'],
+                    'strike_info': location.strike_info,
+                }
+            else:
+                properties = {
+                    'cluster': True,
+                    'point_count': len(cell['locations']),
+                    'num_of_strikes': cell['strikes'],
+                }
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [cell['lon'], cell['lat']]},
+                'properties': properties,
+            })
+
+        return JsonResponse({'type': 'FeatureCollection', 'features': features})
+
+
+class ExportView(View):
+    """
+    Streams the strikes matching the map filters as csv or ndjson.
+
+    Missing daterange and country__name filters default to all strikes.
+    """
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in FORMATS:
+            return JsonResponse({'error': 'Unknown format.'}, status=400)
+
+        form = get_filter_form(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'error': form.errors}, status=400)
+
+        response = StreamingHttpResponse(
+            export(form.get_strikes(), export_format), content_type=FORMATS[export_format])
+        response['Content-Disposition'] = 'attachment; filename="strikes.%s"' % export_format
+        return response
+
+
+class TimelineView(View):
+    """
+    All located strikes as packed little-endian typed arrays for timeline
+    playback: float32 lat and lon, int32 days since 1970-01-01 and uint16
+    deaths, after a uint32 length prefixed JSON header describing them.
+
+    The payload is built once per dataset version and served from disk.
+    """
+
+    def get(self, request, *args, **kwargs):
+        version = get_dataset_version()
+        etag = quote_etag(version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(
+                get_timeline(version), content_type='application/octet-stream')
+        response['ETag'] = etag
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return response
+
+
+class TileView(View):
+    """
+    Mapbox vector tiles of strike locations matching the map filters, built
+    on demand and cached on disk per dataset version and filters, up to
+    STRIKE_TILE_CACHE_MAX_ZOOM.
+
+    Missing daterange and country__name filters default to all strikes.
+    """
+
+    def get(self, request, z, x, y, *args, **kwargs):
+        if z > settings.STRIKE_TILE_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            return JsonResponse({'error': 'Tile out of range.'}, status=404)
+
+        form = get_filter_form(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'error': form.errors}, status=400)
+
+        version = get_dataset_version()
+        etag = quote_etag('%s-%s' % (version, get_filter_digest(form)))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                get_tile(version, form, z, x, y),
+                content_type='application/vnd.mapbox-vector-tile')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.STRIKE_TILE_MAX_AGE)
+        return response
+
+
+class StatsView(VersionedCacheMixin, View):
+    """
+    Strike counts and casualty sums per country and day, week or month
+    bucket, with running totals, aggregated in SQL and cached per dataset
+    version.
+
+    Missing daterange and country__name filters default to all strikes.
+    """
+    intervals = ('day', 'week', 'month')
+
+    def get(self, request, *args, **kwargs):
+        interval = request.GET.get('interval', 'month')
+        if interval not in self.intervals:
+            return JsonResponse({'error': 'Unknown interval.'}, status=400)
+
+        form = get_filter_form(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'error': form.errors}, status=400)
+
+        series = OrderedDict()
+        for row in form.get_strikes().time_series(interval):
+            country = row.pop('country')
+            buckets = series.setdefault(country, [])
+            cumulative = dict(buckets[-1]['cumulative']) if buckets else {}
+            for key, value in row.items():
+                if key != 'bucket':
+                    cumulative[key] = cumulative.get(key, 0) + (value or 0)
+            row['bucket'] = row['bucket'].isoformat()
+            row['cumulative'] = cumulative
+            buckets.append(row)
+
+        return JsonResponse({
+            'interval': interval,
+            'series': [
+                {'country': country, 'buckets': buckets}
+                for country, buckets in series.items()],
+        })
+
+
+class HeatmapView(VersionedCacheMixin, View):
+    """
+    Strike density grid for map overlays, weighted by strikes or deaths.
+
+    Grids are binned in SQL and cached per dataset version, month bucket of
+    the daterange and zoom band, and returned as the row-major indexes and
+    weights of their non-empty cells.
+    """
+
+    def get(self, request, *args, **kwargs):
+        form = HeatmapForm(data=request.GET)
+        if not form.is_valid():
+            return JsonResponse({'error': form.errors}, status=400)
+        return JsonResponse(form.get_heatmap())
+
+
+class NearestView(View):
+    """
+    The k strikes nearest to lat and lon, optionally within a daterange,
+    with their distance in km.
+    """
+
+    def get(self, request, *args, **kwargs):
+        form = NearestForm(data=request.GET)
+        if not form.is_valid():
+            return JsonResponse({'error': form.errors}, status=400)
+
+        strikes = form.get_strikes().select_related('location__country')
+        return JsonResponse({'strikes': [{
+            'number': strike.number,
+            'date': strike.date.isoformat(),
+            'deaths': strike.deaths,
+            'country': strike.location.country.name,
+            'province': strike.location.location,
+            'town': strike.location.town,
+            'lat': float(strike.location.lat),
+            'lon': float(strike.location.lon),
+            'distance': strike.distance,
+        } for strike in strikes]})
+
+
+class SuggestView(View):
+    """
+    Type-ahead suggestions for the search bar and the place filters.
+
+    Takes a query q, and optionally a kind, a country for provinces and
+    towns, and a limit.
+    """
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        suggestions = Suggestion.objects.all()
+
+        kind = request.GET.get('kind')
+        if kind:
+            if kind not in dict(Suggestion.KIND_CHOICES):
+                return JsonResponse({'error': 'Unknown kind.'}, status=400)
+            suggestions = suggestions.filter(kind=kind)
+        if request.GET.get('country'):
+            suggestions = suggestions.filter(country=request.GET['country'])
+
+        try:
+            limit = int(request.GET.get('limit', settings.STRIKE_SUGGEST_LIMIT))
+        except ValueError:
+            return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+        limit = min(max(limit, 1), self.max_limit)
+
+        response = JsonResponse({'suggestions': [
+            {'kind': suggestion.kind, 'value': suggestion.value, 'country': suggestion.country}
+            for suggestion in suggestions.suggest(request.GET.get('q', ''), limit)
+        ]})
+        patch_cache_control(response, public=True, max_age=settings.STRIKE_SUGGEST_MAX_AGE)
+        return response
+
+
 class SearchView(View):
+    """
+    Full-text search over strikes, in pages of STRIKE_SEARCH_PAGE_SIZE
+    strikes ordered by (date, number). The cursor of the next page is the
+    (date, number) key of the last strike, so pages never use OFFSET.
+
+    Returns JSON instead of the map page with format=json.
+    """
     template = 'index.html'
     context = {}
-    text_fields = (
-        'narrative', 'deaths', 'deaths_min', 'deaths_max', 'civilians',
-        'injuries', 'children', 'tweet_id', 'bureau_id', 'bij_summary_short',
-        'target', 'articles', 'names', 'location__country__name', 'location__town',
-        'location__location'
+    fields = (
+        'id', 'number', 'date', 'location', 'location__town', 'location__location',
+        'location__lat', 'location__lon', 'location__country', 'location__country__name',
     )
 
+    def get_cursor(self, strike):
+        return '%s_%d' % (strike.date.isoformat(), strike.number)
+
+    def parse_cursor(self, cursor):
+        strike_date, number = cursor.split('_')
+        return datetime.strptime(strike_date, '%Y-%m-%d').date(), int(number)
+
+    def get_page(self, query, cursor=None):
+        """
+        Return the strikes of a page and the cursor of the next page.
+        """
+        strikes = Strike.objects.search(query, ranked=False).select_related(
+            'location__country').only(*self.fields).order_by('date', 'number')
+        if cursor:
+            strike_date, number = self.parse_cursor(cursor)
+            strikes = strikes.filter(
+                Q(date__gt=strike_date) | Q(date=strike_date, number__gt=number))
+
+        page_size = settings.STRIKE_SEARCH_PAGE_SIZE
+        strikes = list(strikes[:page_size + 1])
+        next_cursor = None
+        if len(strikes) > page_size:
+            strikes = strikes[:page_size]
+            next_cursor = self.get_cursor(strikes[-1])
+        return strikes, next_cursor
 
     def get(self, request, *args, **kwargs):
         """
         Search view.
         """
         query = request.GET.get('search_q', '')
-        queries = []
+        as_json = request.GET.get('format') == 'json'
         strikes = []
         locations = []
+        next_cursor = None
 
         if query:
-            for field in self.text_fields:
-                queries.append(Q(**{field + '__icontains': query}))
+            try:
+                strikes, next_cursor = self.get_page(query, request.GET.get('cursor'))
+            except ValueError:
+                if as_json:
+                    return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+                strikes, next_cursor = self.get_page(query)
 
-            final_query = queries.pop()
-            for item in queries:
-                final_query |= item
+        if as_json:
+            return JsonResponse({
+                'query': query,
+                'results': [{
+                    'number': strike.number,
+                    'date': strike.date.isoformat(),
+                    'country': strike.location.country.name,
+                    'province': strike.location.location,
+                    'town': strike.location.town,
+                    'lat': float_or_none(strike.location.lat),
+                    'lon': float_or_none(strike.location.lon),
+                } for strike in strikes],
+                'next': next_cursor,
+            })
 
-            strikes = Strike.objects.filter(final_query)
-            location_ids = strikes.values_list('location_id', flat=True).distinct()
-            locations = Location.objects.filter(id__in=location_ids)
+        # Map markers for the strikes of this page.
+        if strikes:
+            locations = Location.objects.filter(
+                id__in={strike.location_id for strike in strikes}
+            ).with_strike_info(id__in=[strike.id for strike in strikes])
 
         self.context = {
             'query': query,
             'strikes': strikes,
             'locations': locations,
+            'next_cursor': next_cursor,
         }
         return render(request, self.template, self.context)
@@ -1,3 +1,4 @@
+from django.core.cache import caches
 from django.test import TestCase
 from strike.models import Country
 
@@ -8,4 +9,6 @@ class BaseTestCase(TestCase):
     """
 
     def setUp(self):
+        for alias in ('default', 'dataset'):
+            caches[alias].clear()
         self.country = Country.objects.create(name='SasaLand')
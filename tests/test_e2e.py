@@ -1,4 +1,261 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from tempfile import mkdtemp
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.urls import reverse
+from strike.models import GeocodedPlace, PendingStrike, Strike
 from .base import BaseTestCase
 
 
-pass
+class FeedHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the strike data URL.
+    """
+    etag = '"v1"'
+    payload = {
+        'status': 'OK',
+        'strike': [{
+            '_id': '55c79e711cbee48856a30886',
+            'articles': [],
+            'bij_link': '',
+            'bij_summary_short': '',
+            'bureau_id': 'YEM001',
+            'children': '',
+            'civilians': '0',
+            'country': 'Yemen',
+            'date': '2002-11-03T00:00:00.000Z',
+            'deaths': '6',
+            'deaths_max': '6',
+            'deaths_min': '6',
+            'injuries': '',
+            'location': 'Marib Province',
+            'lat': '15.47467',
+            'lon': '45.322755',
+            'names': [''],
+            'narrative': '',
+            'number': 1,
+            'target': '',
+            'town': '',
+            'tweet_id': ''
+        }]
+    }
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = gzip.compress(json.dumps(self.payload).encode())
+        self.send_response(200)
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ImportDataTest(BaseTestCase):
+    """
+    End to end tests for the import_data command.
+    """
+
+    def setUp(self):
+        super(ImportDataTest, self).setUp()
+        self.server = HTTPServer(('127.0.0.1', 0), FeedHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/data' % self.server.server_port
+        self.cache_dir = mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+        super(ImportDataTest, self).tearDown()
+
+    def call_command(self, *args):
+        stdout = StringIO()
+        with override_settings(STRIKE_DATA_URL=self.url, STRIKE_DATA_CACHE_DIR=self.cache_dir):
+            call_command('import_data', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_conditional_fetch(self):
+        """
+        Unchanged payloads are not imported again, and cached payloads can be
+        imported offline.
+        """
+        output = self.call_command()
+        self.assertIn('Strikes: 1', output)
+        Strike.objects.get(number=1)
+
+        # Server answers 304 and the database is not touched.
+        Strike.objects.all().delete()
+        output = self.call_command()
+        self.assertIn('Strike data not modified.', output)
+        self.assertFalse(Strike.objects.exists())
+
+        # Import the cached payload.
+        output = self.call_command(
+            '--from-file', os.path.join(self.cache_dir, 'strike.json.gz'))
+        self.assertIn('Strikes: 1', output)
+
+    def test_profile(self):
+        """
+        Import stages are printed and written as JSON.
+        """
+        profile_path = os.path.join(self.cache_dir, 'profile.json')
+        output = self.call_command('--profile-json', profile_path)
+        self.assertIn('download', output)
+
+        with open(profile_path) as profile_file:
+            profile = json.load(profile_file)
+        stages = [stage['name'] for stage in profile['stages']]
+        self.assertEqual(stages[:2], ['download', 'prefetch'])
+        self.assertIn('commit', stages)
+
+
+class GeocodeStrikesTest(BaseTestCase):
+    """
+    End to end tests for the geocode_strikes command.
+    """
+
+    def test_geocode_strikes(self):
+        """
+        Pending strikes are geocoded with the fixture backend and imported.
+        """
+        strike = dict(FeedHandler.payload['strike'][0], lat='', lon='')
+        PendingStrike.objects.create(
+            number=1, country='Yemen', location='Marib Province', data=strike)
+
+        cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        fixture_path = os.path.join(cache_dir, 'geocodes.json')
+        with open(fixture_path, 'w') as fixture:
+            json.dump([{
+                'country': 'Yemen', 'location': 'Marib Province',
+                'lat': 15.47467, 'lon': 45.322755}], fixture)
+
+        stdout = StringIO()
+        with override_settings(STRIKE_GEOCODER_FIXTURE=fixture_path):
+            call_command(
+                'geocode_strikes', '--backend', 'strike.geocoders.FixtureGeocoder',
+                '--concurrency', '2', '--rate-limit', '100', stdout=stdout)
+        self.assertIn('Found: 1', stdout.getvalue())
+        self.assertIn('Strikes: 1', stdout.getvalue())
+        self.assertEqual(Strike.objects.get().location.town, '')
+        self.assertFalse(PendingStrike.objects.exists())
+        GeocodedPlace.objects.get(country='Yemen')
+
+
+class GenerateDataTest(BaseTestCase):
+    """
+    End to end tests for the generate_data command.
+    """
+
+    def test_generate_data(self):
+        """
+        Gzip compressed feeds are written and can be imported from file.
+        """
+        output_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        path = os.path.join(output_dir, 'strike.json.gz')
+
+        call_command(
+            'generate_data', path, '--strikes', '30', '--locations', '5',
+            stdout=StringIO())
+        with gzip.open(path, 'rt') as feed:
+            self.assertEqual(len(json.load(feed)['strike']), 30)
+
+        call_command('import_data', '--from-file', path, stdout=StringIO())
+        self.assertEqual(Strike.objects.count(), 30)
+
+
+class ExportDataTest(BaseTestCase):
+    """
+    End to end tests for the export_data command.
+    """
+
+    def test_export_data(self):
+        """
+        Imported strikes are exported in chunks, filtered by country.
+        """
+        output_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        feed_path = os.path.join(output_dir, 'strike.json')
+        call_command(
+            'generate_data', feed_path, '--strikes', '20', '--countries', '2',
+            stdout=StringIO())
+        call_command('import_data', '--from-file', feed_path, stdout=StringIO())
+
+        stdout = StringIO()
+        call_command(
+            'export_data', '--format', 'ndjson', '--country', 'Yemen',
+            '--chunk-size', '3', stdout=stdout)
+        strikes = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(
+            len(strikes), Strike.objects.filter(location__country__name='Yemen').count())
+        self.assertEqual({strike['country'] for strike in strikes}, {'Yemen'})
+
+        path = os.path.join(output_dir, 'strikes.csv')
+        call_command('export_data', '--output', path, stdout=StringIO())
+        with open(path) as export:
+            self.assertEqual(len(list(csv.reader(export))), 21)
+
+        with self.assertRaises(CommandError):
+            call_command('export_data', '--daterange', '2011', stdout=StringIO())
+
+
+class SeedTilesTest(BaseTestCase):
+    """
+    End to end tests for the seed_tiles command.
+    """
+
+    def test_seed_tiles(self):
+        """
+        Tiles of imported strikes are seeded and then served from disk.
+        """
+        output_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        feed_path = os.path.join(output_dir, 'strike.json')
+        call_command('generate_data', feed_path, '--strikes', '20', stdout=StringIO())
+        call_command('import_data', '--from-file', feed_path, stdout=StringIO())
+
+        stdout = StringIO()
+        with override_settings(STRIKE_DATA_CACHE_DIR=output_dir):
+            call_command('seed_tiles', '--max-zoom', '2', stdout=stdout)
+            self.assertIn('Seeded', stdout.getvalue())
+            self.assertTrue(os.path.isdir(os.path.join(output_dir, 'tiles')))
+
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse('tile', kwargs={'z': 0, 'x': 0, 'y': 0}))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.content)
+
+
+class CreatePartitionsTest(BaseTestCase):
+    """
+    End to end tests for the create_partitions command.
+    """
+
+    def test_create_partitions(self):
+        """
+        Missing partitions are created and reported.
+        """
+        stdout = StringIO()
+        call_command('create_partitions', '--years-ahead', '3', stdout=stdout)
+        self.assertIn('Created', stdout.getvalue())
+
+        stdout = StringIO()
+        call_command('create_partitions', '--years-ahead', '3', stdout=stdout)
+        self.assertIn('Created 0 partitions.', stdout.getvalue())
@@ -1,18 +1,59 @@
+import array
+import copy
+import csv
 import freezegun
+import gzip
+import io
 import json
 import mock
+import os
+import shutil
+import struct
+import time
 from datetime import date
+from decimal import Decimal
+from tempfile import mkdtemp
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings
 from django.urls import reverse
-from strike.helpers import Importer
-from strike.models import Location, Country, Strike
-from strike.serializers import LocationSerializer
-from strike.views import IndexView
+from strike.benchmarks import Benchmark
+from strike.cache import (
+    bump_dataset_version, get_countries, get_dataset_version, get_marker_index)
+from strike.helpers import (
+    GeocodeBackfill, ImportProfiler, Importer, LocationIndex, NotModified, chunks)
+from strike.clustering import MarkerIndex, project
+from strike.heatmap import build, get_date_bucket, get_heatmap, get_zoom_band
+from strike.geocoders import BaseGeocoder, FixtureGeocoder, GeocodeError, RateLimiter
+from strike.fields import Point, PointDistance
+from strike.models import (
+    Location, Country, Strike, PendingStrike, GeocodedPlace, Suggestion, get_radius_box,
+    parse_casualties)
+from strike.partitions import create_partitions
+from strike.serializers import LocationSerializer, StrikeImportSerializer, StrikeSerializer
+from strike.synthetic import SyntheticFeed
+from strike.tiles import (
+    build as build_tile, clean_versions, encode_layer, get_filter_digest, get_filter_form,
+    get_path, get_tile, get_tile_bounds, seed, write_tile)
+from strike.timeline import build as build_timeline, get_timeline
+from strike.views import IndexView, MarkerView
 from strike.forms import StrikeFilterForm
 from rest_framework import exceptions
+from urllib.error import HTTPError
 from .base import BaseTestCase
 
 
+def get_feed_stream(strikes):
+    """
+    Return a valid feed of strikes as a file object.
+    """
+    return io.BytesIO(json.dumps({'status': 'OK', 'strike': strikes}).encode())
+
+
 class ImporterTest(BaseTestCase):
     """
     Unit tests for import data helper function.
@@ -22,6 +63,8 @@ class ImporterTest(BaseTestCase):
         super(ImporterTest, self).setUp()
         self.importer = Importer()
         self.importer.data_url = None
+        self.importer.cache_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.importer.cache_dir)
         self.test_data = {
             'success': True,
             'data': {
@@ -100,106 +143,127 @@ class ImporterTest(BaseTestCase):
         self.assertEqual(self.importer.parse_name(name), 'Pakistan_Afganistan_Border')
 
     @mock.patch('strike.helpers.urlopen')
-    def test_get_json_bad_request(self, urlopen):
+    def test_import_data_url(self, urlopen):
         """
-        get_json bad request.
+        Make sure that data is streamed from the data URL if JSON data is not
+        loaded.
         """
-        class ResponseInvalid(object):
-            code = 400
+        class ResponseInvalidData(io.BytesIO):
+            code = 200
+            headers = {}
 
-        response = ResponseInvalid()
+        response = ResponseInvalidData('{"status": "NOT OK", "foo": "bar"}'.encode())
         urlopen.return_value = response
-        status = self.importer.get_json()
-        self.assertDictEqual(status, {'success': False, 'error': 'Bad request.'})
-
-    @mock.patch('strike.helpers.urlopen')
-    def test_get_json_invalid_json(self, urlopen):
-        """
-        get_json invalid JSON file.
-        """
-        class Doc(object):
-            def count(self, *args, **kargs):
-                return 1
-
-            def rfind(self, *args, **kargs):
-                return 0
-
-        class ResponseInvalid(object):
-            code = 200
 
-            def read(self):
-                raise json.JSONDecodeError(msg='', doc=Doc(), pos=3)
+        # Reinit importer.
+        self.importer = Importer()
+        self.data_url = None
 
-        response = ResponseInvalid()
-        urlopen.return_value = response
-        status = self.importer.get_json()
-        self.assertDictEqual(
-            status, {'success': False, 'error': 'Not a valid JSON file.'})
+        # Make sure that the response was parsed.
+        with self.assertRaises(ValidationError) as error:
+            self.importer.import_data()
+        self.assertEqual(error.exception.message, 'Data not valid.')
 
     @mock.patch('strike.helpers.urlopen')
-    def test_get_json_invalid_data(self, urlopen):
+    def test_fetch(self, urlopen):
         """
-        get_json invalid data.
+        Payloads are cached gzip compressed, and cached validators are sent
+        with conditional requests.
         """
-        class ResponseInvalidData(object):
+        class Response(io.BytesIO):
             code = 200
+            headers = {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2018 00:00:00 GMT'}
+
+        self.importer.data_url = 'http://localhost/data'
+        urlopen.return_value = Response('{"status": "OK", "strike": []}'.encode())
+        path = self.importer.fetch()
+        with gzip.open(path) as cache_file:
+            self.assertEqual(json.loads(cache_file.read().decode()), {'status': 'OK', 'strike': []})
+        request = urlopen.call_args[0][0]
+        self.assertEqual(request.get_header('Accept-encoding'), 'gzip')
+        self.assertIsNone(request.get_header('If-none-match'))
+
+        # Cached validators are used once the import succeeded.
+        self.importer.save_cache_meta()
+        urlopen.side_effect = HTTPError(None, 304, 'Not Modified', {}, None)
+        with self.assertRaises(NotModified):
+            self.importer.fetch()
+        request = urlopen.call_args[0][0]
+        self.assertEqual(request.get_header('If-none-match'), '"v1"')
+        self.assertEqual(
+            request.get_header('If-modified-since'), 'Mon, 01 Jan 2018 00:00:00 GMT')
 
-            def read(self):
-                return '{"status": "NOT OK", "foo": "bar"}'.encode()
-
-        response = ResponseInvalidData()
-        urlopen.return_value = response
-        status = self.importer.get_json()
-        self.assertDictEqual(
-            status, {'success': False, 'error': 'Data not valid.'})
+        # Other HTTP errors.
+        urlopen.side_effect = HTTPError(None, 500, 'Server Error', {}, None)
+        with self.assertRaises(ValidationError) as error:
+            self.importer.fetch()
+        self.assertEqual(error.exception.message, 'Bad request.')
 
-    @mock.patch('strike.helpers.urlopen')
-    def test_get_json_success(self, urlopen):
+    def test_iter_strikes(self):
         """
-        get_json success.
+        Strike records are parsed one at a time, and the top-level status is
+        validated wherever it appears.
         """
-        class Response(object):
-            code = 200
+        feed = {'status': 'OK', 'strike': copy.deepcopy(self.test_data['data']['strike'])}
+        stream = io.BytesIO(json.dumps(feed).encode())
+        self.assertEqual(
+            list(self.importer.iter_strikes(stream)), self.test_data['data']['strike'])
 
-            def read(self):
-                return '{"status": "OK", "foo": "bar"}'.encode()
+        # Status after the strike array.
+        stream = io.BytesIO('{"strike": [{"number": 1}], "status": "NOT OK"}'.encode())
+        strikes = self.importer.iter_strikes(stream)
+        self.assertEqual(next(strikes), {'number': 1})
+        with self.assertRaises(ValidationError) as error:
+            next(strikes)
+        self.assertEqual(error.exception.message, 'Data not valid.')
 
-        response = Response()
-        urlopen.return_value = response
-        status = self.importer.get_json()
-        self.assertDictEqual(
-            status, {'success': True, 'data': {"status": "OK", "foo": "bar"}})
+        # Missing status.
+        stream = io.BytesIO('{"strike": []}'.encode())
+        with self.assertRaises(ValidationError) as error:
+            list(self.importer.iter_strikes(stream))
+        self.assertEqual(error.exception.message, 'Data not valid.')
 
-    @mock.patch('strike.helpers.urlopen')
-    def test_import_data_get_json(self, urlopen):
+        # Invalid JSON.
+        stream = io.BytesIO('{"status": "OK", "strike": [{"number": }'.encode())
+        with self.assertRaises(ValidationError) as error:
+            list(self.importer.iter_strikes(stream))
+        self.assertEqual(error.exception.message, 'Not a valid JSON file.')
+
+    def test_import_data_stream(self):
         """
-        Make sure that get_json is called if JSON data is not loaded.
+        Strikes are imported from a file object, and nothing is imported if
+        the feed status is not valid.
         """
-        class ResponseInvalidData(object):
-            code = 200
-
-            def read(self):
-                return '{"status": "NOT OK", "foo": "bar"}'.encode()
-
-        response = ResponseInvalidData()
-        urlopen.return_value = response
+        self.country.delete()
+        feed = {'strike': self.test_data['data']['strike'], 'status': 'OK'}
+        stream = io.BytesIO(json.dumps(feed).encode())
+        counter = self.importer.import_data(stream)
+        self.assertDictEqual(
+            counter,
+            {'locations': 1, 'strikes': 1, 'countries': 1, 'missing_coor': 1}
+        )
 
-        # Reinit importer.
-        self.importer = Importer()
-        self.data_url = None
+        # Status following the strike array rolls back the import.
+        Strike.objects.all().delete()
+        feed['status'] = 'NOT OK'
+        stream = io.BytesIO(json.dumps(feed).encode())
+        with self.assertRaises(ValidationError):
+            self.importer.import_data(stream)
+        self.assertFalse(Strike.objects.exists())
 
-        # Make sure that get_json was called.
-        with self.assertRaises(ValidationError) as error:
-            self.importer.import_data()
-        self.assertEqual(error.exception.message, 'Data not valid.')
+    def test_chunks(self):
+        """
+        Iterables are split into lists of fixed size.
+        """
+        self.assertEqual(list(chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunks([], 2)), [])
 
     def test_import_data_empty_coor(self):
         """
         Make sure empty coordinates and all related data are not imported.
         """
         self.country.delete()
-        self.importer.data = self.test_data
-        counter = self.importer.import_data()
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
         self.assertDictEqual(
             counter,
             {'locations': 1, 'strikes': 1, 'countries': 1, 'missing_coor': 1}
@@ -219,8 +283,7 @@ class ImporterTest(BaseTestCase):
         strike_data['lon'] = '47.777777'
 
         self.country.delete()
-        self.importer.data = self.test_data
-        counter = self.importer.import_data()
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
         self.assertDictEqual(
             counter,
             {'locations': 2, 'strikes': 2, 'countries': 1, 'missing_coor': 0}
@@ -242,8 +305,7 @@ class ImporterTest(BaseTestCase):
         strike_data['lon'] = '45.322755'
 
         self.country.delete()
-        self.importer.data = self.test_data
-        counter = self.importer.import_data()
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
         self.assertDictEqual(
             counter,
             {'locations': 1, 'strikes': 2, 'countries': 1, 'missing_coor': 0}
@@ -263,8 +325,7 @@ class ImporterTest(BaseTestCase):
         strike_data['names'] = 666
 
         self.country.delete()
-        self.importer.data = self.test_data
-        counter = self.importer.import_data()
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
         self.assertDictEqual(
             counter,
             {'countries': 1, 'strikes': 1, 'missing_coor': 0, 'locations': 1}
@@ -278,6 +339,327 @@ class ImporterTest(BaseTestCase):
         self.assertEqual(location.country, country)
         self.assertEqual(strike.location, location)
 
+    def test_import_data_existing(self):
+        """
+        Make sure that existing countries, locations and strike numbers are
+        reused instead of duplicated.
+        """
+        strike_data = self.test_data['data']['strike'][1]
+        strike_data['country'] = 'Yemen'
+        strike_data['lat'] = '15.474670000'
+        strike_data['lon'] = '45.322755'
+
+        self.country.delete()
+        self.importer.import_data(get_feed_stream(self.test_data['data']['strike'][:1]))
+
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertDictEqual(
+            counter,
+            {'locations': 0, 'strikes': 1, 'countries': 0, 'missing_coor': 0}
+        )
+        self.assertEqual(Strike.objects.count(), 2)
+        Country.objects.get(), Location.objects.get()
+
+    def test_import_data_batch_size(self):
+        """
+        Strikes are written in batches, with a constant number of queries per
+        batch.
+        """
+        strike_data = self.test_data['data']['strike'][1]
+        strike_data['lat'] = '16.66666'
+        strike_data['lon'] = '47.777777'
+
+        self.country.delete()
+        self.importer = Importer(batch_size=1)
+
+        # Savepoint and release, 5 prefetches, 3 inserts and a search vector
+        # update per batch, and the suggestion delete and insert.
+        with self.assertNumQueries(17):
+            counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertDictEqual(
+            counter,
+            {'locations': 2, 'strikes': 2, 'countries': 2, 'missing_coor': 0}
+        )
+        self.assertEqual(
+            list(Strike.objects.values_list(
+                'location__country__name', flat=True).order_by('number')),
+            ['Yemen', 'Pakistan']
+        )
+
+
+    def test_import_data_incremental(self):
+        """
+        Incremental imports update changed strikes, skip unchanged ones and
+        optionally delete strikes missing from the feed.
+        """
+        strike_data = self.test_data['data']['strike'][1]
+        strike_data['lat'] = '16.66666'
+        strike_data['lon'] = '47.777777'
+
+        self.country.delete()
+        self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+
+        # Plain imports skip existing strikes.
+        strikes = self.test_data['data']['strike']
+        strikes[0]['deaths'] = '7'
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertEqual(counter['strikes'], 0)
+        self.assertEqual(Strike.objects.get(number=1).deaths, '6')
+        self.assertEqual(Strike.objects.get(number=1).deaths_high, 6)
+
+        # Changed strikes are updated, unchanged are skipped.
+        self.importer = Importer(incremental=True)
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertDictEqual(counter, {
+            'locations': 0, 'strikes': 0, 'countries': 0, 'missing_coor': 0,
+            'updated': 1, 'unchanged': 1, 'deleted': 0
+        })
+        self.assertEqual(Strike.objects.get(number=1).deaths, '7')
+        self.assertEqual(Strike.objects.get(number=1).deaths_high, 7)
+
+        # New strikes are inserted and missing strikes deleted.
+        strikes[1]['number'] = 3
+        self.importer = Importer(incremental=True, delete_missing=True)
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertDictEqual(counter, {
+            'locations': 0, 'strikes': 1, 'countries': 0, 'missing_coor': 0,
+            'updated': 0, 'unchanged': 1, 'deleted': 1
+        })
+        self.assertEqual(
+            list(Strike.objects.values_list('number', flat=True).order_by('number')),
+            [1, 3]
+        )
+
+    def test_normalize_strike(self):
+        """
+        Raw records are validated without database access, and skipped
+        records carry an error key.
+        """
+        strike_data = copy.deepcopy(self.test_data['data']['strike'])
+        with self.assertNumQueries(0):
+            record = self.importer.normalize_strike(strike_data[0])
+        self.assertIsNone(record['error'])
+        self.assertEqual(record['number'], 1)
+        self.assertEqual(record['country'], 'Yemen')
+        self.assertEqual(str(record['location']['lat']), '15.474670000')
+        self.assertEqual(record['strike']['date'], date(2002, 11, 3))
+
+        self.assertEqual(
+            self.importer.normalize_strike(strike_data[1])['error'], 'missing_lat')
+
+        strike_data = copy.deepcopy(self.test_data['data']['strike'][0])
+        strike_data['names'] = 666
+        self.assertEqual(self.importer.normalize_strike(strike_data)['error'], 'invalid')
+
+    def test_import_data_workers(self):
+        """
+        Records normalized in a process pool are imported in feed order.
+        """
+        strikes = self.test_data['data']['strike']
+        strikes[1]['lat'] = '16.66666'
+        strikes[1]['lon'] = '47.777777'
+        strikes.append(copy.deepcopy(strikes[0]))
+        strikes[2]['number'] = 3
+
+        self.country.delete()
+        self.importer = Importer(batch_size=1, workers=2)
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertDictEqual(
+            counter,
+            {'locations': 2, 'strikes': 3, 'countries': 2, 'missing_coor': 0}
+        )
+        self.assertEqual(
+            list(Strike.objects.order_by('id').values_list('number', flat=True)),
+            [1, 2, 3]
+        )
+
+    def test_import_data_pending(self):
+        """
+        Strikes without coordinates are queued for geocoding once, and
+        imported with cached coordinates when their place was geocoded.
+        """
+        self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        pending = PendingStrike.objects.get()
+        self.assertEqual(pending.number, 2)
+        self.assertEqual(
+            (pending.country, pending.location, pending.town),
+            ('Pakistan', 'South Waziristan', 'Wana')
+        )
+        self.assertEqual(pending.data, self.test_data['data']['strike'][1])
+
+        # Pending strikes are not duplicated.
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertEqual(counter['missing_coor'], 1)
+        self.assertEqual(PendingStrike.objects.count(), 1)
+
+        # Geocoded places are used during import.
+        GeocodedPlace.objects.create(
+            country='Pakistan', location='South Waziristan', town='Wana',
+            lat='32.3', lon='69.6')
+        counter = self.importer.import_data(get_feed_stream(self.test_data['data']['strike']))
+        self.assertDictEqual(
+            counter,
+            {'locations': 1, 'strikes': 1, 'countries': 1, 'missing_coor': 0}
+        )
+        strike = Strike.objects.get(number=2)
+        self.assertEqual(strike.location.lat, Decimal('32.3'))
+        self.assertEqual(strike.location.town, 'Wana')
+
+    def test_get_hash(self):
+        """
+        Content hash ignores the upstream id and key order.
+        """
+        strike = {'_id': 'a', 'number': 1, 'deaths': '6'}
+        self.assertEqual(
+            self.importer.get_hash(strike),
+            self.importer.get_hash({'deaths': '6', 'number': 1, '_id': 'b'})
+        )
+        self.assertNotEqual(
+            self.importer.get_hash(strike),
+            self.importer.get_hash({'number': 1, 'deaths': '7'})
+        )
+
+
+class ImportProfilerTest(BaseTestCase):
+    """
+    Unit tests for the import stage profiler.
+    """
+
+    def test_stage(self):
+        """
+        Stages accumulate calls, time, queries and peak memory.
+        """
+        profiler = ImportProfiler(enabled=True)
+        with profiler:
+            for i in range(2):
+                with profiler.stage('prefetch'):
+                    list(Country.objects.all())
+                    data = [0] * 100000
+            self.assertEqual(list(profiler.iterate('decode', [1, 2])), [1, 2])
+
+        prefetch = profiler.stages['prefetch']
+        self.assertEqual(prefetch['calls'], 2)
+        self.assertEqual(prefetch['queries'], 2)
+        self.assertGreater(prefetch['peak_memory'], len(data) * 8)
+        self.assertEqual(profiler.stages['decode']['calls'], 3)
+        self.assertEqual(profiler.as_dict()['queries'], 2)
+        self.assertIn('prefetch', profiler.table())
+
+        # Queries outside the profiler are not counted.
+        list(Country.objects.all())
+        self.assertEqual(profiler.queries, 2)
+
+    def test_disabled(self):
+        """
+        Disabled profilers record nothing.
+        """
+        profiler = ImportProfiler()
+        iterable = [1, 2]
+        with profiler:
+            with profiler.stage('prefetch'):
+                list(Country.objects.all())
+            self.assertIs(profiler.iterate('decode', iterable), iterable)
+        self.assertEqual(profiler.stages, {})
+
+    def test_import_data(self):
+        """
+        Import stages are recorded when profiling is enabled.
+        """
+        importer = Importer(profile=True)
+        importer.import_data(get_feed_stream([{'number': 1, 'lat': ''}]))
+        self.assertEqual(
+            list(importer.profiler.stages),
+            ['prefetch', 'decode', 'validate', 'resolve', 'write', 'commit']
+        )
+        self.assertEqual(importer.profiler.stages['prefetch']['queries'], 5)
+
+
+class GeocodeBackfillTest(BaseTestCase):
+    """
+    Unit tests for geocoding pending strikes.
+    """
+
+    class Geocoder(BaseGeocoder):
+        places = {('Pakistan', 'South Waziristan', 'Wana'): (32.3, 69.6)}
+
+        def __init__(self):
+            self.calls = []
+
+        def geocode(self, country, location, town):
+            self.calls.append((country, location, town))
+            if country == 'Error':
+                raise GeocodeError('UNKNOWN_ERROR')
+            return self.places.get((country, location, town))
+
+    def setUp(self):
+        super(GeocodeBackfillTest, self).setUp()
+        self.geocoder = self.Geocoder()
+        self.backfill = GeocodeBackfill(geocoder=self.geocoder, rate_limit=1000)
+        for number, country in enumerate(['Pakistan', 'Pakistan', 'Yemen', 'Error']):
+            PendingStrike.objects.create(
+                number=number + 1, country=country, location='South Waziristan',
+                town='Wana', data={
+                    '_id': str(number), 'number': number + 1, 'country': country,
+                    'location': 'South Waziristan', 'town': 'Wana', 'lat': '',
+                    'lon': '', 'date': '2004-06-17T00:00:00.000Z', 'articles': [],
+                    'names': ['']
+                })
+
+    def test_geocode(self):
+        """
+        Every place is geocoded once, and only failed lookups are retried.
+        """
+        status = self.backfill.geocode()
+        self.assertDictEqual(
+            status, {'places': 3, 'found': 1, 'not_found': 1, 'errors': 1})
+        self.assertEqual(len(self.geocoder.calls), 3)
+        place = GeocodedPlace.objects.get(country='Pakistan')
+        self.assertEqual((place.lat, place.lon), (Decimal('32.3'), Decimal('69.6')))
+        self.assertIsNone(GeocodedPlace.objects.get(country='Yemen').lat)
+
+        self.geocoder.calls = []
+        self.backfill.geocode()
+        self.assertEqual(self.geocoder.calls, [('Error', 'South Waziristan', 'Wana')])
+
+    def test_import_resolved(self):
+        """
+        Pending strikes with geocoded places are imported and removed.
+        """
+        self.backfill.geocode()
+        status = self.backfill.import_resolved()
+        self.assertEqual(status['strikes'], 2)
+        self.assertEqual(status['resolved'], 2)
+        self.assertEqual(
+            list(PendingStrike.objects.order_by('number').values_list('number', flat=True)),
+            [3, 4]
+        )
+        Location.objects.get(lat=Decimal('32.3'), lon=Decimal('69.6'))
+
+    def test_fixture_geocoder(self):
+        """
+        Fixture geocoder reads places from a JSON file.
+        """
+        path = os.path.join(mkdtemp(), 'geocodes.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as fixture:
+            json.dump([{
+                'country': 'Pakistan', 'location': 'South Waziristan',
+                'town': 'Wana', 'lat': 32.3, 'lon': 69.6}], fixture)
+
+        geocoder = FixtureGeocoder(path)
+        self.assertEqual(geocoder.geocode('Pakistan', 'South Waziristan', 'Wana'), (32.3, 69.6))
+        self.assertIsNone(geocoder.geocode('Pakistan', '', ''))
+
+    def test_rate_limiter(self):
+        """
+        Calls are spaced by the rate limit interval.
+        """
+        rate_limiter = RateLimiter(20)
+        started = time.monotonic()
+        for i in range(3):
+            rate_limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
 
 class LocationSerializerTest(BaseTestCase):
     """
@@ -304,86 +686,579 @@ class LocationSerializerTest(BaseTestCase):
             str(error.exception.detail['instance']), str(location.id))
 
 
-class LocationTest(BaseTestCase):
+class LocationIndexTest(BaseTestCase):
     """
-    Unit tests for import data helper function.
+    Unit tests for the importer location index.
     """
 
-    def test_str(self):
+    def test_load(self):
         """
-        Ensure proper str representation is returned.
+        Locations with coordinates are loaded in a single query, and looked
+        up by normalized lat and lon values.
         """
-        location = Location.objects.create(country=self.country)
-        self.assertEqual(str(location), '%d. SasaLand' % location.id)
+        location = Location.objects.create(
+            country=self.country, lat='32.832865890', lon='69.660186770')
+        Location.objects.create(country=self.country)
+
+        with self.assertNumQueries(1):
+            location_index = LocationIndex().load()
+        self.assertEqual(len(location_index), 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(location_index.get('32.83286589', 69.66018677), location)
+            self.assertEqual(
+                location_index.get(Decimal('32.832865890'), Decimal('69.660186770')),
+                location
+            )
+            self.assertIsNone(location_index.get('32.8', '69.6'))
+
+    def test_add(self):
+        """
+        Added locations can be looked up before they are saved.
+        """
+        location_index = LocationIndex()
+        location = Location(country=self.country, lat='1.5', lon='-2')
+        location_index.add(location)
+        self.assertEqual(location_index.get('1.500', '-2.0'), location)
 
-        # Town str
-        location.town = 'Gotham'
-        location.save()
-        self.assertEqual(str(location), '%d. SasaLand - Gotham' % location.id)
 
-    def test_strike_info(self):
+class SyntheticFeedTest(BaseTestCase):
+    """
+    Unit tests for the synthetic feed generator.
+    """
+
+    def test_deterministic(self):
         """
-        Returns a list or a dict, depending on a set of values related to the
-        selected instance.
+        The same seed generates the same strikes.
         """
-        location = Location.objects.create(country=self.country)
+        feed = SyntheticFeed(strikes=20, locations=5, countries=2, seed=3)
+        self.assertEqual(list(feed), list(feed))
+        self.assertNotEqual(
+            list(feed), list(SyntheticFeed(strikes=20, locations=5, countries=2, seed=4)))
 
-        # No related strike
-        self.assertEqual(location.strike_info, {})
+    def test_import(self):
+        """
+        Generated feeds are valid importer input.
+        """
+        feed = SyntheticFeed(strikes=50, locations=10, countries=3)
+        stream = io.StringIO()
+        feed.write(stream)
+        self.assertEqual(len(json.loads(stream.getvalue())['strike']), 50)
 
-        # One related strike
-        Strike.objects.create(
-            number=666,
-            location=location,
-            date=date(2002, 2, 1),
-            articles=[],
-            names=[],
-            deaths='4'
-        )
-        strike_info = {
-            'detail': True,
-            'number': 666,
-            'date': '02-01-2002',
-            'deaths': '4'
-        }
-        self.assertDictEqual(location.strike_info, strike_info)
+        counter = Importer().import_data(io.BytesIO(stream.getvalue().encode()))
+        self.assertEqual(counter['strikes'], 50)
+        self.assertEqual(counter['locations'], 10)
+        self.assertEqual(counter['countries'], 3)
 
-        # Multiple related strikes
-        Strike.objects.create(
-            number=777,
-            location=location,
-            date=date(2003, 3, 2),
-            articles=[],
-            names=[],
-            deaths='3'
-        )
 
-        strike_info1 = {
-            'number': 666,
-            'date': '02-01-2002',
-        }
-        strike_info2 = {
-            'number': 777,
-            'date': '03-02-2003',
-        }
-        self.assertFalse(location.strike_info['detail'])
-        self.assertEqual(location.strike_info['num_of_strikes'], 2)
-        self.assertIn(strike_info1, location.strike_info['strikes'])
-        self.assertIn(strike_info2, location.strike_info['strikes'])
+class BenchmarkTest(BaseTestCase):
+    """
+    Unit tests for the import and view benchmark.
+    """
 
+    def test_run(self):
+        """
+        Every size reports import, map page, search and nearest timings.
+        """
+        sizes = []
+        version = get_dataset_version()
+        data_cache_files = sorted(os.listdir(settings.STRIKE_DATA_CACHE_DIR))
+        results = Benchmark([10], repeat=2).run(
+            callback=lambda results: sizes.append(len(results)))
+        self.assertEqual(sizes, [5])
+        self.assertEqual(
+            [result['name'] for result in results],
+            ['import_data', 'IndexView.get', 'IndexView.cached', 'SearchView.get',
+             'NearestView.get'])
+        # Cold requests run the view's queries every time, cached ones none.
+        self.assertGreater(results[1]['queries'], 0)
+        self.assertEqual(results[2]['queries'], 0)
+        self.assertEqual(results[1]['calls'], 2)
+        self.assertLessEqual(results[1]['min'], results[1]['max'])
+        self.assertEqual(Strike.objects.count(), 10)
+        self.assertIn('IndexView.get', Benchmark.table(results))
+
+        # Search is timed on matching strikes.
+        self.assertTrue(Strike.objects.search('pakistan').exists())
+        with self.assertRaises(ValueError):
+            Benchmark([10], repeat=1, search_query='a').run()
+
+        # The configured caches and data cache directory are left alone.
+        self.assertEqual(get_dataset_version(), version)
+        self.assertEqual(sorted(os.listdir(settings.STRIKE_DATA_CACHE_DIR)), data_cache_files)
+
+
+class DatasetCacheTest(BaseTestCase):
+    """
+    Unit tests for dataset versioned caching.
+    """
 
-class SearchView(BaseTestCase):
+    def test_get_countries(self):
+        """
+        Countries with locations are listed in a single query and cached
+        until the dataset version changes.
+        """
+        Location.objects.create(country=self.country, town='B Town')
+        Location.objects.create(country=self.country)
+        Location.objects.create(country=Country.objects.create(name='Yemen'), town='Sanaa')
+        iraq = Country.objects.create(name='Iraq')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_countries(), ['SasaLand', 'Yemen'])
+
+        Location.objects.bulk_create([Location(country=iraq)])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_countries(), ['SasaLand', 'Yemen'])
+
+        bump_dataset_version()
+        self.assertEqual(get_countries(), ['Iraq', 'SasaLand', 'Yemen'])
+
+        # Saved locations start a new version.
+        Location.objects.create(country=Country.objects.create(name='Mali'))
+        self.assertIn('Mali', get_countries())
+
+    def test_dataset_version(self):
+        """
+        Imports that write data and destroy_data start a new dataset version.
+        """
+        version = get_dataset_version()
+        self.assertEqual(get_dataset_version(), version)
+
+        Importer().import_strikes([])
+        self.assertEqual(get_dataset_version(), version)
+
+        Importer().import_strikes(SyntheticFeed(strikes=1))
+        self.assertNotEqual(get_dataset_version(), version)
+
+        version = get_dataset_version()
+        with mock.patch('strike.signals.bump_dataset_version') as signal_bump:
+            call_command('destroy_data', stdout=io.StringIO())
+        signal_bump.assert_not_called()
+        call_command('destroy_data', stdout=io.StringIO())
+        self.assertNotEqual(get_dataset_version(), version)
+
+        # Culling or clearing the default cache keeps the version.
+        version = get_dataset_version()
+        cache.clear()
+        self.assertEqual(get_dataset_version(), version)
+
+    def test_admin_delete(self):
+        """
+        Admin deletes start a single new dataset version, not one per row.
+        """
+        for town in ['A Town', 'B Town']:
+            Location.objects.create(country=self.country, town=town)
+        location_admin = admin.site._registry[Location]
+
+        with mock.patch('strike.admin.bump_dataset_version') as bump, \
+                mock.patch('strike.signals.bump_dataset_version') as signal_bump:
+            location_admin.delete_queryset(None, Location.objects.all())
+        bump.assert_called_once_with()
+        signal_bump.assert_not_called()
+
+        with mock.patch('strike.admin.bump_dataset_version') as bump:
+            admin.site._registry[Country].delete_model(None, self.country)
+        bump.assert_called_once_with()
+
+
+class MarkerIndexTest(BaseTestCase):
     """
-    Unit tests for search view.
+    Unit tests for the marker clustering grid.
     """
 
     def setUp(self):
-        super(SearchView, self).setUp()
-        self.view = SearchView()
+        super(MarkerIndexTest, self).setUp()
+        self.marker_index = MarkerIndex(grid_size=64, max_zoom=16).load([
+            (1, Decimal('15.47467'), Decimal('45.322755')),
+            (2, Decimal('15.47'), Decimal('45.32')),
+            (3, Decimal('33.0'), Decimal('70.0')),
+            (4, None, None),
+        ])
+
+    def test_project(self):
+        """
+        Coordinates are projected to Web Mercator pixels.
+        """
+        self.assertEqual(project(0, 0, 0), (128, 128))
+        self.assertEqual(project(0, -180, 1), (0, 256))
 
-    def test_get_search(self):
+    def test_cluster(self):
         """
-        Basic search through all text fields.
+        Nearby locations are merged at low zoom levels and split at high
+        ones, with strike weighted centers.
+        """
+        self.assertEqual(len(self.marker_index), 3)
+        counts = {1: 3, 2: 1, 3: 2, 4: 5}
+
+        cells = sorted(self.marker_index.cluster(counts, 2), key=lambda cell: cell['lat'])
+        self.assertEqual([cell['locations'] for cell in cells], [[1, 2], [3]])
+        self.assertEqual(cells[0]['strikes'], 4)
+        self.assertAlmostEqual(cells[0]['lat'], (15.47467 * 3 + 15.47) / 4)
+
+        cells = self.marker_index.cluster(counts, 17)
+        self.assertEqual(sorted(cell['locations'] for cell in cells), [[1], [2], [3]])
+
+        # Locations without strikes or outside the bbox are left out.
+        cells = self.marker_index.cluster({1: 1, 3: 2}, 2, bbox=(40, 10, 50, 20))
+        self.assertEqual([cell['locations'] for cell in cells], [[1]])
+        cells = self.marker_index.cluster({1: 1, 3: 2}, 2, bbox=(60, 10, -170, 40))
+        self.assertEqual([cell['locations'] for cell in cells], [[3]])
+
+
+class LocationPointTest(BaseTestCase):
+    """
+    Unit tests for location points and spatial queries.
+    """
+
+    def setUp(self):
+        super(LocationPointTest, self).setUp()
+        self.sanaa = Location.objects.create(
+            country=self.country, town='Sanaa', lat='15.369445', lon='44.191007')
+        self.marib = Location.objects.create(
+            country=self.country, town='Marib', lat='15.47467', lon='45.322755')
+        self.wana = Location.objects.create(
+            country=self.country, town='Wana', lat='32.29', lon='69.57')
+        Location.objects.create(country=self.country)
+
+    def test_point(self):
+        """
+        Points are set from lat and lon, and matched by equality.
+        """
+        location = Location.objects.get(id=self.marib.id)
+        self.assertEqual(location.point, Point(45.322755, 15.47467))
+        self.assertEqual((location.point.x, location.point.y), (45.322755, 15.47467))
+        self.assertEqual(
+            list(Location.objects.filter(point__same_as=Point('45.322755', '15.47467'))),
+            [self.marib])
+        self.assertEqual(Location.objects.filter(point=None).count(), 1)
+
+        # Imported locations get points.
+        Importer().import_strikes(SyntheticFeed(strikes=5, locations=2))
+        self.assertEqual(Location.objects.filter(point=None).count(), 1)
+
+    def test_within_bbox(self):
+        """
+        Locations are filtered by bounding box through the GiST index.
+        """
+        self.assertEqual(
+            set(Location.objects.within_bbox(44, 15, 46, 16)), {self.sanaa, self.marib})
+        self.assertEqual(list(Location.objects.within_bbox(45, 15, 46, 16)), [self.marib])
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            queryset = Location.objects.within_bbox(45, 15, 46, 16)
+            self.assertIn('strike_loca_point', queryset.explain())
+
+    def test_within_radius(self):
+        """
+        Locations are filtered and annotated by great-circle distance.
+        """
+        locations = Location.objects.within_radius(15.369445, 44.191007, 150).order_by('distance')
+        self.assertEqual(list(locations), [self.sanaa, self.marib])
+        self.assertAlmostEqual(locations[0].distance, 0, places=3)
+        self.assertAlmostEqual(locations[1].distance, 122, delta=2)
+        self.assertEqual(
+            list(Location.objects.within_radius(15.369445, 44.191007, 100)), [self.sanaa])
+
+    def test_nearest(self):
+        """
+        The k nearest locations are ordered by great-circle distance, found
+        with a GiST nearest-neighbour scan.
+        """
+        locations = Location.objects.nearest(15.4, 45.3, 2)
+        self.assertEqual(list(locations), [self.marib, self.sanaa])
+        self.assertAlmostEqual(locations[0].distance, 8.4, delta=0.5)
+        self.assertEqual(list(Location.objects.nearest(30, 70, 1)), [self.wana])
+        self.assertEqual(len(Location.objects.nearest(30, 70, 10)), 3)
+        self.assertEqual(list(Location.objects.filter(point=None).nearest(30, 70, 1)), [])
+
+        # Planar neighbours across the antimeridian are not missed.
+        east = Location.objects.create(country=self.country, lat='0', lon='179.9')
+        Location.objects.create(country=self.country, lat='0', lon='179')
+        self.assertEqual(list(Location.objects.nearest(0, -179.9, 1)), [east])
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            queryset = Location.objects.order_by(PointDistance('point', Point(45.3, 15.4)))[:2]
+            self.assertIn('strike_loca_point', queryset.explain())
+
+    def test_strike_nearest(self):
+        """
+        The k nearest strikes are ordered by distance, then latest first.
+        """
+        for number, (location, strike_date) in enumerate([
+                (self.sanaa, date(2011, 10, 14)), (self.marib, date(2011, 10, 14)),
+                (self.marib, date(2012, 1, 1)), (self.wana, date(2013, 1, 1))]):
+            Strike.objects.create(
+                number=number, location=location, date=strike_date,
+                articles=[], names=[])
+
+        strikes = Strike.objects.nearest(15.4, 45.3, 3)
+        self.assertEqual([strike.number for strike in strikes], [2, 1, 0])
+        self.assertEqual(strikes[0].distance, strikes[1].distance)
+        strikes = Strike.objects.filter(date__gte=date(2012, 1, 1)).nearest(15.4, 45.3, 3)
+        self.assertEqual([strike.number for strike in strikes], [2, 3])
+
+    def test_get_radius_box(self):
+        """
+        Radius boxes enclose the circle, spanning all longitudes near poles
+        and the antimeridian.
+        """
+        west, south, east, north = get_radius_box(0, 0, 111.19)
+        self.assertAlmostEqual(north, 1, places=2)
+        self.assertAlmostEqual(east, 1, places=2)
+        self.assertEqual(get_radius_box(89.5, 0, 100)[::2], (-180, 180))
+        self.assertEqual(get_radius_box(0, 179.5, 100)[::2], (-180, 180))
+
+    def test_strike_filters(self):
+        """
+        Area and near filters select strikes by their location.
+        """
+        for number, location in enumerate([self.sanaa, self.marib, self.wana]):
+            Strike.objects.create(
+                number=number, location=location, date=date(2011, 10, 14),
+                articles=[], names=[])
+        form_data = {'daterange': '10/14/2011 - 10/14/2011', 'country__name': 'all'}
+
+        form = StrikeFilterForm(dict(form_data, area='60,30,70,40'))
+        self.assertEqual([strike.number for strike in form.get_strikes()], [2])
+
+        form = StrikeFilterForm(dict(form_data, near='15.4,45.3,10'))
+        self.assertEqual([strike.number for strike in form.get_strikes()], [1])
+
+        for area in ['1,2,3', '10,0,0,10', 'a,b,c,d']:
+            self.assertFalse(StrikeFilterForm(dict(form_data, area=area)).is_valid())
+        self.assertFalse(StrikeFilterForm(dict(form_data, near='15,45,0')).is_valid())
+
+
+class PartitionTest(BaseTestCase):
+    """
+    Unit tests for the yearly strike partitions.
+    """
+
+    def setUp(self):
+        super(PartitionTest, self).setUp()
+        self.location = Location.objects.create(country=self.country)
+        for number, strike_date in enumerate([date(2011, 10, 14), date(2012, 1, 1)]):
+            Strike.objects.create(
+                number=number, location=self.location, date=strike_date,
+                articles=[], names=[])
+
+    def test_unique_number(self):
+        """
+        Numbers are unique across partitions: (number, date) by constraint,
+        and number alone by model and serializer validation.
+        """
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Strike.objects.create(
+                number=0, location=self.location, date=date(2011, 10, 14),
+                articles=[], names=[])
+
+        strike = Strike(number=0, location=self.location, date=date(2013, 1, 1))
+        with self.assertRaises(ValidationError) as context:
+            strike.validate_unique()
+        self.assertIn('number', context.exception.message_dict)
+        strike.validate_unique(exclude=['number'])
+        Strike.objects.get(number=1).validate_unique()
+
+        data = {
+            'number': 0, 'location': self.location.id, 'date': '2013-01-01',
+            'articles': [], 'names': []}
+        serializer = StrikeSerializer(data=data)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('number', serializer.errors)
+        self.assertTrue(StrikeSerializer(data=dict(data, number=2)).is_valid())
+
+        # The importer resolves numbers itself, without lookups.
+        with self.assertNumQueries(0):
+            self.assertTrue(StrikeImportSerializer(data=data).is_valid())
+
+    def get_partition(self, number):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tableoid::regclass::text FROM strike_strike WHERE number = %s', [number])
+            return cursor.fetchone()[0]
+
+    @freezegun.freeze_time('2013-06-01')
+    def test_create_partitions(self):
+        """
+        Partitions are created from the earliest strike to years ahead, and
+        strikes are moved out of the default partition.
+        """
+        self.assertEqual(self.get_partition(0), 'strike_strike_default')
+        self.assertEqual(create_partitions(1), [
+            'strike_strike_y2011', 'strike_strike_y2012', 'strike_strike_y2013',
+            'strike_strike_y2014'])
+        self.assertEqual(create_partitions(1), [])
+        self.assertEqual(self.get_partition(0), 'strike_strike_y2011')
+        self.assertEqual(Strike.objects.count(), 2)
+
+        # Strikes move between partitions when their date changes.
+        Strike.objects.filter(number=1).update(date=date(2013, 2, 1))
+        self.assertEqual(self.get_partition(1), 'strike_strike_y2013')
+        Strike.objects.create(
+            number=2, location=self.location, date=date(2020, 1, 1), articles=[], names=[])
+        self.assertEqual(self.get_partition(2), 'strike_strike_default')
+
+    @freezegun.freeze_time('2013-06-01')
+    def test_pruning(self):
+        """
+        Date range queries only scan the partitions of their years.
+        """
+        create_partitions(0)
+        plan = Strike.objects.filter(
+            date__gte=date(2011, 10, 1), date__lte=date(2011, 12, 31)).explain()
+        self.assertIn('strike_strike_y2011', plan)
+        self.assertNotIn('strike_strike_y2012', plan)
+        self.assertNotIn('strike_strike_default', plan)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = Strike.objects.filter(
+                location=self.location, date__gte=date(2011, 10, 1)).explain()
+        self.assertIn('location_id_date_idx', plan)
+
+
+class StrikeTest(BaseTestCase):
+    """
+    Unit tests for parsed strike casualty columns.
+    """
+
+    def test_parse_casualties(self):
+        """
+        Casualty strings are parsed into low and high integers.
+        """
+        self.assertEqual(parse_casualties('4'), (4, 4))
+        self.assertEqual(parse_casualties('6-8'), (6, 8))
+        self.assertEqual(parse_casualties('Possibly 1-3 '), (1, 3))
+        self.assertEqual(parse_casualties(''), (None, None))
+        self.assertEqual(parse_casualties(None), (None, None))
+
+    def test_save(self):
+        """
+        Casualty columns are set on save, deaths falling back to deaths_min
+        and deaths_max.
+        """
+        strike = Strike.objects.create(
+            number=1, location=Location.objects.create(country=self.country),
+            date=date(2011, 10, 14), deaths='', deaths_min='3', deaths_max='5',
+            injuries='0-2', articles=[], names=[])
+        strike.refresh_from_db()
+        self.assertEqual((strike.deaths_low, strike.deaths_high), (3, 5))
+        self.assertEqual((strike.injuries_low, strike.injuries_high), (0, 2))
+        self.assertEqual((strike.children_low, strike.children_high), (None, None))
+
+
+class LocationTest(BaseTestCase):
+    """
+    Unit tests for import data helper function.
+    """
+
+    def test_str(self):
+        """
+        Ensure proper str representation is returned.
+        """
+        location = Location.objects.create(country=self.country)
+        self.assertEqual(str(location), '%d. SasaLand' % location.id)
+
+        # Town str
+        location.town = 'Gotham'
+        location.save()
+        self.assertEqual(str(location), '%d. SasaLand - Gotham' % location.id)
+
+    def test_strike_info(self):
+        """
+        Returns a list or a dict, depending on a set of values related to the
+        selected instance.
+        """
+        location = Location.objects.create(country=self.country)
+
+        # No related strike
+        self.assertEqual(location.strike_info, {})
+
+        # One related strike
+        Strike.objects.create(
+            number=666,
+            location=location,
+            date=date(2002, 2, 1),
+            articles=[],
+            names=[],
+            deaths='4'
+        )
+        strike_info = {
+            'detail': True,
+            'number': 666,
+            'date': '02-01-2002',
+            'deaths': '4'
+        }
+        self.assertDictEqual(location.strike_info, strike_info)
+
+        # Multiple related strikes
+        Strike.objects.create(
+            number=777,
+            location=location,
+            date=date(2003, 3, 2),
+            articles=[],
+            names=[],
+            deaths='3'
+        )
+
+        strike_info1 = {
+            'number': 666,
+            'date': '02-01-2002',
+        }
+        strike_info2 = {
+            'number': 777,
+            'date': '03-02-2003',
+        }
+        self.assertFalse(location.strike_info['detail'])
+        self.assertEqual(location.strike_info['num_of_strikes'], 2)
+        self.assertIn(strike_info1, location.strike_info['strikes'])
+        self.assertIn(strike_info2, location.strike_info['strikes'])
+
+    def test_with_strike_info(self):
+        """
+        Strike info of annotated locations respects the strike filters and
+        runs no queries per location.
+        """
+        locations = [Location.objects.create(country=self.country) for i in range(3)]
+        for number, strike_date in enumerate([date(2002, 2, 1), date(2003, 3, 2), date(2010, 1, 1)]):
+            for location in locations:
+                Strike.objects.create(
+                    number=number * 10 + location.id, location=location,
+                    date=strike_date, articles=[], names=[], deaths='4')
+
+        with self.assertNumQueries(2):
+            annotated = list(Location.objects.order_by('id').with_strike_info(
+                date__gte=date(2002, 1, 1), date__lte=date(2003, 12, 31)))
+            infos = [location.strike_info for location in annotated]
+        self.assertEqual([info['num_of_strikes'] for info in infos], [2, 2, 2])
+        self.assertEqual(
+            [strike['date'] for strike in infos[0]['strikes']], ['02-01-2002', '03-02-2003'])
+
+        with self.assertNumQueries(2):
+            annotated = list(Location.objects.order_by('id').with_strike_info(
+                date__gte=date(2010, 1, 1)))
+            infos = [location.strike_info for location in annotated]
+        self.assertTrue(infos[0]['detail'])
+        self.assertEqual(infos[0]['date'], '01-01-2010')
+
+        annotated = Location.objects.with_strike_info(date__gte=date(2011, 1, 1))
+        self.assertEqual([location.strike_info for location in annotated], [{}, {}, {}])
+
+
+class SearchView(BaseTestCase):
+    """
+    Unit tests for search view.
+    """
+
+    def setUp(self):
+        super(SearchView, self).setUp()
+        self.view = SearchView()
+
+    def test_get_search(self):
+        """
+        Basic search through the search vector, matching word prefixes.
         """
         form_data = {
             'search_q': 'Sasa'
@@ -409,6 +1284,106 @@ class SearchView(BaseTestCase):
         response = self.client.get(reverse('search'), form_data)
         self.assertEqual(list(response.context['strikes']), [strike, strike2])
 
+    def test_get_search_stemmed(self):
+        """
+        Words are stemmed and matched as prefixes in any weighted field.
+        """
+        location = Location.objects.create(country=self.country, town='Wana')
+        strike = Strike.objects.create(
+            number=1, location=location, date=date(2011, 10, 14),
+            narrative='Missiles hit a vehicle.', articles=[], names=[])
+        strike2 = Strike.objects.create(
+            number=2, location=location, date=date(2011, 10, 14),
+            narrative='A strike in Wana.', target='Vehicles', articles=[], names=[])
+        Strike.objects.create(
+            number=3, location=location, date=date(2011, 10, 14),
+            narrative='A house.', articles=[], names=['Nek Mohammad'])
+
+        response = self.client.get(reverse('search'), {'search_q': 'vehicles'})
+        self.assertEqual(list(response.context['strikes']), [strike, strike2])
+
+        response = self.client.get(reverse('search'), {'search_q': 'wana nek'})
+        self.assertEqual([strike.number for strike in response.context['strikes']], [3])
+
+        response = self.client.get(reverse('search'), {'search_q': '&|!'})
+        self.assertEqual(list(response.context['strikes']), [])
+
+    @override_settings(STRIKE_SEARCH_PAGE_SIZE=2)
+    def test_get_search_pages(self):
+        """
+        Results are paginated by (date, number) cursors in a constant number
+        of queries, as HTML or JSON.
+        """
+        for number in range(5):
+            location = Location.objects.create(
+                country=self.country, town='Wana', lat=number, lon=number)
+            Strike.objects.create(
+                number=number, location=location, date=date(2011, 10, 14 - number),
+                articles=[], names=[])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('search'), {'search_q': 'wana'})
+        self.assertEqual([strike.number for strike in response.context['strikes']], [4, 3])
+        self.assertEqual(response.context['next_cursor'], '2011-10-11_3')
+        self.assertEqual(len(response.context['locations']), 2)
+        self.assertContains(response, 'cursor=2011-10-11_3')
+
+        numbers = []
+        data = {'search_q': 'wana', 'format': 'json'}
+        while True:
+            response = self.client.get(reverse('search'), data).json()
+            numbers += [result['number'] for result in response['results']]
+            if not response['next']:
+                break
+            data['cursor'] = response['next']
+        self.assertEqual(numbers, [4, 3, 2, 1, 0])
+        self.assertEqual(response['results'][0]['country'], 'SasaLand')
+        self.assertEqual(response['results'][0]['date'], '2011-10-14')
+        self.assertEqual(response['results'][0]['lat'], 0.0)
+        self.assertIsInstance(response['results'][0]['lon'], float)
+
+        response = self.client.get(
+            reverse('search'), {'search_q': 'wana', 'format': 'json', 'cursor': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_ranked(self):
+        """
+        Search results are ranked by field weight, unless unranked.
+        """
+        location = Location.objects.create(country=self.country, town='Wana')
+        Strike.objects.create(
+            number=1, location=location, date=date(2011, 10, 14),
+            target='Vehicles', articles=[], names=[])
+        Strike.objects.create(
+            number=2, location=location, date=date(2011, 10, 15),
+            narrative='Missiles hit a vehicle.', articles=[], names=[])
+
+        strikes = Strike.objects.search('vehicles')
+        self.assertEqual([strike.number for strike in strikes], [2, 1])
+        self.assertGreater(strikes[0].rank, strikes[1].rank)
+
+        strikes = Strike.objects.search('vehicles', ranked=False)
+        self.assertNotIn('rank', strikes.query.annotations)
+        self.assertEqual(sorted(strike.number for strike in strikes), [1, 2])
+
+    def test_update_search_vector(self):
+        """
+        Bulk created strikes are searchable after update_search_vector, and
+        imported strikes right away.
+        """
+        location = Location.objects.create(country=self.country, town='Wana')
+        Strike.objects.bulk_create([Strike(
+            number=1000, location=location, date=date(2011, 10, 14),
+            articles=[], names=[])])
+        self.assertFalse(Strike.objects.search('wana').exists())
+
+        Strike.objects.all().update_search_vector()
+        self.assertTrue(Strike.objects.search('wana').exists())
+
+        Importer().import_strikes(SyntheticFeed(strikes=1))
+        strike = Strike.objects.get(number=1)
+        self.assertEqual(list(Strike.objects.search(strike.narrative)), [strike])
+
 
 class IndexViewTest(BaseTestCase):
     """
@@ -495,9 +1470,91 @@ class IndexViewTest(BaseTestCase):
         self.assertEqual(
             list(response.context['locations']), list(Location.objects.all()))
 
+    @freezegun.freeze_time('2012-01-14')
+    def test_get_cached(self):
+        """
+        Responses are cached per normalized filters and dataset version, and
+        revalidated with ETag and Last-Modified.
+        """
+        form_data = {
+            'daterange': '10/14/2011 - 01/14/2012',
+            'country__name': 'SasaLand',
+        }
+        response = self.client.get(reverse('index'), form_data)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('must-revalidate', response['Cache-Control'])
+
+        # Parameter order and empty values are normalized.
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                reverse('index') + '?country__name=SasaLand&town=&daterange=10/14/2011 - 01/14/2012')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], etag)
+
+        response = self.client.get(reverse('index'), form_data, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            reverse('index'), form_data, HTTP_IF_MODIFIED_SINCE=cached['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # Other filters and new dataset versions are not served from cache.
+        response = self.client.get(reverse('index'), dict(form_data, town='Wana'))
+        self.assertNotEqual(response['ETag'], etag)
+
+        bump_dataset_version()
+        response = self.client.get(reverse('index'), form_data, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @freezegun.freeze_time('2012-01-14')
+    def test_get_no_strike_info(self):
+        """
+        The map page does not render location strike info, which markers
+        and search results carry, so it is not computed.
+        """
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('index'))
+        self.assertNotIn('num_of_strikes', response.context['locations'].query.annotations)
+
+    @freezegun.freeze_time('2012-01-14')
+    def test_get_min_casualties(self):
+        """
+        Strikes are filtered by minimum deaths and civilians, and casualties
+        are summed per country.
+        """
+        self.strike.deaths = '2-4'
+        self.strike.civilians = '1'
+        self.strike.save()
+        form_data = {
+            'daterange': '10/14/2011 - 01/14/2012',
+            'country__name': 'all',
+            'min_deaths': '2',
+        }
+        response = self.client.get(reverse('index'), form_data)
+        self.assertEqual(list(response.context['locations']), [self.location])
+        totals = list(response.context['country_totals'])
+        self.assertEqual(len(totals), 1)
+        self.assertEqual(totals[0]['country'], 'SasaLand')
+        self.assertEqual(totals[0]['strikes'], 1)
+        self.assertEqual((totals[0]['deaths_low'], totals[0]['deaths_high']), (2, 4))
+        self.assertEqual(totals[0]['civilians_low'], 1)
+        self.assertIsNone(totals[0]['children_low'])
+
+        form_data['min_deaths'] = '3'
+        response = self.client.get(reverse('index'), form_data)
+        self.assertEqual(list(response.context['locations']), [])
+        self.assertEqual(list(response.context['country_totals']), [])
+
+        form_data['min_deaths'] = ''
+        form_data['min_civilians'] = '2'
+        response = self.client.get(reverse('index'), form_data)
+        self.assertEqual(list(response.context['locations']), [])
+
     def test_get_filters(self):
         """
-        Retrieve all unique values for filters.
+        Retrieve unique countries for filters; towns and provinces are
+        suggested by the suggest view.
         """
         self.location.town = 'SasaTown'
         self.location.location = 'SasaProvince'
@@ -506,10 +1563,8 @@ class IndexViewTest(BaseTestCase):
         response = self.client.get(reverse('index'))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(list(response.context['country_filters']), ['SasaLand'])
-        self.assertEqual(
-            response.context['city_filters']['SasaLand'][0], 'SasaTown')
-        self.assertEqual(
-            response.context['province_filters']['SasaLand'][0], 'SasaProvince')
+        self.assertNotIn('city_filters', response.context)
+        self.assertNotContains(response, 'SasaTown')
 
     @freezegun.freeze_time('2012-01-14')
     def test_get_form_daterange(self):
@@ -540,6 +1595,833 @@ class IndexViewTest(BaseTestCase):
         self.assertEqual(response.context['daterange'], '10-14-2011 - 01-14-2012')
 
 
+class MarkerViewTest(BaseTestCase):
+    """
+    Unit tests for the GeoJSON marker view.
+    """
+
+    def setUp(self):
+        super(MarkerViewTest, self).setUp()
+        self.location = Location.objects.create(
+            country=self.country, lat='15.47467', lon='45.322755', town='SasaTown')
+        self.location2 = Location.objects.create(
+            country=self.country, lat='15.47', lon='45.32')
+        for number, location in enumerate([self.location, self.location2, self.location2]):
+            Strike.objects.create(
+                number=number, location=location, date=date(2011, 10, 14),
+                deaths='2', articles=[], names=[])
+        self.form_data = {
+            'daterange': '10/14/2011 - 01/14/2012',
+            'country__name': 'all',
+        }
+
+    def test_get_clusters(self):
+        """
+        Locations are clustered at low zoom levels, and single locations
+        carry their strike info.
+        """
+        response = self.client.get(reverse('markers'), dict(self.form_data, zoom=3))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['type'], 'FeatureCollection')
+        self.assertEqual(len(data['features']), 1)
+        self.assertEqual(data['features'][0]['properties'], {
+            'cluster': True, 'point_count': 2, 'num_of_strikes': 3})
+
+        response = self.client.get(reverse('markers'), dict(self.form_data, zoom=18))
+        features = sorted(
+            response.json()['features'],
+            key=lambda feature: feature['properties']['num_of_strikes'])
+        self.assertEqual(len(features), 2)
+        self.assertEqual(features[0]['geometry']['coordinates'], [45.322755, 15.47467])
+        self.assertEqual(features[0]['properties']['strike_info']['number'], 0)
+        self.assertEqual(features[1]['properties']['strike_info']['num_of_strikes'], 2)
+
+    def test_get_filters(self):
+        """
+        Markers respect the bbox and the map filters.
+        """
+        response = self.client.get(
+            reverse('markers'), dict(self.form_data, zoom=18, town='SasaTown'))
+        self.assertEqual(len(response.json()['features']), 1)
+
+        response = self.client.get(
+            reverse('markers'), dict(self.form_data, zoom=18, bbox='0,0,10,10'))
+        self.assertEqual(response.json()['features'], [])
+
+        response = self.client.get(
+            reverse('markers'), dict(self.form_data, daterange='10/15/2011 - 01/14/2012'))
+        self.assertEqual(response.json()['features'], [])
+
+    def test_get_bbox_filter(self):
+        """
+        The strike count query is limited to the bbox, including bboxes
+        crossing the antimeridian.
+        """
+        view = MarkerView()
+        strikes = Strike.objects.all()
+        self.assertEqual(strikes.filter(view.get_bbox_filter(45, 15, 46, 16)).count(), 3)
+        self.assertEqual(strikes.filter(view.get_bbox_filter(0, 0, 10, 10)).count(), 0)
+        self.assertEqual(strikes.filter(view.get_bbox_filter(170, 10, 50, 20)).count(), 3)
+        self.assertEqual(strikes.filter(view.get_bbox_filter(170, 10, 40, 20)).count(), 0)
+
+    def test_snap_bbox(self):
+        """
+        Bboxes are widened to the tiles they cover, and bboxes within the
+        same tiles share a cached response.
+        """
+        view = MarkerView()
+        self.assertEqual(view.snap_bbox([1, 1, 2, 2], 0), [-180, -90, 180, 90])
+        self.assertEqual(view.snap_bbox([1, 1, 2, 2], 1), [0, 0, 180, 90])
+        self.assertEqual(view.snap_bbox([170, -10, -170, 10], 1), [-180, -90, 180, 90])
+        west, south, east, north = view.snap_bbox([170, -10, -170, 10], 3)
+        self.assertEqual((west, east), (135, -135))
+        west, south, east, north = view.snap_bbox([45.1, 15.1, 45.2, 15.2], 5)
+        self.assertEqual((west, east), (45, 56.25))
+        self.assertTrue(south < 15.1 < 15.2 < north)
+
+        data = dict(self.form_data, zoom=5, bbox='45.1,15.1,45.2,15.2')
+        response = self.client.get(reverse('markers'), data)
+        self.assertEqual(len(response.json()['features']), 1)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('markers'), dict(data, bbox='45.3,15.3,45.4,15.4'))
+        self.assertEqual(len(response.json()['features']), 1)
+
+    def test_get_marker_index(self):
+        """
+        The marker index is kept in process memory per dataset version.
+        """
+        marker_index = get_marker_index()
+        self.assertEqual(len(marker_index), 2)
+        with mock.patch('strike.cache.cache.get', wraps=cache.get) as cache_get:
+            self.assertIs(get_marker_index(), marker_index)
+            self.assertFalse(any('marker_index' in str(call) for call in cache_get.call_args_list))
+
+        bump_dataset_version()
+        self.assertIsNot(get_marker_index(), marker_index)
+
+    def test_get_invalid(self):
+        """
+        Invalid zoom and bbox values are rejected.
+        """
+        response = self.client.get(reverse('markers'), {'zoom': 'a'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('markers'), {'bbox': '1,2,3'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportViewTest(BaseTestCase):
+    """
+    Unit tests for the streaming export view.
+    """
+
+    def setUp(self):
+        super(ExportViewTest, self).setUp()
+        location = Location.objects.create(
+            country=self.country, town='Wana', lat='1.5', lon='2.5')
+        for number in range(3):
+            Strike.objects.create(
+                number=number, location=location, date=date(2011, 10, 12 + number),
+                deaths=str(number), articles=['a', 'b'], names=['Nek Mohammad'])
+        self.form_data = {
+            'daterange': '10/13/2011 - 01/14/2012',
+            'country__name': 'SasaLand',
+        }
+
+    def test_get_csv(self):
+        """
+        Filtered strikes are streamed as csv rows.
+        """
+        response = self.client.get(reverse('export'), self.form_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['number', 'date', 'country'])
+        self.assertEqual([row[0] for row in rows[1:]], ['1', '2'])
+        self.assertEqual(rows[1][3:7], ['', 'Wana', '1.500000000', '2.500000000'])
+        self.assertEqual(rows[1][-1], 'a; b')
+
+    def test_get_ndjson(self):
+        """
+        Filtered strikes are streamed as JSON lines.
+        """
+        response = self.client.get(
+            reverse('export'), dict(self.form_data, format='ndjson', min_deaths=2))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        strike = json.loads(lines[0])
+        self.assertEqual(strike['number'], 2)
+        self.assertEqual(strike['date'], '2011-10-14')
+        self.assertEqual(strike['names'], ['Nek Mohammad'])
+
+    def test_get_invalid(self):
+        """
+        Unknown formats and invalid filters are rejected.
+        """
+        response = self.client.get(reverse('export'), dict(self.form_data, format='xml'))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('export'), {'daterange': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('daterange', response.json()['error'])
+
+    def test_get_defaults(self):
+        """
+        Missing filters default to all strikes.
+        """
+        response = self.client.get(reverse('export'), {'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), Strike.objects.count())
+
+
+class TimelineViewTest(BaseTestCase):
+    """
+    Unit tests for the binary timeline payload.
+    """
+
+    def setUp(self):
+        super(TimelineViewTest, self).setUp()
+        location = Location.objects.create(country=self.country, lat='15.5', lon='45.25')
+        Strike.objects.create(
+            number=2, location=location, date=date(1970, 1, 11), deaths='3-5',
+            articles=[], names=[])
+        Strike.objects.create(
+            number=1, location=location, date=date(2011, 10, 14), deaths='',
+            articles=[], names=[])
+        Strike.objects.create(
+            number=3, location=Location.objects.create(country=self.country),
+            date=date(2011, 10, 14), articles=[], names=[])
+        Strike.objects.create(
+            number=4, location=location, date=date(1969, 12, 22), deaths='1',
+            articles=[], names=[])
+
+    def read_payload(self, content):
+        header_length = struct.unpack('<I', content[:4])[0]
+        header = json.loads(content[4:4 + header_length].decode())
+        data = content[4 + header_length:]
+        arrays = {}
+        for description in header['arrays']:
+            typecode = {'float32': 'f', 'int32': 'i', 'uint16': 'H'}[description['type']]
+            values = array.array(typecode)
+            start = description['offset']
+            values.frombytes(data[start:start + description['length'] * values.itemsize])
+            arrays[description['name']] = list(values)
+        return header, arrays
+
+    def test_get(self):
+        """
+        Located strikes are served as packed arrays ordered by date, and
+        revalidated by dataset version.
+        """
+        response = self.client.get(reverse('timeline'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        header, arrays = self.read_payload(b''.join(response.streaming_content))
+        self.assertEqual(header['count'], 3)
+        self.assertEqual(arrays['lat'], [15.5, 15.5, 15.5])
+        self.assertEqual(arrays['lon'], [45.25, 45.25, 45.25])
+        self.assertEqual(
+            arrays['day'], [-10, 10, (date(2011, 10, 14) - date(1970, 1, 1)).days])
+        self.assertEqual(arrays['deaths'], [1, 3, 0])
+
+        etag = response['ETag']
+        response = self.client.get(reverse('timeline'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_rebuild(self):
+        """
+        Payloads are rebuilt for new dataset versions, and old ones removed.
+        """
+        version = get_dataset_version()
+        with get_timeline(version) as payload_file:
+            path = payload_file.name
+        self.assertTrue(os.path.exists(path))
+
+        Strike.objects.filter(number=1).delete()
+        bump_dataset_version()
+        response = self.client.get(reverse('timeline'))
+        header, arrays = self.read_payload(b''.join(response.streaming_content))
+        self.assertEqual(header['count'], 2)
+        self.assertFalse(os.path.exists(path))
+
+    def test_rebuild_race(self):
+        """
+        Late builds of old versions keep the current payload, and payloads
+        removed before they are read are rebuilt.
+        """
+        old_version = get_dataset_version()
+        bump_dataset_version()
+        version = get_dataset_version()
+        with get_timeline(version) as payload_file:
+            path = payload_file.name
+        build_timeline(old_version)
+        self.assertTrue(os.path.exists(path))
+
+        os.remove(path)
+        with get_timeline(version) as payload_file:
+            header, arrays = self.read_payload(payload_file.read())
+        self.assertEqual(header['version'], version)
+        self.assertEqual(header['count'], 3)
+
+
+class TileTest(BaseTestCase):
+    """
+    Unit tests for vector tiles.
+    """
+
+    def setUp(self):
+        super(TileTest, self).setUp()
+        self.sanaa = Location.objects.create(
+            country=self.country, town='Sanaa', lat='15.369445', lon='44.191007')
+        wana = Location.objects.create(country=self.country, lat='32.29', lon='69.57')
+        for number, (location, strike_date, deaths) in enumerate([
+                (self.sanaa, date(2011, 10, 14), '2'), (self.sanaa, date(2012, 1, 1), '1-3'),
+                (wana, date(2011, 10, 14), ''),
+                (Location.objects.create(country=self.country), date(2011, 10, 14), '5')]):
+            Strike.objects.create(
+                number=number, location=location, date=strike_date, deaths=deaths,
+                articles=[], names=[])
+        self.version = get_dataset_version()
+
+    def read_varint(self, data, offset):
+        value, shift = 0, 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, offset
+
+    def read_packed(self, data):
+        values, offset = [], 0
+        while offset < len(data):
+            value, offset = self.read_varint(data, offset)
+            values.append(value)
+        return values
+
+    def read_fields(self, data):
+        """
+        Return the (number, value) fields of a protobuf message, varints as
+        ints, fixed64 as a double and length delimited fields as bytes.
+        """
+        fields, offset = [], 0
+        while offset < len(data):
+            key, offset = self.read_varint(data, offset)
+            if key & 7 == 0:
+                value, offset = self.read_varint(data, offset)
+            elif key & 7 == 1:
+                value = struct.unpack('<d', data[offset:offset + 8])[0]
+                offset += 8
+            else:
+                length, offset = self.read_varint(data, offset)
+                value = data[offset:offset + length]
+                offset += length
+            fields.append((key >> 3, value))
+        return fields
+
+    def read_tile(self, data):
+        """
+        Return the layer name, extent and features of a single layer tile,
+        as dicts with their id, x, y and properties.
+        """
+        fields = self.read_fields(data)
+        self.assertEqual([number for number, value in fields], [3])
+        layer = self.read_fields(fields[0][1])
+        keys = [value.decode() for number, value in layer if number == 3]
+        values = []
+        for number, value in layer:
+            if number == 4:
+                value_type, value = self.read_fields(value)[0]
+                values.append(value.decode() if value_type == 1 else value)
+
+        features = []
+        for number, value in layer:
+            if number != 2:
+                continue
+            feature = dict(self.read_fields(value))
+            tags = self.read_packed(feature[2])
+            command, x, y = self.read_packed(feature[4])
+            self.assertEqual((feature[3], command), (1, 9))
+            features.append({
+                'id': feature[1], 'x': (x >> 1) ^ -(x & 1), 'y': (y >> 1) ^ -(y & 1),
+                'properties': {
+                    keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)},
+            })
+        layer = dict(layer)
+        return layer[1].decode(), layer[5], features
+
+    def test_encode_layer(self):
+        """
+        Layers are encoded as MVT version 2 with shared keys and values.
+        """
+        layer = self.read_fields(encode_layer('points', [
+            (1, 10, -2, {'name': 'a', 'count': 3, 'ratio': 0.5, 'delta': -1}),
+            (2, 0, 0, {'name': 'a', 'count': None})]))
+        self.assertEqual(layer[:2], [(15, 2), (1, b'points')])
+        self.assertEqual([value for number, value in layer if number == 3],
+                         [b'name', b'count', b'ratio', b'delta'])
+        self.assertEqual(
+            [self.read_fields(value)[0] for number, value in layer if number == 4],
+            [(1, b'a'), (5, 3), (3, 0.5), (6, 1)])
+        self.assertEqual(layer[-1], (5, 4096))
+        self.assertEqual(self.read_fields(layer[3][1])[1], (2, bytes([0, 0])))
+
+    def test_get_tile_bounds(self):
+        """
+        Tile bounds follow the Web Mercator tile grid.
+        """
+        west, south, east, north = get_tile_bounds(0, 0, 0)
+        self.assertEqual((west, east), (-180, 180))
+        self.assertAlmostEqual(north, 85.0511, places=4)
+        self.assertAlmostEqual(south, -85.0511, places=4)
+        self.assertEqual(get_tile_bounds(1, 1, 0)[:2], (0, 0))
+
+    def test_build(self):
+        """
+        Tiles have a feature per location with strikes in their bounds.
+        """
+        strikes = get_filter_form({}).get_strikes()
+        name, extent, features = self.read_tile(build_tile(strikes, 0, 0, 0))
+        self.assertEqual((name, extent), ('strikes', 4096))
+        self.assertEqual([feature['id'] for feature in features], [self.sanaa.id, self.sanaa.id + 1])
+        self.assertEqual(features[0]['properties'], {
+            'country': 'SasaLand', 'town': 'Sanaa', 'strikes': 2, 'deaths': 3})
+        self.assertEqual(
+            (features[0]['x'], features[0]['y']),
+            (int((44.191007 + 180) / 360 * 4096), project(15.369445, 44.191007, 4)[1]))
+
+        # Sanaa and Wana are in different tiles at zoom 3.
+        name, extent, features = self.read_tile(build_tile(strikes, 3, 4, 3))
+        self.assertEqual([feature['id'] for feature in features], [self.sanaa.id])
+        self.assertEqual(build_tile(strikes, 1, 0, 0), b'')
+
+        strikes = get_filter_form({'daterange': '01/01/2012 - 12/31/2012'}).get_strikes()
+        name, extent, features = self.read_tile(build_tile(strikes, 0, 0, 0))
+        self.assertEqual(features[0]['properties']['strikes'], 1)
+
+    def test_get_tile(self):
+        """
+        Tiles are cached on disk per dataset version and cleaned filters, and
+        tiles of old versions removed.
+        """
+        form = get_filter_form({})
+        tile = get_tile(self.version, form, 0, 0, 0)
+        self.assertTrue(tile)
+        path = get_path(self.version, get_filter_digest(form), 0, 0, 0)
+        self.assertTrue(os.path.exists(path))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_tile(self.version, get_filter_form({}), 0, 0, 0), tile)
+
+        # Equivalent filter strings share tiles.
+        self.assertEqual(
+            get_filter_digest(get_filter_form({'daterange': '1/1/1900 - 12/31/2100'})),
+            get_filter_digest(form))
+        form = get_filter_form({'country__name': 'SasaLand'})
+        self.assertNotEqual(get_filter_digest(form), get_filter_digest(get_filter_form({})))
+
+        bump_dataset_version()
+        get_tile(get_dataset_version(), form, 0, 0, 0)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(
+            os.listdir(os.path.join(settings.STRIKE_DATA_CACHE_DIR, 'tiles')),
+            [get_dataset_version()])
+
+    def test_clean_versions(self):
+        """
+        Old versions are removed once, by the first tile of a version, and
+        the current version is never removed.
+        """
+        clean_versions(self.version)
+        path = get_path(self.version, 'digest', 0, 0, 0)
+        write_tile(path, b'tile')
+        clean_versions(self.version)
+        self.assertTrue(os.path.exists(path))
+
+        # A tile written for an older version after the cleanup is removed
+        # by the cleanup of the next version.
+        write_tile(get_path('old', 'digest', 0, 0, 0), b'tile')
+        bump_dataset_version()
+        clean_versions(get_dataset_version())
+        tiles_dir = os.path.join(settings.STRIKE_DATA_CACHE_DIR, 'tiles')
+        self.assertEqual(os.listdir(tiles_dir), [get_dataset_version()])
+
+    @override_settings(STRIKE_TILE_CACHE_FILTERS=2, STRIKE_TILE_CACHE_MAX_ZOOM=1)
+    def test_cache_limits(self):
+        """
+        The least recent filters are evicted beyond STRIKE_TILE_CACHE_FILTERS,
+        keeping the default filters, and high zoom tiles are not cached.
+        """
+        version_dir = os.path.join(settings.STRIKE_DATA_CACHE_DIR, 'tiles', self.version)
+        default_digest = get_filter_digest(get_filter_form({}))
+        get_tile(self.version, get_filter_form({}), 0, 0, 0)
+        digests = []
+        for year in [2011, 2012, 2013]:
+            form = get_filter_form({'daterange': '01/01/%d - 12/31/%d' % (year, year)})
+            get_tile(self.version, form, 0, 0, 0)
+            digests.append(get_filter_digest(form))
+            time.sleep(0.01)
+        self.assertEqual(
+            set(os.listdir(version_dir)), {default_digest, digests[1], digests[2]})
+
+        self.assertTrue(get_tile(self.version, get_filter_form({}), 2, 2, 1))
+        self.assertFalse(os.path.exists(get_path(self.version, default_digest, 2, 2, 1)))
+
+    def test_seed(self):
+        """
+        Seeding builds the tiles up to a zoom level, skipping tiles under
+        empty ones.
+        """
+        self.assertEqual(seed(self.version, 0), 1)
+        # Sanaa and Wana share the north east tile at zoom 1.
+        self.assertEqual(seed(self.version, 2), 1 + 4 + 4)
+        with self.assertNumQueries(0):
+            seed(self.version, 2)
+        self.assertTrue(os.path.exists(get_path(
+            self.version, get_filter_digest(get_filter_form({})), 2, 2, 1)))
+        with self.assertRaises(ValueError):
+            seed(self.version, 1, {'daterange': '2011'})
+
+
+class TileViewTest(BaseTestCase):
+    """
+    Unit tests for the vector tile view.
+    """
+
+    def setUp(self):
+        super(TileViewTest, self).setUp()
+        Strike.objects.create(
+            number=1, date=date(2011, 10, 14), deaths='4', articles=[], names=[],
+            location=Location.objects.create(
+                country=self.country, lat='15.369445', lon='44.191007'))
+
+    def get_tile(self, z, x, y, params=None, **headers):
+        return self.client.get(
+            reverse('tile', kwargs={'z': z, 'x': x, 'y': y}), params or {}, **headers)
+
+    def test_get(self):
+        """
+        Tiles are served filtered, with a version ETag and public caching.
+        """
+        response = self.get_tile(0, 0, 0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertTrue(response.content)
+
+        response = self.get_tile(0, 0, 0, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.get_tile(0, 0, 0, {'daterange': '01/01/2012 - 12/31/2012'})
+        self.assertEqual(response.content, b'')
+
+        self.assertEqual(self.get_tile(0, 0, 0, {'country__name': 'Nowhere'}).status_code, 400)
+        self.assertEqual(self.get_tile(1, 2, 0).status_code, 404)
+        self.assertEqual(self.get_tile(17, 0, 0).status_code, 404)
+
+
+class StatsViewTest(BaseTestCase):
+    """
+    Unit tests for the casualty statistics view.
+    """
+
+    def setUp(self):
+        super(StatsViewTest, self).setUp()
+        location = Location.objects.create(country=self.country)
+        yemen = Location.objects.create(country=Country.objects.create(name='Yemen'))
+        for number, (strike_date, location, deaths) in enumerate([
+                (date(2011, 10, 3), location, '1-3'),
+                (date(2011, 10, 20), location, '2'),
+                (date(2011, 12, 1), location, ''),
+                (date(2011, 10, 5), yemen, '4')]):
+            Strike.objects.create(
+                number=number, location=location, date=strike_date, deaths=deaths,
+                children='1', articles=[], names=[])
+        self.form_data = {
+            'daterange': '10/01/2011 - 12/31/2011',
+            'country__name': 'all',
+        }
+
+    def test_get(self):
+        """
+        Strikes and casualties are summed per country and month, with
+        running totals.
+        """
+        response = self.client.get(reverse('stats'), self.form_data)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['interval'], 'month')
+        self.assertEqual(
+            [series['country'] for series in data['series']], ['SasaLand', 'Yemen'])
+
+        buckets = data['series'][0]['buckets']
+        self.assertEqual([bucket['bucket'] for bucket in buckets], ['2011-10-01', '2011-12-01'])
+        self.assertEqual(buckets[0]['strikes'], 2)
+        self.assertEqual((buckets[0]['deaths_low'], buckets[0]['deaths_high']), (3, 5))
+        self.assertEqual(buckets[0]['children_low'], 2)
+        self.assertIsNone(buckets[1]['deaths_low'])
+        self.assertEqual(buckets[1]['cumulative']['strikes'], 3)
+        self.assertEqual(buckets[1]['cumulative']['deaths_high'], 5)
+        self.assertEqual(buckets[1]['cumulative']['children_low'], 3)
+
+    def test_get_interval(self):
+        """
+        Buckets follow the interval and the map filters.
+        """
+        response = self.client.get(
+            reverse('stats'), dict(self.form_data, interval='week', country__name='SasaLand'))
+        series = response.json()['series']
+        self.assertEqual(len(series), 1)
+        self.assertEqual(
+            [bucket['bucket'] for bucket in series[0]['buckets']],
+            ['2011-10-03', '2011-10-17', '2011-11-28'])
+
+        response = self.client.get(reverse('stats'), dict(self.form_data, interval='year'))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('stats'), {'daterange': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_defaults(self):
+        """
+        Missing filters default to all strikes.
+        """
+        response = self.client.get(reverse('stats'), {'interval': 'week'})
+        self.assertEqual(len(response.json()['series']), 2)
+        self.assertEqual(response.json(), self.client.get(
+            reverse('stats'), dict(self.form_data, interval='week')).json())
+
+
+class HeatmapTest(BaseTestCase):
+    """
+    Unit tests for heatmap grids.
+    """
+
+    def setUp(self):
+        super(HeatmapTest, self).setUp()
+        sanaa = Location.objects.create(
+            country=self.country, lat='15.369445', lon='44.191007')
+        marib = Location.objects.create(country=self.country, lat='15', lon='44.9')
+        edge = Location.objects.create(country=self.country, lat='90', lon='180')
+        for number, (location, strike_date, deaths) in enumerate([
+                (sanaa, date(2011, 10, 14), '2'), (marib, date(2011, 10, 20), '1-3'),
+                (marib, date(2012, 1, 1), ''), (edge, date(2012, 1, 1), '0'),
+                (Location.objects.create(country=self.country), date(2012, 1, 1), '5')]):
+            Strike.objects.create(
+                number=number, location=location, date=strike_date, deaths=deaths,
+                articles=[], names=[])
+
+    def test_get_zoom_band(self):
+        """
+        Bands cover two zoom levels, up to STRIKE_HEATMAP_MAX_BAND.
+        """
+        self.assertEqual([get_zoom_band(zoom) for zoom in [0, 1, 2, 5, 20]], [0, 0, 1, 2, 4])
+
+    def test_get_date_bucket(self):
+        """
+        Date ranges are widened to whole months.
+        """
+        self.assertEqual(
+            get_date_bucket(date(2011, 10, 14), date(2012, 2, 3)),
+            (date(2011, 10, 1), date(2012, 2, 29)))
+        self.assertEqual(get_date_bucket(None, None), (None, None))
+
+    def test_build(self):
+        """
+        Located strikes are binned into row-major cells, weighted by strikes
+        or parsed deaths, skipping empty cells.
+        """
+        heatmap = build(None, None, 0, 'strikes')
+        self.assertEqual((heatmap['columns'], heatmap['rows']), (256, 128))
+        self.assertEqual(heatmap['cell_size'], 360 / 256)
+        yemen = int((15.4 + 90) / heatmap['cell_size']) * 256 + int((44.9 + 180) / heatmap['cell_size'])
+        self.assertEqual(heatmap['cells'], [yemen, 128 * 256 - 1])
+        self.assertEqual(heatmap['values'], [3, 1])
+        self.assertEqual(heatmap['max'], 3)
+
+        heatmap = build(date(2011, 10, 1), date(2011, 10, 31), 0, 'deaths')
+        self.assertEqual((heatmap['cells'], heatmap['values']), ([yemen], [3]))
+        self.assertEqual(heatmap['start'], '2011-10-01')
+
+        heatmap = build(None, None, 2, 'strikes')
+        self.assertEqual(heatmap['columns'], 1024)
+        self.assertEqual(heatmap['values'], [2, 1, 1])
+
+    def test_get_heatmap(self):
+        """
+        Grids are cached per dataset version, month bucket and zoom band.
+        """
+        heatmap = get_heatmap(date(2011, 10, 14), date(2011, 10, 20), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_heatmap(date(2011, 10, 2), date(2011, 10, 30), 1), heatmap)
+        with self.assertNumQueries(1):
+            get_heatmap(date(2011, 10, 2), date(2011, 10, 30), 2)
+
+        bump_dataset_version()
+        with self.assertNumQueries(1):
+            get_heatmap(date(2011, 10, 14), date(2011, 10, 20), 0)
+
+
+class HeatmapViewTest(BaseTestCase):
+    """
+    Unit tests for the heatmap view.
+    """
+
+    def setUp(self):
+        super(HeatmapViewTest, self).setUp()
+        Strike.objects.create(
+            number=1, date=date(2011, 10, 14), deaths='4', articles=[], names=[],
+            location=Location.objects.create(
+                country=self.country, lat='15.369445', lon='44.191007'))
+
+    def test_get(self):
+        """
+        Grids follow the zoom, weight and daterange parameters.
+        """
+        response = self.client.get(reverse('heatmap'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['band'], data['weight'], data['values']), (0, 'strikes', [1]))
+        self.assertIn('ETag', response)
+
+        response = self.client.get(reverse('heatmap'), {
+            'zoom': 3, 'weight': 'deaths', 'daterange': '10/01/2011 - 10/31/2011'})
+        data = response.json()
+        self.assertEqual((data['band'], data['weight'], data['values']), (1, 'deaths', [4]))
+
+        response = self.client.get(reverse('heatmap'), {'daterange': '01/01/2012 - 12/31/2012'})
+        self.assertEqual(response.json()['cells'], [])
+
+        for params in [{'zoom': -1}, {'weight': 'children'}, {'daterange': '2011'}]:
+            self.assertEqual(self.client.get(reverse('heatmap'), params).status_code, 400)
+
+
+class NearestViewTest(BaseTestCase):
+    """
+    Unit tests for the nearest strikes view.
+    """
+
+    def setUp(self):
+        super(NearestViewTest, self).setUp()
+        for number, (town, lat, lon, strike_date) in enumerate([
+                ('Sanaa', '15.369445', '44.191007', date(2011, 10, 14)),
+                ('Marib', '15.47467', '45.322755', date(2012, 1, 1)),
+                ('Wana', '32.29', '69.57', date(2013, 1, 1))]):
+            Strike.objects.create(
+                number=number, date=strike_date, deaths='2', articles=[], names=[],
+                location=Location.objects.create(
+                    country=self.country, town=town, lat=lat, lon=lon))
+
+    def test_get(self):
+        """
+        Strikes are listed nearest first with their distance, limited to k
+        and the date range.
+        """
+        response = self.client.get(reverse('nearest'), {'lat': '15.4', 'lon': '45.3', 'k': 2})
+        self.assertEqual(response.status_code, 200)
+        strikes = response.json()['strikes']
+        self.assertEqual([strike['town'] for strike in strikes], ['Marib', 'Sanaa'])
+        self.assertEqual(strikes[0]['country'], 'SasaLand')
+        self.assertEqual(strikes[0]['date'], '2012-01-01')
+        self.assertAlmostEqual(strikes[0]['distance'], 8.4, delta=0.5)
+
+        response = self.client.get(reverse('nearest'), {
+            'lat': '15.4', 'lon': '45.3', 'daterange': '01/01/2011 - 12/31/2011'})
+        self.assertEqual([strike['town'] for strike in response.json()['strikes']], ['Sanaa'])
+
+        with override_settings(STRIKE_NEAREST_LIMIT=1):
+            response = self.client.get(reverse('nearest'), {'lat': '30', 'lon': '70'})
+        self.assertEqual([strike['town'] for strike in response.json()['strikes']], ['Wana'])
+
+    def test_get_invalid(self):
+        """
+        Coordinates are required and validated.
+        """
+        for params in [{}, {'lat': '91', 'lon': '0'}, {'lat': '0', 'lon': '0', 'k': 0},
+                       {'lat': '0', 'lon': '0', 'daterange': '2011'}]:
+            response = self.client.get(reverse('nearest'), params)
+            self.assertEqual(response.status_code, 400)
+
+
+class SuggestViewTest(BaseTestCase):
+    """
+    Unit tests for the type-ahead suggest view.
+    """
+
+    def setUp(self):
+        super(SuggestViewTest, self).setUp()
+        yemen = Country.objects.create(name='Yemen')
+        Location.objects.create(country=self.country, town='Wana', location='Waziristan')
+        Location.objects.create(country=yemen, town='Wadi Abida', location='Marib')
+        Strike.objects.create(
+            number=1, location=Location.objects.create(country=self.country),
+            date=date(2011, 10, 14), target='Nek Mohammad', articles=[],
+            names=['Nek Mohammad, Fakhar Zaman', 'Wali'])
+        Suggestion.objects.rebuild()
+
+    def test_rebuild(self):
+        """
+        Every distinct value is suggested once per kind and country.
+        """
+        self.assertEqual(
+            sorted(Suggestion.objects.values_list('kind', 'value', 'country')), [
+                ('country', 'SasaLand', ''),
+                ('country', 'Yemen', ''),
+                ('name', 'Fakhar Zaman', ''),
+                ('name', 'Nek Mohammad', ''),
+                ('name', 'Wali', ''),
+                ('province', 'Marib', 'Yemen'),
+                ('province', 'Waziristan', 'SasaLand'),
+                ('target', 'Nek Mohammad', ''),
+                ('town', 'Wadi Abida', 'Yemen'),
+                ('town', 'Wana', 'SasaLand'),
+            ])
+
+    def test_get(self):
+        """
+        Suggestions start with the query, case insensitive, filtered by kind
+        and country, and are cacheable.
+        """
+        response = self.client.get(reverse('suggest'), {'q': 'wa'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertEqual(
+            [suggestion['value'] for suggestion in response.json()['suggestions']],
+            ['Wadi Abida', 'Wali', 'Wana', 'Waziristan'])
+
+        response = self.client.get(reverse('suggest'), {'q': 'WA', 'kind': 'town', 'limit': 1})
+        self.assertEqual(response.json()['suggestions'], [
+            {'kind': 'town', 'value': 'Wadi Abida', 'country': 'Yemen'}])
+
+        response = self.client.get(
+            reverse('suggest'), {'q': 'wa', 'kind': 'town', 'country': 'SasaLand'})
+        self.assertEqual(response.json()['suggestions'], [
+            {'kind': 'town', 'value': 'Wana', 'country': 'SasaLand'}])
+
+        response = self.client.get(reverse('suggest'), {'q': ' '})
+        self.assertEqual(response.json()['suggestions'], [])
+
+    def test_get_invalid(self):
+        """
+        Unknown kinds and invalid limits are rejected.
+        """
+        response = self.client.get(reverse('suggest'), {'q': 'wa', 'kind': 'strike'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('suggest'), {'q': 'wa', 'limit': 'a'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_import(self):
+        """
+        Imports that change the data rebuild the suggestions.
+        """
+        Strike.objects.all().delete()
+        Importer().import_strikes(SyntheticFeed(strikes=1))
+        strike = Strike.objects.get()
+        self.assertTrue(Suggestion.objects.filter(
+            kind='province', value=strike.location.location).exists())
+        self.assertFalse(Suggestion.objects.filter(value='Nek Mohammad').exists())
+
+
 class StrikeFilterFormTest(BaseTestCase):
     """
     Unit tests for filter form.
@@ -602,6 +2484,26 @@ class StrikeFilterFormTest(BaseTestCase):
         self.assertDictEqual(self.form.get_values(), cleaned_data)
 
 
+    def test_get_strike_values(self):
+        """
+        Minimum casualty filters are strike lookups, not location lookups.
+        """
+        self.form = StrikeFilterForm({
+            'daterange': '04/12/1993 - 04/12/2018',
+            'country__name': 'SasaLand',
+            'min_deaths': '3',
+        })
+        self.assertEqual(self.form.get_strike_values(), {'deaths_low__gte': 3})
+        self.assertNotIn('min_deaths', self.form.get_values())
+        self.assertNotIn('min_civilians', self.form.get_values())
+
+        self.form = StrikeFilterForm({
+            'daterange': '04/12/1993 - 04/12/2018',
+            'country__name': 'SasaLand',
+            'min_deaths': '-1',
+        })
+        self.assertEqual(self.form.get_strike_values(), {})
+
     def test_clean_daterange(self):
         """
         Parses daterange string and returns date objects.